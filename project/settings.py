@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 
 import os
+from importlib.util import find_spec
 from pathlib import Path
 from dotenv import load_dotenv
 
@@ -25,8 +26,13 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 # SECURITY WARNING: keep the secret key used in production secret!
 SECRET_KEY = os.getenv("SECRET_KEY")
 
+# "production" keeps development-only apps and middleware off the request
+# path, reuses database connections and caches compiled templates
+SETTINGS_PROFILE = os.getenv("SETTINGS_PROFILE", "development")
+PRODUCTION = SETTINGS_PROFILE == "production"
+
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True if os.getenv("DEBUG") == "True" else False
+DEBUG = os.getenv("DEBUG") == "True" and not PRODUCTION
 
 ALLOWED_HOSTS = os.getenv("ALLOWED_HOSTS", "").split(",")
 
@@ -46,7 +52,6 @@ INSTALLED_APPS = [
     "restaurant",
     "rest_framework",
     # 'snippets',
-    "django_seed",
     "drf_yasg",
     "debug_toolbar",
     "django_filters",
@@ -56,6 +61,9 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
+    "restaurant.compression.CompressionMiddleware",
+    "restaurant.perf.PerfMiddleware",
+    "restaurant.replicas.ReplicaStickinessMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "debug_toolbar.middleware.DebugToolbarMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -65,6 +73,8 @@ MIDDLEWARE = [
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
     "corsheaders.middleware.CorsMiddleware",
 ]
+if not PRODUCTION:
+    INSTALLED_APPS.append("django_seed")
 CORS_ALLOW_ALL_ORIGINS = True
 
 CORS_ALLOWED_ORIGINS = [
@@ -103,6 +113,19 @@ TEMPLATES = [
     },
 ]
 
+if PRODUCTION:
+    # Compiled templates are kept for the life of the process
+    TEMPLATES[0]["APP_DIRS"] = False
+    TEMPLATES[0]["OPTIONS"]["loaders"] = [
+        (
+            "django.template.loaders.cached.Loader",
+            [
+                "django.template.loaders.filesystem.Loader",
+                "django.template.loaders.app_directories.Loader",
+            ],
+        )
+    ]
+
 WSGI_APPLICATION = "project.wsgi.application"
 
 
@@ -117,6 +140,73 @@ DATABASES = {
         "PASSWORD": os.getenv("DATABASE_PASSWORD"),
         "HOST": os.getenv("DATABASE_HOST"),
         "PORT": os.getenv("DATABASE_PORT"),
+        # SQLite tests default to a shared in-memory database, which cannot
+        # run the concurrent booking test; point this at a file to run it
+        "TEST": {"NAME": os.getenv("DATABASE_TEST_NAME")},
+    }
+}
+
+# In production a connection outlives the request: PostgreSQL takes it from a
+# psycopg pool, other databases keep it open for CONN_MAX_AGE seconds and
+# check it before reuse. Development opens one per request.
+if PRODUCTION:
+    if (
+        "postgresql" in (DATABASES["default"]["ENGINE"] or "")
+        and os.getenv("DATABASE_POOL", "True") == "True"
+    ):
+        DATABASES["default"]["OPTIONS"] = {
+            "pool": {
+                "min_size": int(os.getenv("DATABASE_POOL_MIN_SIZE", 2)),
+                "max_size": int(os.getenv("DATABASE_POOL_MAX_SIZE", 10)),
+                "timeout": int(os.getenv("DATABASE_POOL_TIMEOUT", 10)),
+            }
+        }
+    else:
+        DATABASES["default"]["CONN_MAX_AGE"] = int(os.getenv("CONN_MAX_AGE", 600))
+        DATABASES["default"]["CONN_HEALTH_CHECKS"] = True
+
+# Read replicas, as hosts (file paths for SQLite) of copies of the default
+# database; they serve the safe requests of the views using ReplicaReadMixin
+REPLICA_DATABASES = []
+for number, replica in enumerate(
+    filter(None, os.getenv("DATABASE_REPLICAS", "").split(",")), start=1
+):
+    alias = f"replica{number}"
+    key = "NAME" if "sqlite" in (DATABASES["default"]["ENGINE"] or "") else "HOST"
+    DATABASES[alias] = dict(
+        DATABASES["default"], **{key: replica}, TEST={"MIRROR": "default"}
+    )
+    REPLICA_DATABASES.append(alias)
+# Paid orders older than ARCHIVE_AFTER_DAYS are moved to the archive tables
+# by the archive_orders command; DATABASE_ARCHIVE_NAME (a file path for
+# SQLite) puts those tables in a database of their own
+ARCHIVE_AFTER_DAYS = int(os.getenv("ARCHIVE_AFTER_DAYS", 90))
+ARCHIVE_DATABASE = "default"
+if os.getenv("DATABASE_ARCHIVE_NAME"):
+    ARCHIVE_DATABASE = "archive"
+    DATABASES["archive"] = dict(
+        DATABASES["default"], NAME=os.getenv("DATABASE_ARCHIVE_NAME"), TEST={}
+    )
+DATABASE_ROUTERS = [
+    "restaurant.archive.ArchiveRouter",
+    "restaurant.replicas.ReplicaRouter",
+]
+# Seconds a client that wrote keeps reading from the primary
+REPLICA_STICKY_SECONDS = int(os.getenv("REPLICA_STICKY_SECONDS", 5))
+# Seconds a replica that failed is left alone
+REPLICA_RETRY_SECONDS = int(os.getenv("REPLICA_RETRY_SECONDS", 30))
+
+# Cache
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+# Use a shared backend (e.g. Redis or Memcached) when running several workers,
+# so a menu change invalidates the menu snapshot in all of them.
+
+CACHES = {
+    "default": {
+        "BACKEND": os.getenv(
+            "CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"
+        ),
+        "LOCATION": os.getenv("CACHE_LOCATION", ""),
     }
 }
 
@@ -160,3 +250,52 @@ STATIC_URL = "static/"
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
+
+# Seconds a response stored for an Idempotency-Key header is replayed
+IDEMPOTENCY_KEY_TTL = int(os.getenv("IDEMPOTENCY_KEY_TTL", 24 * 60 * 60))
+
+# Requests running more queries than this are logged as warnings
+PERF_QUERY_BUDGET = int(os.getenv("PERF_QUERY_BUDGET", 50))
+# Samples kept per endpoint for the percentiles on /api/_perf/
+PERF_WINDOW = int(os.getenv("PERF_WINDOW", 1000))
+
+# Change events pushed to /api/events/; the in-process broker suits a single
+# ASGI process and keeps the last "history" events for resuming clients
+EVENTS_BROKER = {
+    "BACKEND": os.getenv("EVENTS_BROKER", "restaurant.events.LocalBroker"),
+    "OPTIONS": {"history": int(os.getenv("EVENTS_HISTORY", 1000))},
+}
+# Seconds between keep-alive comments on an idle event stream
+EVENTS_KEEPALIVE = int(os.getenv("EVENTS_KEEPALIVE", 15))
+
+REST_FRAMEWORK = {
+    "DEFAULT_RENDERER_CLASSES": [
+        "rest_framework.renderers.JSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
+    "DEFAULT_PARSER_CLASSES": [
+        "rest_framework.parsers.JSONParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ],
+}
+# The browsable API is a development aid; production answers with JSON
+if PRODUCTION:
+    REST_FRAMEWORK["DEFAULT_RENDERER_CLASSES"].remove(
+        "rest_framework.renderers.BrowsableAPIRenderer"
+    )
+# MessagePack for clients that ask for it in Accept or Content-Type, when the
+# optional msgpack package is installed
+if find_spec("msgpack"):
+    REST_FRAMEWORK["DEFAULT_RENDERER_CLASSES"].append(
+        "restaurant.renderers.MessagePackRenderer"
+    )
+    REST_FRAMEWORK["DEFAULT_PARSER_CLASSES"].append(
+        "restaurant.renderers.MessagePackParser"
+    )
+
+# Responses of at least this many bytes are compressed with Brotli (with the
+# optional brotli package) or gzip, for clients that accept either
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", 1024))
+# Brotli's 11 is for static files; dynamic responses need a faster level
+COMPRESSION_BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", 5))
@@ -1,5 +1,10 @@
 from django.contrib import admin
+from django.db.models import Q
+from .search import search
 from .models import (
+    ArchivedOrder,
+    ArchivedOrderLine,
+    KitchenTicket,
     Table,
     Category,
     Menu,
@@ -7,6 +12,7 @@ from .models import (
     Waiter,
     Reception,
     Order,
+    OrderLine,
     Bill,
     Reservation,
 )
@@ -34,6 +40,7 @@ class MenuAdmin(admin.ModelAdmin):
     search_fields = ["name", "category__name"]
     autocomplete_fields = ["category"]
     list_per_page = 20
+    list_select_related = ["category"]
 
 
 @admin.register(MenuItem)
@@ -43,11 +50,22 @@ class MenuItemAdmin(admin.ModelAdmin):
     search_fields = ["name", "menu__category__name"]
     autocomplete_fields = ["menu"]
     list_per_page = 20
+    list_select_related = ["menu__category"]
 
     def get_category(self, obj):
         return obj.menu.category.name
     get_category.short_description = "Category"  # Changed from "Name" to "Category"
 
+    # Names go through the search index instead of a LIKE scan
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term:
+            return queryset, False
+        names = search(MenuItem.objects.all(), "name", search_term)
+        return queryset.filter(
+            Q(pk__in=names.values("pk"))
+            | Q(menu__category__name__icontains=search_term)
+        ), False
+
 
 
 @admin.register(Waiter)
@@ -62,17 +80,26 @@ class ReceptionAdmin(admin.ModelAdmin):
     list_per_page = 20
 
 
+class OrderLineInline(admin.TabularInline):
+    model = OrderLine
+    fields = ["menu_item", "quantity", "unit_price", "line_total"]
+    readonly_fields = ["unit_price", "line_total"]
+    autocomplete_fields = ["menu_item"]
+    extra = 1
+
+
 @admin.register(Order)
 class OrderAdmin(admin.ModelAdmin):
     list_display = ["table", "waiter", "total_price"]  # Add total_price here
     list_filter = ["waiter"]
     search_fields = ["table__number", "waiter__name"]
-    filter_horizontal = ("menu_items",)  # Allows for multi-select in admin
+    inlines = [OrderLineInline]  # Edit quantities per menu item
     list_per_page = 20
+    list_select_related = ["table", "waiter"]
 
-    # This method will call calculate_total and show it in the admin interface
+    # Totals are stored on the order and kept up to date by its lines
     def total_price(self, obj):
-        return obj.calculate_total()  # Call the Order model's method
+        return obj.total_amount
 
     total_price.short_description = "Total Price"
 
@@ -82,6 +109,16 @@ class BillAdmin(admin.ModelAdmin):
     list_filter = ["is_paid"]
     search_fields = ["order__id"]
     list_per_page = 20
+    # Order.__str__ shows the table number
+    list_select_related = ["order__table"]
+
+
+@admin.register(KitchenTicket)
+class KitchenTicketAdmin(admin.ModelAdmin):
+    list_display = ["order", "table", "status", "priority", "station"]
+    list_filter = ["status", "station"]
+    list_per_page = 20
+    list_select_related = ["order__table", "table"]
 
 
 @admin.register(Reservation)
@@ -95,3 +132,30 @@ class ReservationAdmin(admin.ModelAdmin):
     list_filter = ["is_confirmed"]
     search_fields = ["table__number", "customer_name"]
     list_per_page = 20
+    list_select_related = ["table"]
+
+
+class ArchivedOrderLineInline(admin.TabularInline):
+    model = ArchivedOrderLine
+    fields = ["menu_item_name", "quantity", "unit_price", "line_total"]
+    readonly_fields = fields
+    extra = 0
+
+
+# History only: archived orders are written by the archive_orders command
+@admin.register(ArchivedOrder)
+class ArchivedOrderAdmin(admin.ModelAdmin):
+    list_display = ["id", "table_number", "waiter_name", "total_amount", "paid_at"]
+    search_fields = ["=id", "waiter_name"]
+    date_hierarchy = "paid_at"
+    inlines = [ArchivedOrderLineInline]
+    list_per_page = 20
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
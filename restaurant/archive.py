@@ -0,0 +1,167 @@
+"""Archival of old paid orders, keeping the live order tables small.
+
+Orders whose bill was paid more than ``ARCHIVE_AFTER_DAYS`` ago are copied,
+with their bill and lines, into ``ArchivedOrder`` and ``ArchivedOrderLine``
+and deleted from the live tables, one batch per transaction, oldest payment
+first. The live API and admin then only ever see the recent orders; the
+archive is read through ``/api/ArchivedOrders/``.
+
+The archive tables live on the ``ARCHIVE_DATABASE`` alias, which
+``ArchiveRouter`` sends them to. On the default database a batch moves in
+one transaction. On a database of its own the copy commits before the live
+rows are deleted; a run stopped in between leaves copies that the next run
+overwrites, so ``archive_orders`` can always be run again to resume.
+"""
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.utils import timezone
+
+from . import events, reports
+from .models import (
+    ArchivedOrder,
+    ArchivedOrderLine,
+    Bill,
+    KitchenTicket,
+    Order,
+    OrderLine,
+)
+
+ARCHIVE_MODELS = {ArchivedOrder._meta.model_name, ArchivedOrderLine._meta.model_name}
+
+
+def get_archive_after_days():
+    return getattr(settings, "ARCHIVE_AFTER_DAYS", 90)
+
+
+def get_archive_database():
+    return getattr(settings, "ARCHIVE_DATABASE", DEFAULT_DB_ALIAS)
+
+
+def cutoff_for(days=None):
+    """Bills paid before this are archived."""
+    if days is None:
+        days = get_archive_after_days()
+    return timezone.now() - timedelta(days=days)
+
+
+def archivable(cutoff):
+    return Bill.objects.filter(is_paid=True, paid_at__lt=cutoff).order_by(
+        "paid_at", "id"
+    )
+
+
+def _copies(bills):
+    """Archive rows for ``bills``, which are locked by the caller."""
+    orders = Order.objects.select_related("table", "waiter").in_bulk(
+        [bill.order_id for bill in bills]
+    )
+    archived = []
+    for bill in bills:
+        order = orders[bill.order_id]
+        archived.append(
+            ArchivedOrder(
+                id=order.id,
+                table_id=order.table_id,
+                table_number=order.table.number,
+                waiter_id=order.waiter_id,
+                waiter_name=order.waiter.name,
+                total_amount=order.total_amount,
+                bill_id=bill.id,
+                paid_at=bill.paid_at,
+                created_at=order.created_at,
+                updated_at=order.updated_at,
+            )
+        )
+    lines = [
+        ArchivedOrderLine(
+            id=line.id,
+            order_id=line.order_id,
+            menu_item_id=line.menu_item_id,
+            menu_item_name=line.menu_item.name,
+            category_id=line.menu_item.menu.category_id,
+            quantity=line.quantity,
+            unit_price=line.unit_price,
+            line_total=line.line_total,
+        )
+        for line in OrderLine.objects.filter(order_id__in=list(orders)).select_related(
+            "menu_item__menu"
+        )
+    ]
+    return archived, lines
+
+
+@transaction.atomic
+def archive_batch(cutoff, batch_size=500):
+    """Move the ``batch_size`` oldest archivable orders; returns how many."""
+    bills = list(archivable(cutoff).select_for_update()[:batch_size])
+    if not bills:
+        return 0
+    archived, lines = _copies(bills)
+    order_ids = [order.id for order in archived]
+
+    database = get_archive_database()
+    with transaction.atomic(using=database):
+        # Copies left by a run stopped before the live rows were deleted
+        ArchivedOrder.objects.using(database).filter(pk__in=order_ids).delete()
+        ArchivedOrder.objects.using(database).bulk_create(archived)
+        ArchivedOrderLine.objects.using(database).bulk_create(lines)
+
+    # The related rows first, so deleting the orders finds nothing to cascade
+    OrderLine.objects.filter(order_id__in=order_ids).delete()
+    KitchenTicket.objects.filter(order_id__in=order_ids).delete()
+    # The archived copies keep counting in the sales rollups
+    with reports.retained():
+        Bill.objects.filter(pk__in=[bill.id for bill in bills]).delete()
+    # Without change events: one "deleted" event per archived order would
+    # push the recent events out of the history
+    with events.muted():
+        Order.objects.filter(pk__in=order_ids).delete()
+    return len(bills)
+
+
+def archive_orders(cutoff=None, batch_size=500, max_batches=None, progress=None):
+    """Archive every order paid before ``cutoff``; returns how many moved.
+
+    ``progress`` is called with the running total after each batch.
+    """
+    if cutoff is None:
+        cutoff = cutoff_for()
+    total = batches = 0
+    while max_batches is None or batches < max_batches:
+        moved = archive_batch(cutoff, batch_size)
+        if not moved:
+            break
+        total += moved
+        batches += 1
+        if progress is not None:
+            progress(total)
+    return total
+
+
+class ArchiveRouter:
+    """Keep the archive tables, and only them, on ``ARCHIVE_DATABASE``."""
+
+    def _database(self, model):
+        if model._meta.model_name in ARCHIVE_MODELS:
+            database = get_archive_database()
+            if database != DEFAULT_DB_ALIAS:
+                return database
+        return None
+
+    def db_for_read(self, model, **hints):
+        return self._database(model)
+
+    def db_for_write(self, model, **hints):
+        return self._database(model)
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        database = get_archive_database()
+        if database == DEFAULT_DB_ALIAS:
+            return None
+        archive_model = app_label == "restaurant" and model_name in ARCHIVE_MODELS
+        if db == database:
+            return archive_model
+        return False if archive_model else None
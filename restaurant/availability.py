@@ -0,0 +1,30 @@
+"""Which tables can seat a party of a given size for a given time slot."""
+
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from .models import Reservation, Table
+
+
+def available_tables(party_size, start=None, duration=None):
+    """Tables seating ``party_size`` that are free for ``[start, start + duration)``.
+
+    Runs as one query: a range on the indexed ``capacity`` column with a
+    ``NOT EXISTS`` probe of the ``(table, reservation_time)`` index per
+    candidate table. Without ``start`` the slot begins now, and only tables
+    that are currently ``Available`` qualify.
+    """
+    duration = duration or Reservation.DEFAULT_DURATION
+    walk_in = start is None
+    start = start or timezone.now()
+    end = start + duration
+
+    clashes = (
+        Reservation.objects.active()
+        .overlapping(start, end)
+        .filter(table=OuterRef("pk"))
+    )
+    tables = Table.objects.filter(capacity__gte=party_size).filter(~Exists(clashes))
+    if walk_in:
+        tables = tables.filter(status=Table.AVAILABLE)
+    return tables.order_by("capacity", "number")
@@ -0,0 +1,101 @@
+"""Benchmarks for the restaurant API.
+
+A benchmark is a function registered with ``@benchmark("name")``. It receives a
+``scale`` multiplier for its data sizes and returns a dict of measurements,
+possibly nested one level per endpoint. The ``benchmark`` management command
+runs them against a throwaway test database, so they never touch real data,
+and can save the results as JSON and compare them with a stored baseline.
+"""
+
+import importlib
+import time
+from contextlib import contextmanager
+
+BENCHMARK_MODULES = [
+    "restaurant.benchmarks.api",
+    "restaurant.benchmarks.archival",
+    "restaurant.benchmarks.concurrency",
+    "restaurant.benchmarks.kitchen",
+    "restaurant.benchmarks.orders",
+    "restaurant.benchmarks.payloads",
+    "restaurant.benchmarks.profiles",
+    "restaurant.benchmarks.reservations",
+]
+
+# How to read a metric when comparing runs, by the end of its name; other
+# metrics (sizes, counts) are not compared
+LOWER_IS_BETTER = ("_ms", "_seconds", "queries_per_request")
+HIGHER_IS_BETTER = ("_per_second", "speedup")
+
+REGISTRY = {}
+
+
+def benchmark(name):
+    """Register the decorated function as the benchmark ``name``."""
+
+    def decorator(func):
+        REGISTRY[name] = func
+        return func
+
+    return decorator
+
+
+def load_benchmarks():
+    for module in BENCHMARK_MODULES:
+        importlib.import_module(module)
+    return REGISTRY
+
+
+@contextmanager
+def timer():
+    """Measure the wall time of a block; read ``elapsed`` after it exits."""
+    result = {"elapsed": 0.0}
+    start = time.perf_counter()
+    try:
+        yield result
+    finally:
+        result["elapsed"] = time.perf_counter() - start
+
+
+def latency_summary(timings):
+    """p50/p99/max of a list of durations in milliseconds."""
+    timings = sorted(timings)
+    return {
+        "p50_ms": round(timings[(len(timings) - 1) // 2], 3),
+        "p99_ms": round(timings[max(0, -(-len(timings) * 99 // 100) - 1)], 3),
+        "max_ms": round(timings[-1], 3),
+    }
+
+
+def flatten(results, prefix=""):
+    """``{"a": {"b": 1}}`` -> ``{"a.b": 1}``."""
+    flat = {}
+    for key, value in results.items():
+        if isinstance(value, dict):
+            flat.update(flatten(value, f"{prefix}{key}."))
+        else:
+            flat[f"{prefix}{key}"] = value
+    return flat
+
+
+def compare(baseline, current):
+    """Compare two ``{benchmark: results}`` mappings metric by metric.
+
+    Yields ``(metric, old, new, change)`` for every comparable metric in both,
+    where ``change`` is the relative change in the "worse" direction: positive
+    means slower (or fewer requests per second).
+    """
+    old_metrics = flatten(baseline)
+    for metric, new in flatten(current).items():
+        old = old_metrics.get(metric)
+        if not isinstance(old, (int, float)) or not isinstance(new, (int, float)):
+            continue
+        if not old:
+            continue
+        if metric.endswith(LOWER_IS_BETTER):
+            change = (new - old) / old
+        elif metric.endswith(HIGHER_IS_BETTER):
+            change = (old - new) / old
+        else:
+            continue
+        yield metric, old, new, change
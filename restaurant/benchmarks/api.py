@@ -0,0 +1,120 @@
+import random
+import time
+from contextlib import ExitStack
+from datetime import timedelta
+
+from django.db import connections
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from restaurant.perf import QueryTimer
+
+from . import benchmark, latency_summary
+from .fixtures import (
+    order_payloads,
+    seed_catalog,
+    seed_orders,
+    seed_reservations,
+)
+
+
+def drive(client, requests, count, ok=(200, 201), warmup=5):
+    """Send ``count`` requests built by ``requests(i)`` and measure them.
+
+    ``requests`` returns ``(method, path, data)``; every response must have a
+    status in ``ok``. The first ``warmup`` requests are not measured.
+    """
+    timings = []
+    queries = 0
+    began = time.perf_counter()
+    for i in range(-warmup, count):
+        method, path, data = requests(i)
+        timer = QueryTimer()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(timer))
+            start = time.perf_counter()
+            if method == "get":
+                response = client.get(path, data)
+            else:
+                response = getattr(client, method)(path, data, format="json")
+            elapsed = time.perf_counter() - start
+        assert response.status_code in ok, (path, response.status_code)
+        if i < 0:
+            began = time.perf_counter()
+            continue
+        timings.append(elapsed * 1000)
+        queries += timer.queries
+    total = time.perf_counter() - began
+    return {
+        "requests": count,
+        "requests_per_second": round(count / total, 1),
+        **latency_summary(timings),
+        "queries_per_request": round(queries / count, 2),
+    }
+
+
+@benchmark("api")
+def api(scale=1.0):
+    """Drive the main read and write endpoints through the test client."""
+    rng = random.Random(0)
+    count = max(1, int(200 * scale))
+    tables, waiters, menu_items = seed_catalog(
+        tables=max(1, int(50 * scale)), menu_items=max(5, int(200 * scale))
+    )
+    orders = seed_orders(max(1, int(2000 * scale)), tables, waiters, menu_items)
+    seed_reservations(max(1, int(5000 * scale)), tables)
+    payloads = order_payloads(count + 5, tables, waiters, menu_items)
+    order_ids = [order.id for order in orders]
+    bill_ids = [order.bill.id for order in orders]
+    slot = timezone.now().replace(minute=0, second=0, microsecond=0)
+    client = APIClient()
+
+    endpoints = {
+        "orders_list": lambda i: ("get", "/api/Orders/", None),
+        "order_detail": lambda i: (
+            "get",
+            f"/api/Orders/{rng.choice(order_ids)}/",
+            None,
+        ),
+        "order_create": lambda i: ("post", "/api/Orders/", payloads[i]),
+        "bills_list": lambda i: ("get", "/api/Bills/", None),
+        "bills_list_sparse": lambda i: (
+            "get",
+            "/api/Bills/",
+            {"fields": "id,order,total_amount,is_paid"},
+        ),
+        "bill_detail": lambda i: (
+            "get",
+            f"/api/Bills/{rng.choice(bill_ids)}/",
+            None,
+        ),
+        "menus_list": lambda i: ("get", "/api/Menus/", None),
+        "menus_list_sparse": lambda i: (
+            "get",
+            "/api/Menus/",
+            {"fields": "id,name,price"},
+        ),
+        "menu_item_autocomplete": lambda i: (
+            "get",
+            "/api/MenuItems/",
+            {"q": f"dish {rng.randrange(100)}"},
+        ),
+        "menu_snapshot": lambda i: ("get", "/api/menu-snapshot/", None),
+        "available_tables": lambda i: (
+            "get",
+            "/api/Reservations/available-tables/",
+            {
+                "capacity": rng.randint(1, 8),
+                "time": (
+                    slot + timedelta(minutes=30 * rng.randrange(30 * 48))
+                ).isoformat(),
+            },
+        ),
+    }
+    results = {"orders": len(order_ids)}
+    for name, requests in endpoints.items():
+        # No free table is a 404, which is as valid an answer as a list
+        ok = (200, 404) if name == "available_tables" else (200, 201)
+        results[name] = drive(client, requests, count, ok=ok)
+    return results
@@ -0,0 +1,87 @@
+import random
+import time
+from datetime import timedelta
+
+from django.db.models import Sum
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from restaurant.archive import archive_orders
+from restaurant.models import Bill, Order
+
+from . import benchmark, latency_summary, timer
+from .api import drive
+from .fixtures import seed_catalog, seed_orders
+
+# Share of the orders paid long enough ago to be archived
+ARCHIVED_SHARE = 0.9
+
+
+def measure(func, count):
+    timings = []
+    for _ in range(count):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return latency_summary(timings)
+
+
+def hot_queries(rng, tables, waiters, count):
+    """Latency of the queries whose cost grows with the live order tables."""
+    client = APIClient()
+    return {
+        # The admin changelists count their rows
+        "orders_count": measure(lambda: Order.objects.count(), count),
+        "unpaid_bills": measure(
+            lambda: list(Bill.objects.filter(is_paid=False).values_list("id")), count
+        ),
+        "waiter_revenue": measure(
+            lambda: Order.objects.filter(waiter=rng.choice(waiters)).aggregate(
+                Sum("total_amount")
+            ),
+            count,
+        ),
+        "orders_list": drive(client, lambda i: ("get", "/api/Orders/", None), count),
+        "orders_by_table": drive(
+            client,
+            lambda i: (
+                "get",
+                "/api/Orders/",
+                {"search": rng.choice(tables).number},
+            ),
+            count,
+        ),
+    }
+
+
+@benchmark("archival")
+def archival(scale=1.0):
+    """Hot-table query latency before and after archiving old paid orders."""
+    rng = random.Random(0)
+    count = max(1, int(100 * scale))
+    tables, waiters, menu_items = seed_catalog()
+    orders = seed_orders(max(10, int(20_000 * scale)), tables, waiters, menu_items)
+    old = [order.id for order in orders[: int(len(orders) * ARCHIVED_SHARE)]]
+    Bill.objects.filter(order_id__in=old).update(
+        is_paid=True, paid_at=timezone.now() - timedelta(days=365)
+    )
+
+    before = hot_queries(rng, tables, waiters, count)
+    with timer() as elapsed:
+        archived = archive_orders()
+    after = hot_queries(rng, tables, waiters, count)
+
+    results = {
+        "orders": len(orders),
+        "archived": archived,
+        "archive_orders_per_second": round(archived / elapsed["elapsed"], 1),
+    }
+    for name in before:
+        results[name] = {
+            "before": before[name],
+            "after": after[name],
+            "p50_speedup": round(
+                before[name]["p50_ms"] / max(after[name]["p50_ms"], 0.001), 2
+            ),
+        }
+    return results
@@ -0,0 +1,140 @@
+import asyncio
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.test import AsyncClient, Client
+
+from . import benchmark, latency_summary
+from .fixtures import seed_catalog, seed_orders, seed_reservations
+
+# Requests in flight at once, for each server model
+CONCURRENCY = 16
+# Added to every query, standing in for the round trip to a database server
+# that the in-process test database does not have
+DB_LATENCY_MS = 1.0
+
+
+def _network_delay(execute, sql, params, many, context):
+    time.sleep(DB_LATENCY_MS / 1000)
+    return execute(sql, params, many, context)
+
+
+def _add_delay(connection, **kwargs):
+    if _network_delay not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_network_delay)
+
+
+def _remove_delay():
+    for connection in connections.all(initialized_only=True):
+        if _network_delay in connection.execute_wrappers:
+            connection.execute_wrappers.remove(_network_delay)
+
+
+def _summary(timings, elapsed):
+    return {
+        "requests_per_second": round(len(timings) / elapsed, 1),
+        **latency_summary(timings),
+    }
+
+
+def run_wsgi(paths):
+    """Serve ``paths`` from ``CONCURRENCY`` threads, like a threaded WSGI worker."""
+    timings = []
+    lock = threading.Lock()
+
+    def worker(chunk):
+        client = Client()
+        local = []
+        try:
+            for path, data in chunk:
+                start = time.perf_counter()
+                response = client.get(path, data)
+                local.append((time.perf_counter() - start) * 1000)
+                assert response.status_code in (200, 404), (path, response)
+        finally:
+            connections.close_all()
+        with lock:
+            timings.extend(local)
+
+    chunks = [paths[i::CONCURRENCY] for i in range(CONCURRENCY)]
+    start = time.perf_counter()
+    with ThreadPoolExecutor(CONCURRENCY) as executor:
+        list(executor.map(worker, chunks))
+    return _summary(timings, time.perf_counter() - start)
+
+
+def run_asgi(paths):
+    """Serve ``paths`` as ``CONCURRENCY`` concurrent tasks on one event loop."""
+    timings = []
+
+    async def worker(chunk):
+        client = AsyncClient()
+        for path, data in chunk:
+            start = time.perf_counter()
+            response = await client.get(path, data)
+            timings.append((time.perf_counter() - start) * 1000)
+            assert response.status_code in (200, 404), (path, response)
+
+    async def main():
+        chunks = [paths[i::CONCURRENCY] for i in range(CONCURRENCY)]
+        try:
+            await asyncio.gather(*(worker(chunk) for chunk in chunks))
+        finally:
+            # The ORM's connection lives on the thread sync_to_async runs on
+            await sync_to_async(connections.close_all)()
+
+    start = time.perf_counter()
+    asyncio.run(main())
+    return _summary(timings, time.perf_counter() - start)
+
+
+@benchmark("asgi")
+def asgi(scale=1.0):
+    """Throughput of the hot reads per process: WSGI threads against ASGI."""
+    rng = random.Random(0)
+    count = max(CONCURRENCY, int(400 * scale))
+    tables, waiters, menu_items = seed_catalog(
+        tables=max(1, int(50 * scale)), menu_items=max(5, int(100 * scale))
+    )
+    orders = seed_orders(max(1, int(1000 * scale)), tables, waiters, menu_items)
+    seed_reservations(max(1, int(2000 * scale)), tables)
+    order_ids = [order.id for order in orders]
+
+    endpoints = {
+        "tables_list": lambda: ("/api/Tables/", None),
+        "menus_list": lambda: ("/api/Menus/", None),
+        "menu_item_autocomplete": lambda: (
+            "/api/MenuItems/",
+            {"q": f"dish {rng.randrange(10)}"},
+        ),
+        "available_tables": lambda: (
+            "/api/Reservations/available-tables/",
+            {"capacity": rng.randint(1, 8)},
+        ),
+        "order_detail": lambda: (f"/api/Orders/{rng.choice(order_ids)}/", None),
+    }
+    results = {"concurrency": CONCURRENCY, "db_latency_ms": DB_LATENCY_MS}
+    connection_created.connect(_add_delay)
+    for connection in connections.all(initialized_only=True):
+        _add_delay(connection)
+    try:
+        for name, request in endpoints.items():
+            paths = [request() for _ in range(count)]
+            wsgi = run_wsgi(paths)
+            asgi = run_asgi(paths)
+            results[name] = {
+                "wsgi": wsgi,
+                "asgi": asgi,
+                "asgi_speedup": round(
+                    asgi["requests_per_second"] / wsgi["requests_per_second"], 2
+                ),
+            }
+    finally:
+        connection_created.disconnect(_add_delay)
+        _remove_delay()
+    return results
@@ -0,0 +1,103 @@
+"""Seed data shared by the benchmarks."""
+
+import random
+from datetime import timedelta
+from decimal import Decimal
+
+from django.utils import timezone
+
+from restaurant.models import (
+    Category,
+    Menu,
+    MenuItem,
+    Order,
+    Reservation,
+    Table,
+    Waiter,
+)
+
+
+def seed_catalog(tables=20, waiters=5, menu_items=50, seed=0):
+    """Create tables, waiters and a menu; return ``(tables, waiters, items)``."""
+    rng = random.Random(seed)
+    category = Category.objects.create(name="Benchmark")
+    menu = Menu.objects.create(
+        name="Benchmark", price=Decimal("1.00"), category=category
+    )
+    table_objs = Table.objects.bulk_create(
+        [
+            Table(number=number, capacity=rng.randint(2, 8))
+            for number in range(1, tables + 1)
+        ]
+    )
+    waiter_objs = Waiter.objects.bulk_create(
+        [Waiter(name=f"Waiter {i}", age=rng.randint(18, 60)) for i in range(waiters)]
+    )
+    item_objs = MenuItem.objects.bulk_create(
+        [
+            MenuItem(
+                menu=menu,
+                name=f"Dish {i}",
+                price=Decimal(rng.randint(100, 3000)) / 100,
+            )
+            for i in range(menu_items)
+        ]
+    )
+    return table_objs, waiter_objs, item_objs
+
+
+def order_payloads(count, tables, waiters, menu_items, seed=0):
+    """Build ``count`` order request bodies referencing the seeded catalog."""
+    rng = random.Random(seed)
+    return [
+        {
+            "table": rng.choice(tables).id,
+            "waiter": rng.choice(waiters).id,
+            "lines": [
+                {"menu_item": menu_item.id, "quantity": rng.randint(1, 3)}
+                for menu_item in rng.sample(menu_items, rng.randint(1, 5))
+            ],
+        }
+        for _ in range(count)
+    ]
+
+
+def seed_orders(count, tables, waiters, menu_items, seed=0):
+    """Insert ``count`` orders together with their lines and bills."""
+    rng = random.Random(seed)
+    return Order.bulk_create_with_lines(
+        [
+            (
+                Order(table=rng.choice(tables), waiter=rng.choice(waiters)),
+                {
+                    menu_item: rng.randint(1, 3)
+                    for menu_item in rng.sample(menu_items, rng.randint(1, 5))
+                },
+            )
+            for _ in range(count)
+        ]
+    )
+
+
+def seed_reservations(count, tables, days=30, seed=0):
+    """Book ``count`` two-hour reservations over the next ``days`` days."""
+    rng = random.Random(seed)
+    origin = timezone.now().replace(minute=0, second=0, microsecond=0)
+    # A table cannot have two active bookings starting at the same time
+    slots = set()
+    count = min(count, len(tables) * days * 48)
+    while len(slots) < count:
+        slots.add((rng.randrange(len(tables)), rng.randrange(days * 48)))
+    reservations = []
+    for i, (table, slot) in enumerate(sorted(slots)):
+        start = origin + timedelta(minutes=30 * slot)
+        reservations.append(
+            Reservation(
+                table=tables[table],
+                customer_name=f"Guest {i}",
+                reservation_time=start,
+                duration=Reservation.DEFAULT_DURATION,
+                end_time=start + Reservation.DEFAULT_DURATION,
+            )
+        )
+    return Reservation.objects.bulk_create(reservations, batch_size=5000)
@@ -0,0 +1,53 @@
+import random
+
+from rest_framework.test import APIClient
+
+from restaurant import kitchen
+from restaurant.models import KitchenTicket
+
+from . import benchmark, timer
+from .api import drive
+from .fixtures import seed_catalog, seed_orders
+
+# Queue lengths the next-tickets read is timed at, before scaling
+QUEUE_SIZES = (1_000, 10_000, 50_000)
+
+
+@benchmark("kitchen")
+def kitchen_queue(scale=1.0):
+    """Next-tickets latency as the queue grows, and claim throughput."""
+    rng = random.Random(0)
+    count = max(1, int(100 * scale))
+    client = APIClient()
+    tables, waiters, menu_items = seed_catalog()
+    results = {}
+    seeded = 0
+    for size in QUEUE_SIZES:
+        size = max(10, int(size * scale))
+        seed_orders(size - seeded, tables, waiters, menu_items, seed=size)
+        seeded = size
+        # Some tickets jump the queue
+        KitchenTicket.objects.filter(
+            pk__in=rng.sample(
+                list(KitchenTicket.objects.values_list("id", flat=True)), size // 100
+            )
+        ).update(priority=1)
+        results[f"queue_{size}"] = {
+            "next_10": drive(
+                client,
+                lambda i: ("get", "/api/KitchenTickets/next/", {"limit": 10}),
+                count,
+            ),
+            "batches": drive(
+                client,
+                lambda i: ("get", "/api/KitchenTickets/batches/", None),
+                max(1, count // 10),
+            ),
+        }
+
+    claims = max(10, int(1_000 * scale))
+    with timer() as elapsed:
+        for i in range(claims):
+            kitchen.claim(f"station {i % 4}")
+    results["claims_per_second"] = round(claims / elapsed["elapsed"], 1)
+    return results
@@ -0,0 +1,33 @@
+from rest_framework.test import APIClient
+
+from restaurant.models import Order
+
+from . import benchmark, timer
+from .fixtures import order_payloads, seed_catalog
+
+
+@benchmark("bulk_orders")
+def bulk_orders(scale=1.0):
+    """Compare replaying orders one POST at a time with one bulk POST."""
+    count = max(1, int(500 * scale))
+    tables, waiters, menu_items = seed_catalog()
+    payloads = order_payloads(count, tables, waiters, menu_items)
+    client = APIClient()
+
+    with timer() as sequential:
+        for payload in payloads:
+            client.post("/api/Orders/", payload, format="json")
+    Order.objects.all().delete()
+
+    with timer() as bulk:
+        response = client.post("/api/Orders/bulk/", payloads, format="json")
+    assert response.status_code == 201, response.data
+
+    return {
+        "orders": count,
+        "sequential_seconds": round(sequential["elapsed"], 4),
+        "bulk_seconds": round(bulk["elapsed"], 4),
+        "sequential_orders_per_second": round(count / sequential["elapsed"], 1),
+        "bulk_orders_per_second": round(count / bulk["elapsed"], 1),
+        "speedup": round(sequential["elapsed"] / bulk["elapsed"], 1),
+    }
@@ -0,0 +1,62 @@
+import time
+
+from rest_framework.renderers import JSONRenderer
+
+from restaurant import compression, renderers
+from restaurant.fieldsets import with_related
+from restaurant.models import Order
+from restaurant.serializers import OrderSerializer
+
+from . import benchmark
+from .fixtures import seed_catalog, seed_orders
+
+# Renders and compressions timed per format; the fastest counts
+REPEAT = 5
+
+
+def cpu_ms(func, *args):
+    """Lowest CPU time of ``REPEAT`` calls to ``func``, and its result."""
+    best = None
+    for _ in range(REPEAT):
+        start = time.process_time()
+        result = func(*args)
+        elapsed = (time.process_time() - start) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return round(best, 3), result
+
+
+@benchmark("payloads")
+def payloads(scale=1.0):
+    """Bytes on the wire and CPU time of each renderer for a long order list.
+
+    The orders are serialized once; each renderer then turns the same data
+    into a body, which is compressed as ``CompressionMiddleware`` would.
+    """
+    count = max(1, int(5000 * scale))
+    tables, waiters, menu_items = seed_catalog()
+    seed_orders(count, tables, waiters, menu_items)
+    queryset = with_related(Order.objects.all(), OrderSerializer())
+    data = OrderSerializer(queryset, many=True).data
+
+    formats = {"json": JSONRenderer()}
+    if renderers.msgpack is not None:
+        formats["msgpack"] = renderers.MessagePackRenderer()
+    encodings = ["gzip"] + (["br"] if compression.brotli is not None else [])
+
+    results = {"orders": count}
+    for name, renderer in formats.items():
+        render_ms, body = cpu_ms(renderer.render, data)
+        result = {"bytes": len(body), "render_cpu_ms": render_ms}
+        for encoding in encodings:
+            compress_ms, compressed = cpu_ms(compression.compress, body, encoding)
+            result[f"{encoding}_bytes"] = len(compressed)
+            result[f"{encoding}_cpu_ms"] = compress_ms
+        results[name] = result
+    if "msgpack" in results:
+        results["msgpack_bytes_ratio"] = round(
+            results["msgpack"]["bytes"] / results["json"]["bytes"], 2
+        )
+        results["msgpack_render_speedup"] = round(
+            results["json"]["render_cpu_ms"] / results["msgpack"]["render_cpu_ms"], 2
+        )
+    return results
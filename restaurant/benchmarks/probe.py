@@ -0,0 +1,69 @@
+"""Startup time and per-request cost of the settings in the environment.
+
+Run by the ``settings_profiles`` benchmark as ``python -m
+restaurant.benchmarks.probe REQUESTS`` in a fresh interpreter, once per
+settings profile; prints its measurements as JSON. Requests go through the
+WSGI handler itself rather than the test client, so the connection handling
+between requests is the one a server gets.
+"""
+
+import json
+import os
+import sys
+import time
+from wsgiref.util import setup_testing_defaults
+
+PATHS = {
+    "tables_list": "/api/Tables/",
+    "menu_snapshot": "/api/menu-snapshot/",
+}
+
+
+def get(application, path):
+    environ = {"PATH_INFO": path, "REQUEST_METHOD": "GET"}
+    setup_testing_defaults(environ)
+    statuses = []
+    response = application(environ, lambda status, headers: statuses.append(status))
+    try:
+        b"".join(response)
+    finally:
+        response.close()  # Sends request_finished, like a server
+    assert statuses[0].startswith("200"), (path, statuses[0])
+
+
+def main(requests):
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "project.settings")
+    start = time.perf_counter()
+    from django.core.wsgi import get_wsgi_application
+
+    application = get_wsgi_application()
+    startup = time.perf_counter() - start
+
+    from django.test.utils import setup_databases, teardown_databases
+
+    from restaurant.benchmarks import latency_summary
+    from restaurant.benchmarks.fixtures import seed_catalog
+
+    old_config = setup_databases(verbosity=0, interactive=False)
+    try:
+        seed_catalog(tables=20, menu_items=50)
+        start = time.perf_counter()
+        get(application, PATHS["tables_list"])
+        results = {
+            "startup_ms": round(startup * 1000, 1),
+            "first_request_ms": round((time.perf_counter() - start) * 1000, 1),
+        }
+        for name, path in PATHS.items():
+            timings = []
+            for _ in range(requests):
+                start = time.perf_counter()
+                get(application, path)
+                timings.append((time.perf_counter() - start) * 1000)
+            results[name] = latency_summary(timings)
+    finally:
+        teardown_databases(old_config, verbosity=0)
+    print(json.dumps(results))
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]))
@@ -0,0 +1,54 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+from django.conf import settings
+
+from . import benchmark
+
+PROFILES = ("development", "production")
+
+
+def probe(profile, requests, database):
+    """Run ``restaurant.benchmarks.probe`` under ``profile`` in a new process."""
+    env = dict(
+        os.environ,
+        SETTINGS_PROFILE=profile,
+        DEBUG="False",
+        ALLOWED_HOSTS="127.0.0.1",
+        # A database file, so that opening a connection costs what it does
+        # outside of tests
+        DATABASE_TEST_NAME=database,
+    )
+    output = subprocess.run(
+        [sys.executable, "-m", "restaurant.benchmarks.probe", str(requests)],
+        cwd=settings.BASE_DIR,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+@benchmark("settings_profiles")
+def settings_profiles(scale=1.0):
+    """Startup and per-request overhead of the development and production settings.
+
+    Each profile runs in its own interpreter, so startup includes importing
+    Django and the apps the profile installs.
+    """
+    requests = max(10, int(500 * scale))
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        for profile in PROFILES:
+            database = os.path.join(directory, f"{profile}.sqlite3")
+            results[profile] = probe(profile, requests, database)
+    development, production = results["development"], results["production"]
+    for name in ("tables_list", "menu_snapshot"):
+        results[f"{name}_p50_speedup"] = round(
+            development[name]["p50_ms"] / production[name]["p50_ms"], 2
+        )
+    return results
@@ -0,0 +1,45 @@
+import random
+import time
+from datetime import timedelta
+
+from django.utils import timezone
+
+from restaurant.availability import available_tables
+from restaurant.models import Table
+
+from . import benchmark, latency_summary
+from .fixtures import seed_reservations
+
+
+@benchmark("availability")
+def availability(scale=1.0):
+    """Time the available-tables query over a large reservation book."""
+    table_count = max(1, int(500 * scale))
+    reservation_count = max(1, int(100_000 * scale))
+    rng = random.Random(0)
+    tables = Table.objects.bulk_create(
+        [
+            Table(number=number, capacity=rng.randint(2, 10))
+            for number in range(1, table_count + 1)
+        ]
+    )
+
+    # Two-hour bookings spread over a year, built without Reservation.save()
+    seed_reservations(reservation_count, tables, days=365)
+    origin = timezone.now().replace(minute=0, second=0, microsecond=0)
+
+    list(available_tables(1, origin))  # Warm up caches before timing
+    timings = []
+    for _ in range(200):
+        start = origin + timedelta(minutes=30 * rng.randrange(365 * 48))
+        began = time.perf_counter()
+        found = list(available_tables(rng.randint(1, 8), start))
+        timings.append((time.perf_counter() - began) * 1000)
+
+    return {
+        "tables": table_count,
+        "reservations": reservation_count,
+        "queries": len(timings),
+        "last_result_size": len(found),
+        **latency_summary(timings),
+    }
@@ -0,0 +1,99 @@
+"""Coalesced recalculation of bill totals.
+
+Anything that can change a bill total marks the bill's order as dirty with
+``schedule_bill_recalculation``. Dirty ids are collected per database
+connection and flushed when the surrounding transaction commits, so a request
+that touches an order several times still recalculates its bill once. The
+flush is a single UPDATE for every dirty bill.
+"""
+
+import threading
+from decimal import Decimal
+
+from django.db import DEFAULT_DB_ALIAS, models
+from django.db.models import OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+from .transactions import collect_on_commit
+
+
+class RecalculationStats:
+    """Counts how much recalculation work has run, for tests and profiling."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.flushes = 0  # UPDATE statements issued
+            self.bills = 0  # bill ids passed to those statements
+
+    def record(self, bill_count):
+        with self._lock:
+            self.flushes += 1
+            self.bills += bill_count
+
+
+stats = RecalculationStats()
+
+_PENDING_ATTR = "_pending_bill_recalculations"
+
+
+class PendingRecalculations:
+    """Order ids waiting for the current transaction on one connection to commit."""
+
+    def __init__(self, using):
+        self.using = using
+        self.order_ids = set()
+        self.flushed = False
+
+    def flush(self):
+        self.flushed = True
+        _recalculate(self.order_ids, self.using)
+
+
+def schedule_bill_recalculation(order_id, using=None):
+    """Recalculate the bill of ``order_id`` once the transaction commits.
+
+    Outside of a transaction the recalculation runs immediately.
+    """
+    collect_on_commit(
+        _PENDING_ATTR,
+        PendingRecalculations,
+        lambda pending: pending.order_ids.add(order_id),
+        using,
+    )
+
+
+def _recalculate(order_ids, using):
+    """Write the totals of the bills of ``order_ids`` with one UPDATE."""
+    from .models import Bill, OrderLine
+
+    if not order_ids:
+        return 0
+
+    line_totals = (
+        OrderLine.objects.filter(order_id=OuterRef("order_id"))
+        .values("order_id")
+        .annotate(total=Sum("line_total"))
+        .values("total")
+    )
+    updated = (
+        Bill.objects.using(using)
+        .filter(order_id__in=list(order_ids))
+        .update(
+            total_amount=Coalesce(
+                Subquery(line_totals),
+                Value(Decimal("0.00")),
+                output_field=models.DecimalField(max_digits=10, decimal_places=2),
+            )
+        )
+    )
+    stats.record(len(order_ids))
+    return updated
+
+
+def recalculate_bills(order_ids, using=None):
+    """Recalculate the bills of ``order_ids`` right away with one UPDATE."""
+    return _recalculate(set(order_ids), using or DEFAULT_DB_ALIAS)
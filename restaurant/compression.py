@@ -0,0 +1,107 @@
+"""Brotli or gzip compression of large responses.
+
+Like Django's ``GZipMiddleware``, but responses shorter than
+``COMPRESSION_MIN_SIZE`` bytes are sent as they are, since compressing them
+costs more CPU than the bytes it saves, and clients that accept Brotli get it
+when the optional ``brotli`` package is installed. Streaming responses (the
+exports and the event stream) are never compressed: their length is unknown
+up front and a compressor would hold back events until its buffer fills.
+"""
+
+import re
+
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.text import compress_string
+
+from .middleware import BaseMiddleware
+
+try:
+    import brotli
+except ImportError:  # Optional; gzip is used without it
+    brotli = None
+
+# Random bytes in the gzip header, as GZipMiddleware adds against BREACH
+MAX_RANDOM_BYTES = 100
+
+# A q-value: 0 to 1 with up to three decimals (RFC 9110, section 12.4.2)
+_quality = re.compile(r"^q=(0(?:\.\d{0,3})?|1(?:\.0{0,3})?)$")
+
+
+def get_min_size():
+    return getattr(settings, "COMPRESSION_MIN_SIZE", 1024)
+
+
+def get_brotli_quality():
+    return getattr(settings, "COMPRESSION_BROTLI_QUALITY", 5)
+
+
+def accepted_encodings(accept_encoding):
+    """``{coding: q}`` of an ``Accept-Encoding`` header, without ``q=0``.
+
+    ``*`` stands for the codings the header does not name. An entry with a
+    malformed q-value is ignored.
+    """
+    qualities = {}
+    for entry in accept_encoding.lower().split(","):
+        coding, *params = [part.strip() for part in entry.split(";")]
+        if not coding:
+            continue
+        q = 1.0
+        for param in params:
+            if param.startswith("q="):
+                match = _quality.match(param)
+                q = float(match.group(1)) if match else None
+        if q is not None:
+            qualities[coding] = q
+    wildcard = qualities.pop("*", 0)
+    return {
+        coding: qualities.get(coding, wildcard)
+        for coding in ("br", "gzip")
+        if qualities.get(coding, wildcard) > 0
+    }
+
+
+def choose_encoding(accept_encoding):
+    """``"br"``, ``"gzip"`` or None for an ``Accept-Encoding`` header.
+
+    The coding the client weighs highest wins; Brotli breaks a tie.
+    """
+    accepted = accepted_encodings(accept_encoding)
+    if brotli is None:
+        accepted.pop("br", None)
+    if not accepted:
+        return None
+    return max(("br", "gzip"), key=lambda coding: accepted.get(coding, -1))
+
+
+def compress(content, encoding):
+    if encoding == "br":
+        return brotli.compress(content, quality=get_brotli_quality())
+    return compress_string(content, max_random_bytes=MAX_RANDOM_BYTES)
+
+
+class CompressionMiddleware(BaseMiddleware):
+    def process_response(self, request, response):
+        if response.streaming or response.has_header("Content-Encoding"):
+            return response
+        # The response depends on Accept-Encoding even when it is too short
+        # to compress: a longer one for the same URL may not be
+        patch_vary_headers(response, ("Accept-Encoding",))
+        if len(response.content) < get_min_size():
+            return response
+        encoding = choose_encoding(request.headers.get("Accept-Encoding", ""))
+        if encoding is None:
+            return response
+
+        compressed = compress(response.content, encoding)
+        if len(compressed) >= len(response.content):
+            return response
+        response.content = compressed
+        response.headers["Content-Length"] = str(len(compressed))
+        response.headers["Content-Encoding"] = encoding
+        # The compressed body differs from the one a strong ETag names
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response.headers["ETag"] = "W/" + etag
+        return response
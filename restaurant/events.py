@@ -0,0 +1,236 @@
+"""Change events for tables, orders, bills and tickets, pushed to live clients.
+
+Code that changes one of these rows calls ``notify(kind, pk)``. Notifications
+are collected per database connection, like bill recalculations, and
+published once the transaction commits: one event per changed row, carrying
+the row as it was committed. Events get increasing sequence numbers, so a
+client can resume from the last one it saw.
+
+The broker is set by ``EVENTS_BROKER``. ``LocalBroker`` keeps events in
+process memory, which suits a single ASGI process; a broker shared between
+processes needs the same ``publish``, ``since`` and ``wait`` methods.
+"""
+
+import asyncio
+import threading
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from itertools import islice
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+from django.utils.module_loading import import_string
+
+from .transactions import collect_on_commit
+
+DEFAULT_BROKER = {"BACKEND": "restaurant.events.LocalBroker", "OPTIONS": {}}
+
+CREATED, UPDATED, DELETED = "created", "updated", "deleted"
+
+_muted = ContextVar("events_muted", default=False)
+
+
+def _wake(future):
+    if not future.done():
+        future.set_result(None)
+
+
+class LocalBroker:
+    """In-process event log with a bounded history.
+
+    Waiting subscribers are futures on their event loop; a publish resolves
+    them and otherwise nothing runs for an idle subscriber.
+    """
+
+    def __init__(self, history=1000):
+        self._lock = threading.Lock()
+        self._events = deque(maxlen=history)
+        self._seq = 0
+        self._waiters = set()
+
+    @property
+    def last_seq(self):
+        return self._seq
+
+    def publish(self, kind, action, data):
+        with self._lock:
+            self._seq += 1
+            event = {"seq": self._seq, "type": kind, "action": action, "data": data}
+            self._events.append(event)
+            waiters, self._waiters = self._waiters, set()
+        for loop, future in waiters:
+            loop.call_soon_threadsafe(_wake, future)
+        return event
+
+    def _since(self, seq):
+        if seq > self._seq:
+            # A sequence number from another process or an earlier run
+            return None
+        first = self._events[0]["seq"] if self._events else self._seq + 1
+        if seq + 1 < first:
+            return None  # Some events in between are gone
+        return list(islice(self._events, seq + 1 - first, None))
+
+    def since(self, seq):
+        """Events after ``seq``, or None if the client has to start over."""
+        with self._lock:
+            return self._since(seq)
+
+    async def wait(self, seq, timeout):
+        """Like ``since``, but wait up to ``timeout`` seconds for an event."""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            events = self._since(seq)
+            if events != []:
+                return events
+            future = loop.create_future()
+            waiter = (loop, future)
+            self._waiters.add(waiter)
+        try:
+            await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            with self._lock:
+                self._waiters.discard(waiter)
+            return []
+        return self.since(seq)
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    global _broker
+    with _broker_lock:
+        if _broker is None:
+            config = getattr(settings, "EVENTS_BROKER", DEFAULT_BROKER)
+            _broker = import_string(config["BACKEND"])(**config.get("OPTIONS", {}))
+        return _broker
+
+
+def reset_broker():
+    global _broker
+    with _broker_lock:
+        _broker = None
+
+
+def _snapshots(kind, pks, using):
+    """The committed rows of ``kind`` as plain dicts, by primary key."""
+    from .models import Bill, KitchenTicket, Order, OrderLine, Table
+
+    if kind == "table":
+        rows = (
+            Table.objects.using(using)
+            .filter(pk__in=pks)
+            .values("id", "number", "capacity", "status", "updated_at")
+        )
+        return {row["id"]: row for row in rows}
+    if kind == "ticket":
+        rows = (
+            KitchenTicket.objects.using(using)
+            .filter(pk__in=pks)
+            .values(
+                "id",
+                "order_id",
+                "table_id",
+                "status",
+                "priority",
+                "station",
+                "updated_at",
+            )
+        )
+        return {row["id"]: row for row in rows}
+    if kind == "bill":
+        rows = (
+            Bill.objects.using(using)
+            .filter(pk__in=pks)
+            .values(
+                "id", "order_id", "total_amount", "is_paid", "paid_at", "updated_at"
+            )
+        )
+        return {row["id"]: row for row in rows}
+
+    rows = {
+        row["id"]: dict(row, lines=[])
+        for row in Order.objects.using(using)
+        .filter(pk__in=pks)
+        .values("id", "table_id", "waiter_id", "total_amount", "updated_at")
+    }
+    lines = (
+        OrderLine.objects.using(using)
+        .filter(order_id__in=pks)
+        .order_by("order_id", "id")
+        .values("order_id", "menu_item_id", "quantity")
+    )
+    for line in lines:
+        order = rows.get(line.pop("order_id"))
+        if order is not None:
+            order["lines"].append(line)
+    return rows
+
+
+_PENDING_ATTR = "_pending_events"
+
+
+class PendingEvents:
+    """Rows notified in the current transaction on one connection."""
+
+    def __init__(self, using):
+        self.using = using
+        self.actions = {}  # (kind, pk) -> action, in notification order
+        self.flushed = False
+
+    def add(self, kind, pk, action):
+        key = (kind, pk)
+        previous = self.actions.pop(key, None)
+        if previous == CREATED and action == UPDATED:
+            action = CREATED
+        self.actions[key] = action
+
+    def flush(self):
+        self.flushed = True
+        publish_changes(self.actions, self.using)
+
+
+def publish_changes(actions, using=DEFAULT_DB_ALIAS):
+    """Publish one event per ``(kind, pk) -> action``, reading the rows once."""
+    broker = get_broker()
+    by_kind = {}
+    for (kind, pk), action in actions.items():
+        if action != DELETED:
+            by_kind.setdefault(kind, []).append(pk)
+    rows = {kind: _snapshots(kind, pks, using) for kind, pks in by_kind.items()}
+
+    for (kind, pk), action in actions.items():
+        data = rows.get(kind, {}).get(pk)
+        if data is None:
+            # Deleted, possibly after being changed in the same transaction
+            action, data = DELETED, {"id": pk}
+        broker.publish(kind, action, data)
+
+
+@contextmanager
+def muted():
+    """Drop the notifications sent in the block, for housekeeping."""
+    token = _muted.set(True)
+    try:
+        yield
+    finally:
+        _muted.reset(token)
+
+
+def notify(kind, pk, action=UPDATED, using=None):
+    """Publish the row ``pk`` of ``kind`` once the transaction commits.
+
+    ``kind`` is ``"table"``, ``"order"``, ``"bill"`` or ``"ticket"``. Outside of a
+    transaction the event is published immediately; inside ``muted()``, never.
+    """
+    if _muted.get():
+        return
+    collect_on_commit(
+        _PENDING_ATTR,
+        PendingEvents,
+        lambda pending: pending.add(kind, pk, action),
+        using,
+    )
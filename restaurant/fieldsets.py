@@ -0,0 +1,161 @@
+"""Sparse fieldsets: ``?fields=`` and ``?expand=`` on the API's reads.
+
+``fields`` lists the fields a client wants, ``expand`` the nested objects it
+wants rendered in full; dotted names reach into nested serializers, as in
+``?fields=id,order.id,order.total_price``. Serializers that use
+``SparseFieldsetMixin`` drop the other fields, including their method fields
+and relations, and ``SparseQuerysetMixin`` joins and prefetches only the
+relations the remaining fields read.
+"""
+
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import serializers
+
+
+def parse_paths(value):
+    """``"id,order.id"`` -> ``{"id": {}, "order": {"id": {}}}``.
+
+    An empty subtree stands for every field below that name.
+    """
+    tree = {}
+    for path in value.split(","):
+        node = tree
+        for name in filter(None, path.strip().split(".")):
+            node = node.setdefault(name, {})
+    return tree
+
+
+def requested_selection(request):
+    """``(fields, expand)`` trees from ``?fields=`` and ``?expand=``, or None.
+
+    Only reads select fields: a write is validated against all of them.
+    """
+    if request is None or request.method not in ("GET", "HEAD"):
+        return None
+    params = request.query_params
+    if "fields" not in params and "expand" not in params:
+        return None
+    return parse_paths(params.get("fields", "")), parse_paths(params.get("expand", ""))
+
+
+class SparseFieldsetMixin:
+    """Fields picked by ``?fields=`` and nesting picked by ``?expand=``.
+
+    Without either parameter the serializer renders every field. With one of
+    them, ``fields`` keeps only the named fields (all of them if it is empty)
+    and nested serializers render as primary keys unless they are named in
+    ``expand``. A dotted name such as ``order.id`` picks a field of a nested
+    serializer, which also expands it.
+    """
+
+    # Set by the parent serializer on nested serializers
+    selection = None
+
+    def is_top_level(self):
+        parent = self.parent
+        return parent is None or (
+            isinstance(parent, serializers.ListSerializer) and parent.parent is None
+        )
+
+    def get_fields(self):
+        fields = super().get_fields()
+        selection = self.selection
+        if selection is None and self.is_top_level():
+            selection = requested_selection(self.context.get("request"))
+        if selection is None:
+            return fields
+        only, expand = selection
+
+        nested = {
+            name: getattr(field, "child", field)
+            for name, field in fields.items()
+            if isinstance(getattr(field, "child", field), serializers.BaseSerializer)
+        }
+        errors = {}
+        unknown = [
+            name
+            for name, subfields in only.items()
+            if name not in fields or (subfields and name not in nested)
+        ]
+        if unknown:
+            errors["fields"] = [f"Unknown field: {name}." for name in unknown]
+        unknown = [name for name in expand if name not in nested]
+        if unknown:
+            errors["expand"] = [
+                f"Field cannot be expanded: {name}." for name in unknown
+            ]
+        if errors:
+            raise serializers.ValidationError(errors)
+
+        if only:
+            fields = {name: field for name, field in fields.items() if name in only}
+        for name, serializer in nested.items():
+            if name not in fields:
+                continue
+            if name in expand or only.get(name):
+                serializer.selection = (only.get(name, {}), expand.get(name, {}))
+            else:
+                field = fields[name]
+                fields[name] = serializers.PrimaryKeyRelatedField(
+                    read_only=True,
+                    many=isinstance(field, serializers.ListSerializer),
+                    source=field.source,
+                )
+        return fields
+
+
+def related_lookups(serializer, model=None, prefix="", many=False):
+    """``(select_related, prefetch_related)`` lookups ``serializer`` reads.
+
+    Follows the relations behind the serializer's fields, including nested
+    serializers and dotted sources, and skips relations only rendered as a
+    primary key, which are read from the foreign key column.
+    """
+    model = model or serializer.Meta.model
+    select, prefetch = [], []
+    for field in serializer.fields.values():
+        if field.write_only or field.source == "*":
+            continue
+        child = getattr(field, "child", field)
+        current, path, to_many = model, prefix, many
+        for index, attr in enumerate(field.source_attrs):
+            try:
+                relation = current._meta.get_field(attr)
+            except FieldDoesNotExist:
+                break
+            last = index == len(field.source_attrs) - 1
+            if not relation.is_relation or (
+                last
+                and isinstance(field, serializers.PrimaryKeyRelatedField)
+                and not (relation.many_to_many or relation.one_to_many)
+            ):
+                break
+            path = f"{path}__{attr}" if path else attr
+            to_many = to_many or relation.many_to_many or relation.one_to_many
+            (prefetch if to_many else select).append(path)
+            current = relation.related_model
+            if last and isinstance(child, serializers.ModelSerializer):
+                nested_select, nested_prefetch = related_lookups(
+                    child, current, path, to_many
+                )
+                select += nested_select
+                prefetch += nested_prefetch
+    return select, prefetch
+
+
+def with_related(queryset, serializer):
+    """``queryset`` joining and prefetching what ``serializer`` reads."""
+    select, prefetch = related_lookups(serializer)
+    return (
+        queryset.select_related(None)
+        .prefetch_related(None)
+        .select_related(*select)
+        .prefetch_related(*prefetch)
+    )
+
+
+class SparseQuerysetMixin:
+    """Join and prefetch what the serializer of this view reads, and no more."""
+
+    def get_queryset(self):
+        return with_related(super().get_queryset(), self.get_serializer())
@@ -0,0 +1,105 @@
+"""Replay of retried mutations identified by an ``Idempotency-Key`` header.
+
+The first request with a key runs normally and its response is stored in the
+same transaction as the changes it made. A retry with the same key gets the
+stored response back without touching the models. If two copies race, the
+unique key makes the loser roll back, and it replays the winner's response.
+"""
+
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+
+from .models import IdempotencyKey
+
+HEADER = "Idempotency-Key"
+REPLAY_HEADER = "Idempotent-Replayed"
+
+
+def get_ttl():
+    return timedelta(seconds=getattr(settings, "IDEMPOTENCY_KEY_TTL", 24 * 60 * 60))
+
+
+def lookup(key):
+    """Return the live stored response for ``key`` with one indexed query."""
+    try:
+        return IdempotencyKey.objects.get(key=key, expires_at__gt=timezone.now())
+    except IdempotencyKey.DoesNotExist:
+        return None
+
+
+def purge_expired(now=None):
+    """Delete every expired key; return how many were removed."""
+    deleted, _ = IdempotencyKey.objects.filter(
+        expires_at__lte=now or timezone.now()
+    ).delete()
+    return deleted
+
+
+class IdempotencyMixin:
+    """Honour ``Idempotency-Key`` on create, update and partial_update."""
+
+    def create(self, request, *args, **kwargs):
+        return self.idempotent(request, super().create, *args, **kwargs)
+
+    def update(self, request, *args, **kwargs):
+        # partial_update goes through here as well
+        return self.idempotent(request, super().update, *args, **kwargs)
+
+    def idempotent(self, request, handler, *args, **kwargs):
+        key = request.headers.get(HEADER)
+        if not key:
+            return handler(request, *args, **kwargs)
+        if len(key) > IdempotencyKey._meta.get_field("key").max_length:
+            return Response(
+                {"error": f"{HEADER} is too long."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        stored = lookup(key)
+        if stored is not None:
+            return self.replay(request, stored)
+
+        try:
+            with transaction.atomic():
+                response = handler(request, *args, **kwargs)
+                if response.status_code < 500:
+                    self.store(request, key, response)
+        except IntegrityError:
+            # A concurrent request with the same key committed first
+            stored = lookup(key)
+            if stored is None:
+                raise
+            return self.replay(request, stored)
+        return response
+
+    def store(self, request, key, response):
+        now = timezone.now()
+        # An expired row still holds the unique key until it is purged
+        IdempotencyKey.objects.filter(key=key, expires_at__lte=now).delete()
+        IdempotencyKey.objects.create(
+            key=key,
+            method=request.method,
+            path=request.path,
+            status_code=response.status_code,
+            response_body=json.loads(JSONRenderer().render(response.data) or "null"),
+            expires_at=now + get_ttl(),
+        )
+
+    def replay(self, request, stored):
+        if stored.method != request.method or stored.path != request.path:
+            return Response(
+                {"error": f"{HEADER} was already used for a different request."},
+                status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            )
+        return Response(
+            stored.response_body,
+            status=stored.status_code,
+            headers={REPLAY_HEADER: "true"},
+        )
@@ -0,0 +1,111 @@
+"""The kitchen queue: one ticket per order, cooked in priority order.
+
+A ticket is created with its order and goes Queued -> Preparing (claimed by
+a station) -> Ready -> Served. The queue is the Queued tickets ordered by
+priority, then age, then table, so the orders of a table placed together
+come up together. ``ticket_queue_idx`` holds the tickets in that order
+within each status, so the next N tickets are the first N entries of the
+Queued range: an index seek and N steps, however many tickets there are.
+
+Stations claim tickets with ``claim``. Every claim is a conditional UPDATE
+of one queued ticket, so two stations can read the same head of the queue
+but only one of them gets each ticket; the other moves on to the next ones.
+On PostgreSQL the read skips rows another claim has locked, so concurrent
+claims mostly read different tickets in the first place.
+"""
+
+from contextlib import nullcontext
+
+from django.db import connections, router, transaction
+from django.utils import timezone
+
+from . import events
+from .models import KitchenTicket, OrderLine
+
+QUEUE_ORDER = ("-priority", "created_at", "table_id", "id")
+
+# Tickets a station is working on or waiting to send out
+OPEN_STATUSES = (KitchenTicket.QUEUED, KitchenTicket.PREPARING, KitchenTicket.READY)
+
+
+def queue(queryset=None, status=KitchenTicket.QUEUED):
+    """Tickets of ``status`` in queue order."""
+    if queryset is None:
+        queryset = KitchenTicket.objects.all()
+    return queryset.filter(status=status).order_by(*QUEUE_ORDER)
+
+
+def _skips_locked():
+    features = connections[router.db_for_write(KitchenTicket)].features
+    return features.has_select_for_update_skip_locked
+
+
+def _candidates(limit):
+    """Ids at the head of the queue; locked when the database skips locks."""
+    tickets = queue()
+    if _skips_locked():
+        tickets = tickets.select_for_update(skip_locked=True)
+    return list(tickets.values_list("id", flat=True)[:limit])
+
+
+def claim(station, limit=1, attempts=3):
+    """Give ``station`` up to ``limit`` tickets from the head of the queue.
+
+    Returns the ids of the tickets claimed, in queue order. Tickets another
+    station claims first are skipped and their places filled from further
+    down the queue, for up to ``attempts`` reads.
+    """
+    claimed = []
+    for _ in range(attempts):
+        # The read and the claims share a transaction only to hold the row
+        # locks. Elsewhere each claim commits on its own: SQLite cannot turn
+        # a read transaction into a write while other stations are reading.
+        with transaction.atomic() if _skips_locked() else nullcontext():
+            candidates = _candidates(limit - len(claimed))
+            if not candidates:
+                break
+            now = timezone.now()
+            for pk in candidates:
+                if KitchenTicket.objects.filter(
+                    pk=pk, status=KitchenTicket.QUEUED
+                ).update(
+                    status=KitchenTicket.PREPARING,
+                    station=station,
+                    claimed_at=now,
+                    updated_at=now,
+                ):
+                    claimed.append(pk)
+                    events.notify("ticket", pk)
+        if len(claimed) >= limit:
+            break
+    return claimed
+
+
+def _through_ticket(field):
+    """``QUEUE_ORDER`` field as seen from an order line."""
+    if field.startswith("-"):
+        return f"-order__ticket__{field[1:]}"
+    return f"order__ticket__{field}"
+
+
+def batches(status=KitchenTicket.QUEUED):
+    """The dishes of the tickets of ``status``, grouped by menu item.
+
+    Each group has the menu item, its name, the quantity to cook across the
+    tickets and the ids of those tickets. Groups come in the order of their
+    most urgent ticket, so the head of the queue is cooked first.
+    """
+    lines = (
+        OrderLine.objects.filter(order__ticket__status=status)
+        .order_by(*[_through_ticket(field) for field in QUEUE_ORDER])
+        .values_list("menu_item_id", "menu_item__name", "quantity", "order__ticket__id")
+    )
+    groups = {}
+    for menu_item, name, quantity, ticket in lines:
+        group = groups.setdefault(
+            menu_item,
+            {"menu_item": menu_item, "name": name, "quantity": 0, "tickets": []},
+        )
+        group["quantity"] += quantity
+        group["tickets"].append(ticket)
+    return list(groups.values())
@@ -0,0 +1,61 @@
+from datetime import date, datetime, time
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from restaurant.archive import archivable, archive_orders, cutoff_for
+
+
+class Command(BaseCommand):
+    help = (
+        "Move orders paid more than ARCHIVE_AFTER_DAYS ago to the archive tables. "
+        "Every batch commits on its own, so an interrupted run resumes where it "
+        "stopped when run again."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days",
+            type=int,
+            help="Archive orders paid more than this many days ago.",
+        )
+        parser.add_argument(
+            "--before",
+            type=date.fromisoformat,
+            help="Archive orders paid before this day instead (YYYY-MM-DD).",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Orders moved per transaction (default: 500).",
+        )
+        parser.add_argument(
+            "--max-batches",
+            type=int,
+            help="Stop after this many batches (default: until none are left).",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only count the orders that would be archived.",
+        )
+
+    def handle(self, *args, **options):
+        if options["before"] is not None:
+            cutoff = timezone.make_aware(datetime.combine(options["before"], time()))
+        else:
+            cutoff = cutoff_for(options["days"])
+
+        if options["dry_run"]:
+            count = archivable(cutoff).count()
+            self.stdout.write(f"{count} order(s) paid before {cutoff} to archive.")
+            return
+
+        total = archive_orders(
+            cutoff,
+            batch_size=options["batch_size"],
+            max_batches=options["max_batches"],
+            progress=lambda total: self.stdout.write(f"Archived {total} order(s)..."),
+        )
+        self.stdout.write(f"Archived {total} order(s) paid before {cutoff}.")
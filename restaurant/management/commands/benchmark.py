@@ -0,0 +1,124 @@
+import json
+import platform
+
+import django
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import (
+    setup_databases,
+    setup_test_environment,
+    teardown_databases,
+    teardown_test_environment,
+)
+from django.utils import timezone
+
+from restaurant.benchmarks import compare, load_benchmarks
+
+
+class Command(BaseCommand):
+    help = "Run the API benchmarks against a throwaway test database."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "names",
+            nargs="*",
+            help="Benchmarks to run (default: all).",
+        )
+        parser.add_argument(
+            "--scale",
+            type=float,
+            default=1.0,
+            help="Multiplier applied to the data sizes of every benchmark.",
+        )
+        parser.add_argument(
+            "--list", action="store_true", help="List the available benchmarks."
+        )
+        parser.add_argument("--output", help="Write the results to this JSON file.")
+        parser.add_argument(
+            "--baseline",
+            help="Compare the results with a JSON file written by --output.",
+        )
+        parser.add_argument(
+            "--max-regression",
+            type=float,
+            help=(
+                "Fail if a latency, throughput or query-count metric is this "
+                "many percent worse than the baseline."
+            ),
+        )
+
+    def handle(self, *args, **options):
+        registry = load_benchmarks()
+        if options["list"]:
+            for name in sorted(registry):
+                self.stdout.write(name)
+            return
+
+        names = options["names"] or sorted(registry)
+        unknown = [name for name in names if name not in registry]
+        if unknown:
+            raise CommandError(f"Unknown benchmark(s): {', '.join(unknown)}")
+
+        baseline = None
+        if options["baseline"]:
+            with open(options["baseline"]) as f:
+                baseline = json.load(f)["results"]
+
+        results = {}
+        setup_test_environment()
+        old_config = setup_databases(verbosity=0, interactive=False)
+        try:
+            for name in names:
+                self.stdout.write(self.style.MIGRATE_HEADING(name))
+                # Every benchmark seeds its own data from an empty database
+                call_command("flush", interactive=False, verbosity=0)
+                cache.clear()
+                results[name] = registry[name](scale=options["scale"])
+                self.write_results(results[name])
+        finally:
+            teardown_databases(old_config, verbosity=0)
+            teardown_test_environment()
+
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                json.dump({"meta": self.meta(options), "results": results}, f, indent=2)
+            self.stdout.write(f"Results written to {options['output']}")
+
+        if baseline is not None:
+            self.compare(baseline, results, options["max_regression"])
+
+    def write_results(self, results, indent="  "):
+        for key, value in results.items():
+            if isinstance(value, dict):
+                self.stdout.write(f"{indent}{key}:")
+                self.write_results(value, indent + "  ")
+            else:
+                self.stdout.write(f"{indent}{key}: {value}")
+
+    def meta(self, options):
+        return {
+            "timestamp": timezone.now().isoformat(),
+            "scale": options["scale"],
+            "database": connection.vendor,
+            "python": platform.python_version(),
+            "django": django.get_version(),
+        }
+
+    def compare(self, baseline, results, max_regression):
+        self.stdout.write(self.style.MIGRATE_HEADING("Compared with the baseline"))
+        regressions = []
+        for metric, old, new, change in compare(baseline, results):
+            verdict = "worse" if change > 0 else "better"
+            line = f"  {metric}: {old} -> {new} ({abs(change):.1%} {verdict})"
+            if max_regression is not None and change * 100 > max_regression:
+                regressions.append(metric)
+                self.stdout.write(self.style.ERROR(line))
+            else:
+                self.stdout.write(line)
+        if regressions:
+            raise CommandError(
+                f"{len(regressions)} metric(s) regressed by more than "
+                f"{max_regression}%: {', '.join(regressions)}"
+            )
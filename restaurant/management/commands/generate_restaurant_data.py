@@ -0,0 +1,340 @@
+import random
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from restaurant.menu_snapshot import bump_menu_version
+from restaurant.models import (
+    Bill,
+    Category,
+    KitchenTicket,
+    Menu,
+    MenuItem,
+    Order,
+    OrderLine,
+    Reservation,
+    Table,
+    Waiter,
+)
+from restaurant.reports import rebuild
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate synthetic restaurant data with bulk inserts. The same seed "
+        "gives the same data when run against an empty database."
+    )
+
+    def add_arguments(self, parser):
+        counts = {
+            "categories": 10,
+            "menus": 40,
+            "menu-items": 400,
+            "waiters": 30,
+            "tables": 60,
+            "reservations": 10_000,
+            "orders": 100_000,
+        }
+        for name, default in counts.items():
+            parser.add_argument(
+                f"--{name}",
+                type=int,
+                default=default,
+                help=f"Number of {name.replace('-', ' ')} (default: {default}).",
+            )
+        parser.add_argument(
+            "--max-lines",
+            type=int,
+            default=8,
+            help="Most distinct menu items on one order (default: 8).",
+        )
+        parser.add_argument(
+            "--paid",
+            type=float,
+            default=0.9,
+            help="Share of bills that are paid (default: 0.9).",
+        )
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=90,
+            help="Orders are spread over this many past days (default: 90).",
+        )
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=5000,
+            help="Orders inserted per transaction (default: 5000).",
+        )
+
+    def handle(self, *args, **options):
+        if options["menus"] and not options["categories"]:
+            raise CommandError("Menus need at least one category.")
+        if options["menu_items"] and not options["menus"]:
+            raise CommandError("Menu items need at least one menu.")
+        if options["orders"] and not (
+            options["tables"] and options["waiters"] and options["menu_items"]
+        ):
+            raise CommandError("Orders need tables, waiters and menu items.")
+
+        self.rng = random.Random(options["seed"])
+        self.batch_size = options["batch_size"]
+        started = time.perf_counter()
+
+        categories = self.create(
+            Category,
+            (Category(name=f"Category {i}") for i in range(options["categories"])),
+        )
+        menus = self.create(
+            Menu,
+            (
+                Menu(
+                    name=f"Menu {i}",
+                    price=self.price(500, 5000),
+                    category=self.rng.choice(categories),
+                )
+                for i in range(options["menus"])
+            ),
+        )
+        menu_items = self.create(
+            MenuItem,
+            (
+                MenuItem(
+                    name=f"Dish {i}",
+                    price=self.price(100, 3000),
+                    menu=self.rng.choice(menus),
+                )
+                for i in range(options["menu_items"])
+            ),
+        )
+        waiters = self.create(
+            Waiter,
+            (
+                Waiter(name=f"Waiter {i}", age=self.rng.randint(18, 65))
+                for i in range(options["waiters"])
+            ),
+        )
+        first_number = (Table.objects.aggregate(last=Max("number"))["last"] or 0) + 1
+        tables = self.create(
+            Table,
+            (
+                Table(number=first_number + i, capacity=self.rng.randint(2, 10))
+                for i in range(options["tables"])
+            ),
+        )
+        self.create_reservations(options["reservations"], tables, options["days"])
+        lines = self.create_orders(options, tables, waiters, menu_items)
+        if options["orders"] and options["paid"]:
+            rebuild()
+        if categories or menus or menu_items:
+            # bulk_create sends no signals, so the cached menu snapshot has
+            # to be invalidated here
+            bump_menu_version()
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Created {len(categories)} categories, {len(menus)} menus, "
+                f"{len(menu_items)} menu items, {len(waiters)} waiters, "
+                f"{len(tables)} tables, {options['reservations']} reservations, "
+                f"{options['orders']} orders with {lines} lines in {elapsed:.1f}s."
+            )
+        )
+
+    def price(self, low_cents, high_cents):
+        return Decimal(self.rng.randint(low_cents, high_cents)) / 100
+
+    def create(self, model, objs):
+        """``bulk_create`` that sets primary keys on every backend.
+
+        Backends that cannot return the inserted rows leave the keys unset;
+        they are read back, assuming nothing else inserts into the table
+        meanwhile, so the new rows are the ones after its previous last key.
+        """
+        objs = list(objs)
+        if connection.features.can_return_rows_from_bulk_insert:
+            return model.objects.bulk_create(objs, batch_size=self.batch_size)
+        last = model.objects.aggregate(last=Max("pk"))["last"] or 0
+        model.objects.bulk_create(objs, batch_size=self.batch_size)
+        pks = (
+            model.objects.filter(pk__gt=last)
+            .order_by("pk")
+            .values_list("pk", flat=True)
+        )
+        for obj, pk in zip(objs, pks):
+            obj.pk = pk
+        return objs
+
+    def create_reservations(self, count, tables, days):
+        if not count:
+            return
+        # Upcoming two-hour bookings on half-hour slots; a table cannot have
+        # two active bookings starting at the same time
+        slots_per_table = days * 48
+        if count > len(tables) * slots_per_table:
+            raise CommandError("More reservations than free table slots.")
+        slots = set()
+        while len(slots) < count:
+            slots.add(
+                (self.rng.randrange(len(tables)), self.rng.randrange(slots_per_table))
+            )
+        origin = timezone.now().replace(minute=0, second=0, microsecond=0)
+        reservations = []
+        for i, (table, slot) in enumerate(sorted(slots)):
+            start = origin + timedelta(minutes=30 * slot)
+            reservations.append(
+                Reservation(
+                    table=tables[table],
+                    customer_name=f"Guest {i}",
+                    reservation_time=start,
+                    duration=Reservation.DEFAULT_DURATION,
+                    end_time=start + Reservation.DEFAULT_DURATION,
+                    is_confirmed=self.rng.random() < 0.5,
+                )
+            )
+        self.create(Reservation, reservations)
+
+    def insert_rows(self, model, fields, rows):
+        """Insert ``rows`` of ``fields`` values with ``executemany``.
+
+        The values must already be in database form; this skips the
+        per-value preparation ``bulk_create`` does, which dominates the time
+        for millions of rows.
+        """
+        quote = connection.ops.quote_name
+        columns = [model._meta.get_field(name).column for name in fields]
+        sql = "INSERT INTO {} ({}) VALUES ({})".format(
+            quote(model._meta.db_table),
+            ", ".join(quote(column) for column in columns),
+            ", ".join(["%s"] * len(columns)),
+        )
+        with connection.cursor() as cursor:
+            for start in range(0, len(rows), self.batch_size):
+                cursor.executemany(sql, rows[start : start + self.batch_size])
+
+    def create_orders(self, options, tables, waiters, menu_items):
+        """Insert orders, lines, bills and kitchen tickets in chunks of
+        ``batch_size`` orders.
+
+        Like ``Order.bulk_create_with_lines``, the OrderLine through table,
+        the bills and the tickets are written directly with precomputed
+        totals, so neither ``OrderLine.save`` nor the order signals run. The
+        chunks are dated oldest first across ``--days``; the paid bills of a
+        chunk are paid at that time, and their tickets were served.
+        """
+        count = options["orders"]
+        if not count:
+            return 0
+        max_lines = min(options["max_lines"], len(menu_items))
+        chunks = -(-count // self.batch_size)
+        end = timezone.now()
+        start = end - timedelta(days=options["days"])
+        lines = 0
+
+        for chunk in range(chunks):
+            size = min(self.batch_size, count - chunk * self.batch_size)
+            moment = start + (end - start) * chunk / chunks
+            stamp = connection.ops.adapt_datetimefield_value(moment)
+            orders, line_rows = [], []
+            for _ in range(size):
+                order = Order(
+                    table=self.rng.choice(tables), waiter=self.rng.choice(waiters)
+                )
+                order.total_amount = Decimal("0.00")
+                for menu_item in self.rng.sample(
+                    menu_items, self.rng.randint(1, max_lines)
+                ):
+                    quantity = self.rng.randint(1, 4)
+                    line_total = menu_item.price * quantity
+                    order.total_amount += line_total
+                    line_rows.append((order, menu_item.pk, quantity, menu_item.price))
+                orders.append(order)
+            paid = [self.rng.random() < options["paid"] for _ in orders]
+
+            with transaction.atomic():
+                self.create(Order, orders)
+                ids = [order.pk for order in orders]
+                Order.objects.filter(pk__in=ids).update(
+                    created_at=moment, updated_at=moment
+                )
+                self.insert_rows(
+                    OrderLine,
+                    [
+                        "created_at",
+                        "updated_at",
+                        "order",
+                        "menu_item",
+                        "quantity",
+                        "unit_price",
+                        "line_total",
+                    ],
+                    [
+                        (
+                            stamp,
+                            stamp,
+                            order.pk,
+                            item_id,
+                            quantity,
+                            price,
+                            price * quantity,
+                        )
+                        for order, item_id, quantity, price in line_rows
+                    ],
+                )
+                self.insert_rows(
+                    Bill,
+                    [
+                        "created_at",
+                        "updated_at",
+                        "order",
+                        "total_amount",
+                        "is_paid",
+                        "paid_at",
+                    ],
+                    [
+                        (
+                            stamp,
+                            stamp,
+                            order.pk,
+                            order.total_amount,
+                            is_paid,
+                            stamp if is_paid else None,
+                        )
+                        for order, is_paid in zip(orders, paid)
+                    ],
+                )
+                self.insert_rows(
+                    KitchenTicket,
+                    [
+                        "created_at",
+                        "updated_at",
+                        "order",
+                        "table",
+                        "status",
+                        "priority",
+                        "station",
+                        "claimed_at",
+                    ],
+                    [
+                        (
+                            stamp,
+                            stamp,
+                            order.pk,
+                            order.table_id,
+                            KitchenTicket.SERVED if is_paid else KitchenTicket.QUEUED,
+                            0,
+                            "",
+                            None,
+                        )
+                        for order, is_paid in zip(orders, paid)
+                    ],
+                )
+            lines += len(line_rows)
+            self.stdout.write(f"  orders: {chunk * self.batch_size + size}/{count}")
+        return lines
@@ -0,0 +1,26 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand
+
+from restaurant.reports import rebuild
+
+
+class Command(BaseCommand):
+    help = "Backfill or rebuild the daily sales rollups from the paid bills."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--start",
+            type=date.fromisoformat,
+            help="First day to rebuild (YYYY-MM-DD; default: the first sale).",
+        )
+        parser.add_argument(
+            "--end",
+            type=date.fromisoformat,
+            help="Last day to rebuild (YYYY-MM-DD; default: the last sale).",
+        )
+
+    def handle(self, *args, **options):
+        written = rebuild(start=options["start"], end=options["end"])
+        for name, count in written.items():
+            self.stdout.write(f"{name}: {count} row(s)")
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from restaurant.models import Table
+
+
+class Command(BaseCommand):
+    help = "Make every table available again, as at closing time."
+
+    def handle(self, *args, **options):
+        reset = Table.reset_floor()
+        self.stdout.write(f"Reset {reset} table(s) to Available.")
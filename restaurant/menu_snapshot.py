@@ -0,0 +1,88 @@
+"""Pre-rendered JSON snapshot of the whole menu, cached per menu version.
+
+The version lives in the cache and is bumped whenever a category, menu or
+menu item is saved or deleted. Those signals do not fire for bulk writes
+(``bulk_create``, ``bulk_update``, ``QuerySet.update()``, raw SQL), so code
+that changes the catalog that way must call ``bump_menu_version()`` itself,
+as ``generate_restaurant_data`` does. Snapshots are stored under their version, so a
+bump makes the next request rebuild the blob once while clients holding the
+current version's ETag are answered without touching the database.
+"""
+
+import time
+
+from django.core.cache import cache
+from django.db.models import Prefetch
+from rest_framework.renderers import JSONRenderer
+
+VERSION_KEY = "restaurant:menu-version"
+SNAPSHOT_KEY = "restaurant:menu-snapshot:{version}"
+SNAPSHOT_TIMEOUT = 24 * 60 * 60
+
+
+def _fresh_version():
+    # Milliseconds since the epoch: a version lost from the cache is never
+    # reused, so old ETags cannot match new content
+    return int(time.time() * 1000)
+
+
+def get_menu_version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        cache.add(VERSION_KEY, _fresh_version(), timeout=None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def bump_menu_version():
+    try:
+        return cache.incr(VERSION_KEY)
+    except ValueError:
+        version = _fresh_version()
+        cache.set(VERSION_KEY, version, timeout=None)
+        return version
+
+
+def build_snapshot():
+    """Render every category with its menus and menu items to JSON bytes."""
+    from .models import Category, Menu, MenuItem
+
+    categories = Category.objects.order_by("id").prefetch_related(
+        Prefetch("menu_set", queryset=Menu.objects.order_by("id")),
+        Prefetch("menu_set__menu_items", queryset=MenuItem.objects.order_by("id")),
+    )
+    return JSONRenderer().render(
+        [
+            {
+                "id": category.id,
+                "name": category.name,
+                "menus": [
+                    {
+                        "id": menu.id,
+                        "name": menu.name,
+                        "price": str(menu.price),
+                        "items": [
+                            {"id": item.id, "name": item.name, "price": str(item.price)}
+                            for item in menu.menu_items.all()
+                        ],
+                    }
+                    for menu in category.menu_set.all()
+                ],
+            }
+            for category in categories
+        ]
+    )
+
+
+def get_snapshot(version):
+    """Return the snapshot for ``version``, building and caching it if needed."""
+    key = SNAPSHOT_KEY.format(version=version)
+    snapshot = cache.get(key)
+    if snapshot is None:
+        snapshot = build_snapshot()
+        cache.set(key, snapshot, timeout=SNAPSHOT_TIMEOUT)
+    return snapshot
+
+
+def etag_for(version):
+    return f'"menu-{version}"'
@@ -0,0 +1,35 @@
+"""Base class for the project's middleware.
+
+Every middleware here is sync and async capable, so a request served by
+project/asgi.py is not switched to a thread and back at each one of them.
+"""
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+
+class BaseMiddleware:
+    """Middleware that runs natively under WSGI and ASGI alike.
+
+    Subclasses implement ``process_response``; under ASGI it runs on the event
+    loop, so it must not block. Ones that need to wrap the call itself
+    override ``__call__`` and ``__acall__`` instead.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self.process_response(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        return self.process_response(request, await self.get_response(request))
+
+    def process_response(self, request, response):
+        return response
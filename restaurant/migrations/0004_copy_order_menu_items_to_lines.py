@@ -0,0 +1,65 @@
+# Generated by Django 5.1.1 on 2026-10-17 09:14
+
+from decimal import Decimal
+
+from django.db import migrations
+from django.db.models import Sum
+
+
+def copy_menu_items_to_lines(apps, schema_editor):
+    """Turn each row of the old order/menu item join table into an order line."""
+    Order = apps.get_model('restaurant', 'Order')
+    OrderLine = apps.get_model('restaurant', 'OrderLine')
+    Bill = apps.get_model('restaurant', 'Bill')
+    Through = Order.menu_items.through
+
+    rows = Through.objects.select_related('menuitem').iterator(chunk_size=2000)
+    batch = []
+    for row in rows:
+        price = row.menuitem.price
+        batch.append(
+            OrderLine(
+                order_id=row.order_id,
+                menu_item_id=row.menuitem_id,
+                quantity=1,
+                unit_price=price,
+                line_total=price,
+            )
+        )
+        if len(batch) >= 2000:
+            OrderLine.objects.bulk_create(batch)
+            batch = []
+    if batch:
+        OrderLine.objects.bulk_create(batch)
+
+    totals = OrderLine.objects.values('order_id').annotate(total=Sum('line_total'))
+    for row in totals.iterator(chunk_size=2000):
+        Order.objects.filter(pk=row['order_id']).update(total_amount=row['total'])
+        Bill.objects.filter(order_id=row['order_id']).update(total_amount=row['total'])
+
+
+def copy_lines_to_menu_items(apps, schema_editor):
+    Order = apps.get_model('restaurant', 'Order')
+    OrderLine = apps.get_model('restaurant', 'OrderLine')
+    Through = Order.menu_items.through
+
+    Through.objects.bulk_create(
+        [
+            Through(order_id=line.order_id, menuitem_id=line.menu_item_id)
+            for line in OrderLine.objects.iterator(chunk_size=2000)
+        ],
+        batch_size=2000,
+    )
+    OrderLine.objects.all().delete()
+    Order.objects.update(total_amount=Decimal('0.00'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurant', '0003_order_total_amount_orderline'),
+    ]
+
+    operations = [
+        migrations.RunPython(copy_menu_items_to_lines, copy_lines_to_menu_items),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.1.1 on 2026-10-17 09:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurant', '0004_copy_order_menu_items_to_lines'),
+    ]
+
+    operations = [
+        # An auto-created join table can't be altered into a custom through
+        # model, so the old table is dropped once its rows have been copied.
+        migrations.RemoveField(
+            model_name='order',
+            name='menu_items',
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='menu_items',
+            field=models.ManyToManyField(related_name='orders', through='restaurant.OrderLine', to='restaurant.menuitem'),
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.1.1 on 2026-10-17 10:41
+
+import datetime
+import django.core.validators
+from django.db import migrations, models
+from django.db.models import F
+
+
+def fill_end_time(apps, schema_editor):
+    Reservation = apps.get_model('restaurant', 'Reservation')
+    Reservation.objects.update(end_time=F('reservation_time') + F('duration'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurant', '0006_idempotencykey'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reservation',
+            name='duration',
+            field=models.DurationField(default=datetime.timedelta(seconds=7200), validators=[django.core.validators.MinValueValidator(datetime.timedelta(seconds=60)), django.core.validators.MaxValueValidator(datetime.timedelta(seconds=21600))]),
+        ),
+        migrations.AddField(
+            model_name='reservation',
+            name='end_time',
+            field=models.DateTimeField(editable=False, null=True),
+        ),
+        migrations.RunPython(fill_end_time, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='reservation',
+            name='end_time',
+            field=models.DateTimeField(editable=False),
+        ),
+        migrations.AlterField(
+            model_name='table',
+            name='capacity',
+            field=models.IntegerField(db_index=True, validators=[django.core.validators.MinValueValidator(1)]),
+        ),
+        migrations.AddIndex(
+            model_name='reservation',
+            index=models.Index(fields=['table', 'reservation_time'], name='reservation_table_time_idx'),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.1.1 on 2026-10-17 11:20
+
+from django.db import migrations, models
+
+
+def cancel_double_bookings(apps, schema_editor):
+    """Keep the first booking of each table and start time, cancel the rest."""
+    Reservation = apps.get_model('restaurant', 'Reservation')
+    seen = set()
+    duplicates = []
+    rows = Reservation.objects.order_by('id').values_list('id', 'table_id', 'reservation_time')
+    for pk, table_id, reservation_time in rows.iterator(chunk_size=2000):
+        if (table_id, reservation_time) in seen:
+            duplicates.append(pk)
+        seen.add((table_id, reservation_time))
+    Reservation.objects.filter(pk__in=duplicates).update(is_cancelled=True, is_confirmed=False)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurant', '0007_reservation_duration_end_time'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reservation',
+            name='is_cancelled',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.RunPython(cancel_double_bookings, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='reservation',
+            constraint=models.UniqueConstraint(condition=models.Q(('is_cancelled', False)), fields=('table', 'reservation_time'), name='unique_active_table_reservation_time'),
+        ),
+    ]
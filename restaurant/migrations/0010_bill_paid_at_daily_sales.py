@@ -0,0 +1,67 @@
+# Generated by Django 5.1.1 on 2026-10-17 13:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import F
+
+
+def fill_paid_at(apps, schema_editor):
+    # Bills paid before paid_at existed count as paid at their last update
+    Bill = apps.get_model('restaurant', 'Bill')
+    Bill.objects.filter(is_paid=True).update(paid_at=F('updated_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurant', '0009_created_id_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bill',
+            name='paid_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(fill_paid_at, migrations.RunPython.noop),
+        migrations.CreateModel(
+            name='DailyCategorySales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('revenue', models.DecimalField(decimal_places=2, default=0.0, max_digits=12)),
+                ('orders', models.IntegerField(default=0)),
+                ('items_sold', models.IntegerField(default=0)),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_sales', to='restaurant.category')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('day', 'category'), name='unique_daily_category_sales')],
+            },
+        ),
+        migrations.CreateModel(
+            name='DailyTableSales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('revenue', models.DecimalField(decimal_places=2, default=0.0, max_digits=12)),
+                ('orders', models.IntegerField(default=0)),
+                ('table', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_sales', to='restaurant.table')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('day', 'table'), name='unique_daily_table_sales')],
+            },
+        ),
+        migrations.CreateModel(
+            name='DailyWaiterSales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('revenue', models.DecimalField(decimal_places=2, default=0.0, max_digits=12)),
+                ('orders', models.IntegerField(default=0)),
+                ('waiter', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_sales', to='restaurant.waiter')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('day', 'waiter'), name='unique_daily_waiter_sales')],
+            },
+        ),
+    ]
@@ -0,0 +1,76 @@
+# Generated by Django 5.1.1 on 2026-10-17 14:20
+
+from django.db import DatabaseError, migrations, transaction
+
+# The indexes as restaurant.search created them when this migration was
+# written; copied here so later changes to that module leave it unchanged
+INDEXED_COLUMNS = [
+    ('restaurant_menuitem', 'name'),
+    ('restaurant_waiter', 'name'),
+]
+
+
+def sqlite_statements(table, column):
+    fts = f'{table}_{column}_fts'
+    return [
+        f'CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5('
+        f"{column}, content='{table}', content_rowid='id', "
+        f"tokenize='unicode61 remove_diacritics 2', prefix='1 2 3')",
+        f'CREATE TRIGGER IF NOT EXISTS {fts}_insert AFTER INSERT ON {table} '
+        f'BEGIN INSERT INTO {fts}(rowid, {column}) VALUES (new.id, new.{column}); '
+        f'END',
+        f'CREATE TRIGGER IF NOT EXISTS {fts}_delete AFTER DELETE ON {table} '
+        f'BEGIN INSERT INTO {fts}({fts}, rowid, {column}) '
+        f"VALUES ('delete', old.id, old.{column}); END",
+        f'CREATE TRIGGER IF NOT EXISTS {fts}_update AFTER UPDATE OF {column} '
+        f'ON {table} BEGIN '
+        f'INSERT INTO {fts}({fts}, rowid, {column}) '
+        f"VALUES ('delete', old.id, old.{column}); "
+        f'INSERT INTO {fts}(rowid, {column}) VALUES (new.id, new.{column}); END',
+        f"INSERT INTO {fts}({fts}) VALUES ('rebuild')",
+    ]
+
+
+def install_search_indexes(apps, schema_editor):
+    connection = schema_editor.connection
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+            for table, column in INDEXED_COLUMNS:
+                cursor.execute(
+                    f'CREATE INDEX IF NOT EXISTS {table}_{column}_trgm '
+                    f'ON {table} USING gin (UPPER({column}) gin_trgm_ops)'
+                )
+        elif connection.vendor == 'sqlite':
+            for table, column in INDEXED_COLUMNS:
+                try:
+                    with transaction.atomic(using=connection.alias):
+                        for statement in sqlite_statements(table, column):
+                            cursor.execute(statement)
+                except DatabaseError:
+                    # No FTS5 in this SQLite build; search falls back
+                    pass
+
+
+def uninstall_search_indexes(apps, schema_editor):
+    connection = schema_editor.connection
+    with connection.cursor() as cursor:
+        for table, column in INDEXED_COLUMNS:
+            if connection.vendor == 'postgresql':
+                cursor.execute(f'DROP INDEX IF EXISTS {table}_{column}_trgm')
+            elif connection.vendor == 'sqlite':
+                fts = f'{table}_{column}_fts'
+                for suffix in ('insert', 'delete', 'update'):
+                    cursor.execute(f'DROP TRIGGER IF EXISTS {fts}_{suffix}')
+                cursor.execute(f'DROP TABLE IF EXISTS {fts}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurant', '0010_bill_paid_at_daily_sales'),
+    ]
+
+    operations = [
+        migrations.RunPython(install_search_indexes, uninstall_search_indexes),
+    ]
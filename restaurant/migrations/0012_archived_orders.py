@@ -0,0 +1,60 @@
+# Generated by Django 5.1.1 on 2026-10-17 04:19
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurant', '0011_search_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedOrder',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('table_id', models.BigIntegerField()),
+                ('table_number', models.IntegerField()),
+                ('waiter_id', models.BigIntegerField()),
+                ('waiter_name', models.CharField(max_length=100)),
+                ('total_amount', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('bill_id', models.BigIntegerField(unique=True)),
+                ('paid_at', models.DateTimeField()),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ArchivedOrderLine',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('menu_item_id', models.BigIntegerField()),
+                ('menu_item_name', models.CharField(max_length=100)),
+                ('category_id', models.BigIntegerField()),
+                ('quantity', models.PositiveIntegerField()),
+                ('unit_price', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('line_total', models.DecimalField(decimal_places=2, max_digits=10)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='bill',
+            index=models.Index(fields=['paid_at', 'id'], name='bill_paid_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedorder',
+            index=models.Index(fields=['created_at', 'id'], name='archived_order_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedorder',
+            index=models.Index(fields=['paid_at'], name='archived_order_paid_at_idx'),
+        ),
+        migrations.AddField(
+            model_name='archivedorderline',
+            name='order',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lines', to='restaurant.archivedorder'),
+        ),
+    ]
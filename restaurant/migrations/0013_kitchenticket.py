@@ -0,0 +1,31 @@
+# Generated by Django 5.1.1 on 2026-10-17 04:23
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurant', '0012_archived_orders'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='KitchenTicket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('status', models.CharField(choices=[('Queued', 'Queued'), ('Preparing', 'Preparing'), ('Ready', 'Ready'), ('Served', 'Served')], default='Queued', max_length=20)),
+                ('priority', models.SmallIntegerField(default=0)),
+                ('station', models.CharField(blank=True, max_length=50)),
+                ('claimed_at', models.DateTimeField(blank=True, editable=False, null=True)),
+                ('order', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='ticket', to='restaurant.order')),
+                ('table', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='restaurant.table')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', '-priority', 'created_at', 'table', 'id'], name='ticket_queue_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.1 on 2026-10-17 04:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurant', '0013_kitchenticket'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='table',
+            name='status',
+            field=models.CharField(choices=[('Available', 'Available'), ('Reserved', 'Reserved'), ('Occupied', 'Occupied')], db_index=True, default='Available', max_length=50),
+        ),
+    ]
@@ -1,9 +1,20 @@
+from datetime import timedelta
+from decimal import Decimal
+
 from django.db import models
 from django.contrib.auth import get_user_model
-from django.db import transaction
-from django.core.validators import MinValueValidator
-from django.db.models.signals import post_save
+from django.db import connections, router, transaction
+from django.db.models import F, Sum, Value
+from django.db.models.functions import Coalesce
+from django.core.validators import MaxValueValidator, MinValueValidator
+from django.db.models.signals import post_delete, post_save, pre_delete
 from django.dispatch import receiver
+from django.utils import timezone
+
+from . import events
+from .billing import schedule_bill_recalculation
+from .menu_snapshot import bump_menu_version
+from .reports import is_retained, record_payment
 
 User = get_user_model()
 
@@ -20,21 +31,79 @@ class SharedModel(models.Model):
 
 # Table model
 class Table(SharedModel):
+    AVAILABLE = "Available"
+    RESERVED = "Reserved"
+    OCCUPIED = "Occupied"
     STATUS_CHOICES = [
-        ("Available", "Available"),
-        ("Reserved", "Reserved"),
-        ("Occupied", "Occupied"),
+        (AVAILABLE, "Available"),
+        (RESERVED, "Reserved"),
+        (OCCUPIED, "Occupied"),
     ]
+    # Status -> the statuses it can be reached from; walk-ins are seated at
+    # an available table and a cancelled booking frees a reserved one
+    TRANSITIONS = {
+        RESERVED: (AVAILABLE,),
+        OCCUPIED: (AVAILABLE, RESERVED),
+        AVAILABLE: (RESERVED, OCCUPIED),
+    }
 
     number = models.IntegerField(unique=True, validators=[MinValueValidator(1)])
-    capacity = models.IntegerField(validators=[MinValueValidator(1)])
+    capacity = models.IntegerField(validators=[MinValueValidator(1)], db_index=True)
     status = models.CharField(
-        max_length=50, choices=STATUS_CHOICES, default="Available"
+        max_length=50, choices=STATUS_CHOICES, default=AVAILABLE, db_index=True
     )
 
     def __str__(self):
         return f"Table {self.number}"
 
+    # State changes in this module are conditional UPDATEs: the WHERE clause
+    # requires the row to still be in a state the change can start from, so
+    # of two concurrent changes only one matches the row and the other
+    # updates nothing, without a lock held across the read and the write
+    @classmethod
+    def move(cls, table_id, status, sources=None, now=None):
+        """Move table ``table_id`` to ``status``; returns whether it moved.
+
+        The table only moves from ``sources``, by default every status
+        ``status`` can be reached from.
+        """
+        if sources is None:
+            sources = cls.TRANSITIONS[status]
+        if not cls.objects.filter(pk=table_id, status__in=sources).update(
+            status=status, updated_at=now or timezone.now()
+        ):
+            return False
+        events.notify("table", table_id)
+        return True
+
+    def transition(self, status):
+        """Move the table to ``status``; returns False if it cannot go there."""
+        now = timezone.now()
+        if not Table.move(self.pk, status, now=now):
+            self.refresh_from_db(fields=["status", "updated_at"])
+            return False
+        self.status, self.updated_at = status, now
+        return True
+
+    @classmethod
+    def reset_floor(cls):
+        """Make every table available, as at closing; returns how many changed.
+
+        One UPDATE for the whole floor. The tables it changes are read first
+        only to publish their change events.
+        """
+        with transaction.atomic():
+            tables = cls.objects.exclude(status=cls.AVAILABLE)
+            changed = list(tables.values_list("id", flat=True))
+            if not changed:
+                return 0
+            count = tables.filter(pk__in=changed).update(
+                status=cls.AVAILABLE, updated_at=timezone.now()
+            )
+            for table_id in changed:
+                events.notify("table", table_id)
+        return count
+
 
 # Category model
 class Category(SharedModel):
@@ -91,22 +160,200 @@ class Reception(SharedModel):
 # Order model
 class Order(SharedModel):
     table = models.ForeignKey(Table, on_delete=models.CASCADE)
-    menu_items = models.ManyToManyField(MenuItem, related_name="orders")
+    menu_items = models.ManyToManyField(
+        MenuItem, through="OrderLine", related_name="orders"
+    )
     waiter = models.ForeignKey(Waiter, on_delete=models.CASCADE)
+    total_amount = models.DecimalField(max_digits=10, decimal_places=2, default=0.00)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["created_at", "id"], name="order_created_id_idx"),
+        ]
 
     def __str__(self):
         return f"Order {self.id} at Table {self.table.number}"
 
     def calculate_total(self):
-        """Calculate the total price of all menu items in this order."""
-        total = sum(item.price for item in self.menu_items.all())
-        return total
+        """Re-sum the stored line totals of this order."""
+        return self.lines.aggregate(
+            total=Coalesce(
+                Sum("line_total"),
+                Value(Decimal("0.00")),
+                output_field=models.DecimalField(max_digits=10, decimal_places=2),
+            )
+        )["total"]
+
+    def apply_total_delta(self, delta):
+        """Shift the stored order total by ``delta`` without re-summing.
+
+        The bill follows once the transaction commits.
+        """
+        if not delta:
+            return
+        Order.objects.filter(pk=self.pk).update(total_amount=F("total_amount") + delta)
+        self.total_amount = Decimal(self.total_amount) + delta
+        schedule_bill_recalculation(self.pk)
+        events.notify("order", self.pk)
+
+    @classmethod
+    def bulk_create_with_lines(cls, entries, batch_size=500):
+        """Insert orders together with their lines and bills.
+
+        ``entries`` is a list of ``(order, quantities)`` pairs, where ``order``
+        is unsaved and ``quantities`` maps menu items to quantities. Rows are
+        written with ``bulk_create``, so no signals are sent; totals are
+        computed here instead.
+        """
+        orders = []
+        for order, quantities in entries:
+            order.total_amount = sum(
+                (
+                    menu_item.price * quantity
+                    for menu_item, quantity in quantities.items()
+                ),
+                Decimal("0.00"),
+            )
+            orders.append(order)
+
+        with transaction.atomic():
+            features = connections[router.db_for_write(cls)].features
+            if features.can_return_rows_from_bulk_insert:
+                cls.objects.bulk_create(orders, batch_size=batch_size)
+            else:
+                # Primary keys are needed for the lines; raw saves skip the
+                # bill receiver like fixture loading does
+                for order in orders:
+                    order.save_base(raw=True)
+            OrderLine.objects.bulk_create(
+                [
+                    OrderLine(
+                        order=order,
+                        menu_item=menu_item,
+                        quantity=quantity,
+                        unit_price=menu_item.price,
+                        line_total=menu_item.price * quantity,
+                    )
+                    for order, (_, quantities) in zip(orders, entries)
+                    for menu_item, quantity in quantities.items()
+                ],
+                batch_size=batch_size,
+            )
+            Bill.objects.bulk_create(
+                [
+                    Bill(order=order, total_amount=order.total_amount)
+                    for order in orders
+                ],
+                batch_size=batch_size,
+            )
+            tickets = KitchenTicket.objects.bulk_create(
+                [
+                    KitchenTicket(order=order, table_id=order.table_id)
+                    for order in orders
+                ],
+                batch_size=batch_size,
+            )
+            for order, ticket in zip(orders, tickets):
+                events.notify("order", order.pk, events.CREATED)
+                if ticket.pk is not None:
+                    events.notify("ticket", ticket.pk, events.CREATED)
+        return orders
+
+    @transaction.atomic
+    def set_lines(self, quantities):
+        """Replace the lines of this order with ``{menu_item: quantity}``.
+
+        Unchanged lines keep their captured unit price; the totals are shifted
+        by the difference instead of being recomputed.
+        """
+        existing = {line.menu_item_id: line for line in self.lines.all()}
+        to_create, to_update = [], []
+        delta = Decimal("0.00")
+
+        for menu_item, quantity in quantities.items():
+            line = existing.pop(menu_item.pk, None)
+            if line is None:
+                line = OrderLine(
+                    order=self,
+                    menu_item=menu_item,
+                    quantity=quantity,
+                    unit_price=menu_item.price,
+                    line_total=menu_item.price * quantity,
+                )
+                to_create.append(line)
+                delta += line.line_total
+            elif line.quantity != quantity:
+                line_total = line.unit_price * quantity
+                delta += line_total - line.line_total
+                line.quantity = quantity
+                line.line_total = line_total
+                to_update.append(line)
+
+        if existing:
+            delta -= sum(line.line_total for line in existing.values())
+            OrderLine.objects.filter(
+                pk__in=[line.pk for line in existing.values()]
+            ).delete()
+        if to_create:
+            OrderLine.objects.bulk_create(to_create)
+        if to_update:
+            OrderLine.objects.bulk_update(to_update, ["quantity", "line_total"])
+
+        self.apply_total_delta(delta)
+        events.notify("order", self.pk)
+
+
+# OrderLine model
+class OrderLine(SharedModel):
+    order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name="lines")
+    menu_item = models.ForeignKey(
+        MenuItem, on_delete=models.PROTECT, related_name="order_lines"
+    )
+    quantity = models.PositiveIntegerField(default=1, validators=[MinValueValidator(1)])
+    # Price of the menu item when it was ordered
+    unit_price = models.DecimalField(max_digits=10, decimal_places=2)
+    line_total = models.DecimalField(max_digits=10, decimal_places=2)
+
+    # Line total as last stored, used to compute the delta on save/delete
+    _saved_line_total = Decimal("0.00")
+    _saved_menu_item_id = None
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["order", "menu_item"], name="unique_order_menu_item"
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.quantity} x {self.menu_item}"
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if "line_total" in field_names:
+            instance._saved_line_total = instance.line_total
+        if "menu_item_id" in field_names:
+            instance._saved_menu_item_id = instance.menu_item_id
+        return instance
 
     def save(self, *args, **kwargs):
-        super().save(*args, **kwargs)
-        # Ensure Bill total is updated after all menu_items are added
-        if hasattr(self, "bill"):
-            transaction.on_commit(lambda: self.bill.calculate_total())
+        # Capture the price at order time; it stays fixed afterwards
+        if self.unit_price is None or self.menu_item_id != self._saved_menu_item_id:
+            self.unit_price = self.menu_item.price
+        self.line_total = self.unit_price * self.quantity
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            self.order.apply_total_delta(self.line_total - self._saved_line_total)
+        self._saved_line_total = self.line_total
+        self._saved_menu_item_id = self.menu_item_id
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            result = super().delete(*args, **kwargs)
+            self.order.apply_total_delta(-self._saved_line_total)
+        self._saved_line_total = Decimal("0.00")
+        return result
 
 
 # Bill model
@@ -114,52 +361,445 @@ class Bill(SharedModel):
     order = models.OneToOneField(Order, on_delete=models.CASCADE, related_name="bill")
     total_amount = models.DecimalField(max_digits=10, decimal_places=2, default=0.00)
     is_paid = models.BooleanField(default=False)
+    paid_at = models.DateTimeField(null=True, blank=True, editable=False)
+
+    # Only written by the conditional UPDATE in _set_paid
+    PAYMENT_FIELDS = ("is_paid", "paid_at")
+
+    _saved_is_paid = False
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["created_at", "id"], name="bill_created_id_idx"),
+            # Archival walks the paid bills oldest first
+            models.Index(fields=["paid_at", "id"], name="bill_paid_id_idx"),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if "is_paid" in field_names:
+            instance._saved_is_paid = instance.is_paid
+        return instance
 
     def calculate_total(self):
-        """Calculate the total based on the prices of menu items in the related order."""
-        if self.order:
-            self.total_amount = self.order.calculate_total()
-            # Save the updated total_amount without triggering another save loop
-            super().save(update_fields=["total_amount"])
+        """Recalculate the total from the order lines when the transaction commits.
+
+        Repeated calls within one transaction are coalesced into one UPDATE.
+        """
+        if self.order_id:
+            schedule_bill_recalculation(self.order_id)
 
     def save(self, *args, **kwargs):
         if not self.pk:  # This is a new Bill instance
             super().save(*args, **kwargs)  # Save to create Bill in DB
             self.calculate_total()  # Then calculate the total
+            self._saved_is_paid = self.is_paid
+            return
+
+        # For updates, save the other fields normally; a change of is_paid
+        # becomes a payment transition so the sales rollups follow it
+        update_fields = kwargs.pop("update_fields", None)
+        if update_fields is None:
+            update_fields = [
+                field.name
+                for field in self._meta.concrete_fields
+                if not field.primary_key
+            ]
+        update_fields = [
+            name for name in update_fields if name not in self.PAYMENT_FIELDS
+        ]
+        paid = self.is_paid
+        with transaction.atomic():
+            super().save(*args, update_fields=update_fields, **kwargs)
+            if paid != self._saved_is_paid:
+                self._set_paid(paid)
+
+    def mark_paid(self):
+        """Mark the bill paid and add it to the sales rollups.
+
+        Returns False if the bill was already paid.
+        """
+        return self._set_paid(True)
+
+    def mark_unpaid(self):
+        """Undo a payment, taking the bill back out of the sales rollups.
+
+        Returns False if the bill was not paid.
+        """
+        return self._set_paid(False)
+
+    # A conditional UPDATE (see Table.move): a payment is counted once
+    @transaction.atomic
+    def _set_paid(self, paid):
+        bills = Bill.objects.filter(pk=self.pk, is_paid=not paid)
+        now = timezone.now()
+        if paid:
+            paid_at = now
+            changed = bills.update(is_paid=True, paid_at=paid_at, updated_at=now)
         else:
-            super().save(*args, **kwargs)  # For updates, save normally
+            # The rollup to take the payment out of is the day it was paid
+            paid_at = (
+                bills.select_for_update().values_list("paid_at", flat=True).first()
+            )
+            changed = bills.update(is_paid=False, paid_at=None, updated_at=now)
+        if not changed:
+            self.refresh_from_db(fields=["is_paid", "paid_at"])
+            return False
+        record_payment(
+            self.order_id, timezone.localdate(paid_at or now), 1 if paid else -1
+        )
+        events.notify("bill", self.pk)
+        self.is_paid = self._saved_is_paid = paid
+        self.paid_at = paid_at if paid else None
+        self.updated_at = now
+        return True
+
+
+# Kitchen ticket of an order; see kitchen.py
+class KitchenTicket(SharedModel):
+    QUEUED = "Queued"
+    PREPARING = "Preparing"
+    READY = "Ready"
+    SERVED = "Served"
+    STATUS_CHOICES = [
+        (QUEUED, "Queued"),
+        (PREPARING, "Preparing"),
+        (READY, "Ready"),
+        (SERVED, "Served"),
+    ]
+    # Status -> the statuses it can be reached from; a station that gives a
+    # ticket up puts it back in the queue
+    TRANSITIONS = {
+        PREPARING: (QUEUED,),
+        QUEUED: (PREPARING,),
+        READY: (PREPARING,),
+        SERVED: (READY,),
+    }
+
+    order = models.OneToOneField(Order, on_delete=models.CASCADE, related_name="ticket")
+    # The order's table, copied here so the queue index covers it
+    table = models.ForeignKey(Table, on_delete=models.CASCADE, related_name="+")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=QUEUED)
+    # Higher goes first; equal priorities go oldest first
+    priority = models.SmallIntegerField(default=0)
+    station = models.CharField(max_length=50, blank=True)
+    claimed_at = models.DateTimeField(null=True, blank=True, editable=False)
+
+    class Meta:
+        indexes = [
+            # The queue: the next tickets of a status are the first entries
+            # of its range, read without sorting
+            models.Index(
+                fields=["status", "-priority", "created_at", "table", "id"],
+                name="ticket_queue_idx",
+            ),
+        ]
+
+    def __str__(self):
+        return f"Ticket for order {self.order_id}"
+
+    # A conditional UPDATE (see Table.move): of two stations racing for the
+    # same change only one gets it
+    def transition(self, status, station=None):
+        """Move the ticket to ``status``; returns False if it cannot go there.
+
+        With ``station``, only a ticket held by that station moves.
+        """
+        tickets = KitchenTicket.objects.filter(
+            pk=self.pk, status__in=self.TRANSITIONS[status]
+        )
+        if station is not None:
+            tickets = tickets.filter(station=station)
+        now = timezone.now()
+        changes = {"status": status, "updated_at": now}
+        if status == self.QUEUED:
+            changes.update(station="", claimed_at=None)
+        if not tickets.update(**changes):
+            self.refresh_from_db(fields=["status", "station", "claimed_at"])
+            return False
+        events.notify("ticket", self.pk)
+        for name, value in changes.items():
+            setattr(self, name, value)
+        return True
 
 
 # Signal to create/update the Bill whenever the Order is created or updated
 @receiver(post_save, sender=Order)
-def create_or_update_bill(sender, instance, created, **kwargs):
+def create_or_update_bill(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        # Fixtures and bulk inserts bring their own bills
+        return
     if created:
         # Create a new Bill when an Order is created
         Bill.objects.create(order=instance)
     else:
-        # Update the Bill total when the Order is updated
-        if hasattr(instance, "bill"):
-            # Ensure the total is recalculated after transaction is committed
-            transaction.on_commit(lambda: instance.bill.calculate_total())
+        # Update the Bill total when the Order is updated; coalesced with any
+        # other recalculation scheduled in the same transaction
+        schedule_bill_recalculation(instance.pk)
+
+
+# A paid bill that is deleted, directly or with its order, takes its payment
+# out of the sales rollups; the lines are still there before the delete
+@receiver(pre_delete, sender=Bill)
+def remove_deleted_payment(sender, instance, **kwargs):
+    if not instance.is_paid or is_retained():
+        return
+    paid_at = (
+        Bill.objects.filter(pk=instance.pk, is_paid=True)
+        .select_for_update()
+        .values_list("paid_at", flat=True)
+        .first()
+    )
+    if paid_at is not None:
+        record_payment(instance.order_id, timezone.localdate(paid_at), -1)
+
+
+# Live clients follow the floor plan and the orders through change events
+@receiver(post_save, sender=Table)
+@receiver(post_save, sender=Order)
+def publish_saved(sender, instance, created, raw=False, **kwargs):
+    if not raw:
+        kind = "table" if sender is Table else "order"
+        events.notify(kind, instance.pk, events.CREATED if created else events.UPDATED)
+
+
+@receiver(post_delete, sender=Table)
+@receiver(post_delete, sender=Order)
+def publish_deleted(sender, instance, **kwargs):
+    kind = "table" if sender is Table else "order"
+    events.notify(kind, instance.pk, events.DELETED)
+
+
+# Every new order goes to the kitchen queue; the ticket follows the order to
+# another table
+@receiver(post_save, sender=Order)
+def create_or_move_ticket(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        ticket = KitchenTicket.objects.create(
+            order=instance, table_id=instance.table_id
+        )
+        events.notify("ticket", ticket.pk, events.CREATED)
+        return
+    update_fields = kwargs.get("update_fields")
+    if update_fields is None or "table" in update_fields:
+        KitchenTicket.objects.filter(order=instance).exclude(
+            table_id=instance.table_id
+        ).update(table_id=instance.table_id)
+
+
+# Any change to the catalog invalidates the cached menu snapshot, once the
+# change is visible to the request that rebuilds it
+@receiver([post_save, post_delete], sender=Category)
+@receiver([post_save, post_delete], sender=Menu)
+@receiver([post_save, post_delete], sender=MenuItem)
+def bump_menu_snapshot_version(sender, **kwargs):
+    transaction.on_commit(bump_menu_version)
+
+
+class ReservationQuerySet(models.QuerySet):
+    def active(self):
+        return self.filter(is_cancelled=False)
+
+    def overlapping(self, start, end):
+        """Reservations whose time slot intersects ``[start, end)``.
+
+        The lower bound on ``reservation_time`` is implied by the maximum
+        duration; spelling it out keeps the lookup a bounded range scan of the
+        ``(table, reservation_time)`` index.
+        """
+        return self.filter(
+            reservation_time__lt=end,
+            reservation_time__gt=start - Reservation.MAX_DURATION,
+            end_time__gt=start,
+        )
 
 
 # Reservation model
 class Reservation(SharedModel):
+    DEFAULT_DURATION = timedelta(hours=2)
+    MAX_DURATION = timedelta(hours=6)
+
     table = models.ForeignKey(Table, on_delete=models.CASCADE)
     customer_name = models.CharField(max_length=100)
     reservation_time = models.DateTimeField()
+    duration = models.DurationField(
+        default=DEFAULT_DURATION,
+        validators=[
+            MinValueValidator(timedelta(minutes=1)),
+            MaxValueValidator(MAX_DURATION),
+        ],
+    )
+    # reservation_time + duration, stored so overlaps can be found by index
+    end_time = models.DateTimeField(editable=False)
     is_confirmed = models.BooleanField(default=False)
+    is_cancelled = models.BooleanField(default=False)
+
+    objects = ReservationQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["table", "reservation_time"],
+                name="reservation_table_time_idx",
+            ),
+            models.Index(
+                fields=["created_at", "id"], name="reservation_created_id_idx"
+            ),
+        ]
+        constraints = [
+            # Last line of defence against double booking the same slot
+            models.UniqueConstraint(
+                fields=["table", "reservation_time"],
+                condition=models.Q(is_cancelled=False),
+                name="unique_active_table_reservation_time",
+            ),
+        ]
+
+    def save(self, *args, **kwargs):
+        self.end_time = self.reservation_time + self.duration
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and (
+            "reservation_time" in update_fields or "duration" in update_fields
+        ):
+            kwargs["update_fields"] = {*update_fields, "end_time"}
+        super().save(*args, **kwargs)
+
+    @classmethod
+    def lock_table(cls, table_id):
+        """Take the row lock of a table for the rest of the transaction.
 
+        The lock is taken with a write so it also serialises bookings on
+        SQLite, which ignores ``select_for_update``.
+        """
+        return Table.objects.filter(pk=table_id).update(updated_at=timezone.now())
+
+    # Each transition is a conditional UPDATE of the reservation row (see
+    # Table.move); the table follows in the same transaction.
+    @transaction.atomic
     def confirm_reservation(self):
-        if not self.is_confirmed:
+        if Reservation.objects.filter(
+            pk=self.pk, is_confirmed=False, is_cancelled=False
+        ).update(is_confirmed=True):
+            Table.move(self.table_id, Table.RESERVED)
             self.is_confirmed = True
-            self.table.status = "Reserved"
-            self.table.save()
-            self.save(update_fields=["is_confirmed"])
 
+    @transaction.atomic
     def cancel_reservation(self):
-        if self.is_confirmed:
+        if Reservation.objects.filter(pk=self.pk, is_confirmed=True).update(
+            is_confirmed=False, is_cancelled=True
+        ):
+            # A seated party keeps its table
+            Table.move(self.table_id, Table.AVAILABLE, sources=[Table.RESERVED])
             self.is_confirmed = False
-            self.table.status = "Available"
-            self.table.save()
-            self.save(update_fields=["is_confirmed"])
+            self.is_cancelled = True
+
+
+# Stored response of a mutation made with an Idempotency-Key header
+class IdempotencyKey(models.Model):
+    key = models.CharField(max_length=255, unique=True)
+    method = models.CharField(max_length=10)
+    path = models.CharField(max_length=255)
+    status_code = models.PositiveSmallIntegerField()
+    response_body = models.JSONField(null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return self.key
+
+
+# Daily sales rollups; see reports.py
+class DailySales(models.Model):
+    day = models.DateField()
+    revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0.00)
+    orders = models.IntegerField(default=0)
+
+    class Meta:
+        abstract = True
+
+
+class DailyCategorySales(DailySales):
+    category = models.ForeignKey(
+        Category, on_delete=models.CASCADE, related_name="daily_sales"
+    )
+    items_sold = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["day", "category"], name="unique_daily_category_sales"
+            )
+        ]
+
+
+class DailyWaiterSales(DailySales):
+    waiter = models.ForeignKey(
+        Waiter, on_delete=models.CASCADE, related_name="daily_sales"
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["day", "waiter"], name="unique_daily_waiter_sales"
+            )
+        ]
+
+
+class DailyTableSales(DailySales):
+    table = models.ForeignKey(
+        Table, on_delete=models.CASCADE, related_name="daily_sales"
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["day", "table"], name="unique_daily_table_sales"
+            )
+        ]
+
+
+# Orders moved out of the live tables with their bill and lines; see archive.py.
+# The rows keep their ids and copy the names they showed, so they stay
+# readable after the table, waiter or menu item is gone.
+class ArchivedOrder(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    table_id = models.BigIntegerField()
+    table_number = models.IntegerField()
+    waiter_id = models.BigIntegerField()
+    waiter_name = models.CharField(max_length=100)
+    total_amount = models.DecimalField(max_digits=10, decimal_places=2)
+    bill_id = models.BigIntegerField(unique=True)
+    paid_at = models.DateTimeField()
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    archived_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["created_at", "id"], name="archived_order_created_id_idx"
+            ),
+            models.Index(fields=["paid_at"], name="archived_order_paid_at_idx"),
+        ]
+
+    def __str__(self):
+        return f"Order {self.id} at Table {self.table_number}"
+
+
+class ArchivedOrderLine(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    order = models.ForeignKey(
+        ArchivedOrder, on_delete=models.CASCADE, related_name="lines"
+    )
+    menu_item_id = models.BigIntegerField()
+    menu_item_name = models.CharField(max_length=100)
+    category_id = models.BigIntegerField()
+    quantity = models.PositiveIntegerField()
+    unit_price = models.DecimalField(max_digits=10, decimal_places=2)
+    line_total = models.DecimalField(max_digits=10, decimal_places=2)
+
+    def __str__(self):
+        return f"{self.quantity} x {self.menu_item_name}"
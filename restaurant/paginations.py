@@ -1,6 +1,16 @@
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.pagination import CursorPagination, PageNumberPagination
 
 
 class MenuPagination(PageNumberPagination):
     page_size = 10
     page_size_query_param = "size"
+
+
+# Keyset pagination for tables that grow without bound: each page continues
+# from the (created_at, id) of the last row instead of an OFFSET, so deep pages
+# are as cheap as the first one
+class CreatedAtCursorPagination(CursorPagination):
+    ordering = ("-created_at", "-id")
+    page_size = 50
+    page_size_query_param = "size"
+    max_page_size = 500
@@ -0,0 +1,189 @@
+"""Per-endpoint query count and latency profiling.
+
+Every connection gets an ``execute_wrapper`` that times its queries into
+the ``QueryTimer`` of the request being handled, so it works with ``DEBUG``
+off and costs two clock reads per query. The timer is found through a
+context variable, which also reaches the queries run on a worker thread
+under ASGI. Each request is filed under its DRF view and action,
+e.g. ``OrderViewSet.list``; the last ``PERF_WINDOW`` samples per endpoint are
+kept in memory for percentiles. Numbers are per process.
+"""
+
+import logging
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+from .middleware import BaseMiddleware
+
+logger = logging.getLogger(__name__)
+
+PERCENTILES = (50, 95, 99)
+
+
+def get_query_budget():
+    return getattr(settings, "PERF_QUERY_BUDGET", 50)
+
+
+def get_window():
+    return getattr(settings, "PERF_WINDOW", 1000)
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not values:
+        return None
+    rank = max(1, -(-len(values) * pct // 100))
+    return values[rank - 1]
+
+
+class EndpointStats:
+    """Rolling samples of ``(queries, db_ms, wall_ms)`` per endpoint."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._samples = defaultdict(lambda: deque(maxlen=get_window()))
+            self._counts = defaultdict(int)
+
+    def record(self, endpoint, queries, db_ms, wall_ms):
+        with self._lock:
+            self._samples[endpoint].append((queries, db_ms, wall_ms))
+            self._counts[endpoint] += 1
+
+    def snapshot(self):
+        """Summaries of every endpoint, keyed by endpoint name."""
+        with self._lock:
+            samples = {name: list(values) for name, values in self._samples.items()}
+            counts = dict(self._counts)
+
+        summary = {}
+        for name, values in sorted(samples.items()):
+            columns = zip(*values)
+            summary[name] = {"requests": counts[name], "window": len(values)}
+            for metric, column in zip(("queries", "db_ms", "wall_ms"), columns):
+                column = sorted(column)
+                summary[name][metric] = {
+                    f"p{pct}": percentile(column, pct) for pct in PERCENTILES
+                }
+                summary[name][metric]["max"] = column[-1]
+        return summary
+
+
+stats = EndpointStats()
+
+
+def endpoint_name(view_func, method):
+    """``ViewSet.action`` for DRF views, the function name for plain views."""
+    cls = getattr(view_func, "cls", None)
+    if cls is None:
+        return getattr(view_func, "__qualname__", repr(view_func))
+    actions = getattr(view_func, "actions", None) or {}
+    return f"{cls.__name__}.{actions.get(method.lower(), method.lower())}"
+
+
+class QueryTimer:
+    """``execute_wrapper`` that counts queries and sums their duration."""
+
+    def __init__(self):
+        self.queries = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds += time.perf_counter() - start
+            self.queries += 1
+
+
+_current_timer = ContextVar("perf_timer", default=None)
+
+
+def _time_query(execute, sql, params, many, context):
+    timer = _current_timer.get()
+    if timer is None:
+        return execute(sql, params, many, context)
+    return timer(execute, sql, params, many, context)
+
+
+def install_timer(connection, **kwargs):
+    """Time the queries of ``connection`` into the current request's timer."""
+    if _time_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_time_query)
+
+
+connection_created.connect(install_timer)
+
+
+class PerfMiddleware(BaseMiddleware):
+    # The timer has to be current while the view runs, so both entry points
+    # wrap the call instead of only looking at the response
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        # Connections opened before this module was imported
+        for connection in connections.all(initialized_only=True):
+            install_timer(connection)
+        with self.timed() as (timer, start):
+            response = self.get_response(request)
+        return self.finish(request, response, timer, start)
+
+    async def __acall__(self, request):
+        with self.timed() as (timer, start):
+            response = await self.get_response(request)
+        return self.finish(request, response, timer, start)
+
+    @contextmanager
+    def timed(self):
+        timer = QueryTimer()
+        token = _current_timer.set(timer)
+        try:
+            yield timer, time.perf_counter()
+        finally:
+            _current_timer.reset(token)
+
+    def finish(self, request, response, timer, start):
+        # For streaming responses this covers producing the response, not
+        # sending its body
+        wall_ms = (time.perf_counter() - start) * 1000
+        db_ms = timer.seconds * 1000
+
+        response.headers["Server-Timing"] = ", ".join(
+            value
+            for value in (
+                response.headers.get("Server-Timing"),
+                f'db;dur={db_ms:.1f};desc="{timer.queries} queries"',
+                f"total;dur={wall_ms:.1f}",
+            )
+            if value
+        )
+
+        # The resolved view rather than a process_view hook, which under ASGI
+        # would cost a switch to the sync thread on every request
+        match = getattr(request, "resolver_match", None)
+        if match is not None:
+            endpoint = endpoint_name(match.func, request.method)
+            stats.record(endpoint, timer.queries, round(db_ms, 3), round(wall_ms, 3))
+            budget = get_query_budget()
+            if budget is not None and timer.queries > budget:
+                logger.warning(
+                    "%s ran %d queries, over the budget of %d (%s %s)",
+                    endpoint,
+                    timer.queries,
+                    budget,
+                    request.method,
+                    request.path,
+                )
+        return response
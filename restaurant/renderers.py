@@ -0,0 +1,69 @@
+import csv
+import io
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+from rest_framework.renderers import BaseRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import msgpack
+except ImportError:  # Optional; settings only register MessagePack if present
+    msgpack = None
+
+
+# The export actions stream their own rows; these renderers take part in
+# content negotiation and render the small non-streamed responses (errors)
+class CSVRenderer(BaseRenderer):
+    media_type = "text/csv"
+    format = "csv"
+    charset = "utf-8"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        rows = data.items() if isinstance(data, dict) else enumerate(data)
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for key, value in rows:
+            writer.writerow([key, value])
+        return buffer.getvalue().encode(self.charset)
+
+
+class NDJSONRenderer(BaseRenderer):
+    media_type = "application/x-ndjson"
+    format = "ndjson"
+    charset = "utf-8"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        line = json.dumps(data, cls=DjangoJSONEncoder) + "\n"
+        return line.encode(self.charset)
+
+
+# Binary JSON for the tablets and kitchen display, chosen with
+# Accept: application/msgpack. Values JSON has no type for (dates, decimals)
+# are encoded as the same strings JSONRenderer writes.
+class MessagePackRenderer(BaseRenderer):
+    media_type = "application/msgpack"
+    format = "msgpack"
+    charset = None
+    render_style = "binary"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        return msgpack.packb(data, default=JSONEncoder().default)
+
+
+class MessagePackParser(BaseParser):
+    media_type = "application/msgpack"
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return msgpack.unpackb(stream.read())
+        except ValueError as exc:
+            raise ParseError(f"MessagePack parse error - {exc}")
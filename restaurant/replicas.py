@@ -0,0 +1,146 @@
+"""Read replicas for the safe requests of selected views.
+
+Views that use ``ReplicaReadMixin`` run the reads of GET, HEAD and OPTIONS
+requests on one of the ``REPLICA_DATABASES`` aliases; ``ReplicaRouter``
+sends every other query to the primary. A client that has just written gets
+a cookie that keeps its reads on the primary for ``REPLICA_STICKY_SECONDS``,
+so it reads its own writes despite replication lag. A replica that fails a query is skipped for ``REPLICA_RETRY_SECONDS``
+and the request is run again on the primary.
+
+Locally, two SQLite files stand in for a primary and its replica: copy the
+database file and point ``DATABASE_REPLICAS`` at the copy.
+"""
+
+import logging
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DatabaseError
+
+from .middleware import BaseMiddleware
+
+logger = logging.getLogger(__name__)
+
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+STICKY_COOKIE = "read_primary"
+
+_read_alias = ContextVar("replica_read_alias", default=None)
+_unavailable = {}  # alias -> time.monotonic() until which it is skipped
+_lock = threading.Lock()
+
+
+def get_replicas():
+    return getattr(settings, "REPLICA_DATABASES", [])
+
+
+def get_sticky_seconds():
+    return getattr(settings, "REPLICA_STICKY_SECONDS", 5)
+
+
+def get_retry_seconds():
+    return getattr(settings, "REPLICA_RETRY_SECONDS", 30)
+
+
+def mark_unavailable(alias):
+    with _lock:
+        _unavailable[alias] = time.monotonic() + get_retry_seconds()
+
+
+def reset_unavailable():
+    with _lock:
+        _unavailable.clear()
+
+
+def available_replicas():
+    now = time.monotonic()
+    with _lock:
+        return [alias for alias in get_replicas() if _unavailable.get(alias, 0) <= now]
+
+
+def read_alias_for(request):
+    """The replica ``request`` reads from, or None for the primary."""
+    if request.method not in SAFE_METHODS or STICKY_COOKIE in request.COOKIES:
+        return None
+    replicas = available_replicas()
+    return random.choice(replicas) if replicas else None
+
+
+@contextmanager
+def reading_from(alias):
+    """Route the reads of the block to ``alias`` (None: the primary)."""
+    token = _read_alias.set(alias)
+    try:
+        yield
+    finally:
+        _read_alias.reset(token)
+
+
+def failed(alias, exc):
+    """Whether ``exc`` means the replica ``alias`` cannot serve reads now."""
+    if alias is None or not isinstance(exc, DatabaseError):
+        return False
+    logger.warning("Replica %s failed, reading from the primary: %s", alias, exc)
+    mark_unavailable(alias)
+    return True
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        return _read_alias.get()
+
+    def db_for_write(self, model, **hints):
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # The replicas hold the same rows as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        # Replicas get their schema through replication
+        return False if db in get_replicas() else None
+
+
+class ReplicaReadMixin:
+    """Read from a replica in the safe requests of this view."""
+
+    def dispatch(self, request, *args, **kwargs):
+        with reading_from(None):
+            return super().dispatch(request, *args, **kwargs)
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        _read_alias.set(read_alias_for(request))
+
+    def handle_exception(self, exc):
+        alias = _read_alias.get()
+        if not failed(alias, exc):
+            return super().handle_exception(exc)
+        _read_alias.set(None)
+        try:
+            handler = getattr(self, self.request.method.lower())
+            return handler(self.request, *self.args, **self.kwargs)
+        except Exception as retry_exc:
+            return super().handle_exception(retry_exc)
+
+
+class ReplicaStickinessMiddleware(BaseMiddleware):
+    """Keep a client's reads on the primary for a while after it writes."""
+
+    def process_response(self, request, response):
+        if (
+            get_replicas()
+            and request.method not in SAFE_METHODS
+            and response.status_code < 400
+        ):
+            response.set_cookie(
+                STICKY_COOKIE,
+                "1",
+                max_age=get_sticky_seconds(),
+                httponly=True,
+                samesite="Lax",
+            )
+        return response
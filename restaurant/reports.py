@@ -0,0 +1,192 @@
+"""Daily sales rollups per category, waiter and table.
+
+A bill counts towards the day it was paid. Paying a bill adds its order to
+the rollups and un-paying or deleting it takes the order back out, in the
+transaction that makes the change, so reports read a few rows per day
+instead of scanning orders. That relies on a paid order keeping its lines,
+table and waiter, which the API enforces. ``rebuild`` recomputes the rollups
+from the paid bills and the archived orders, e.g. after a backfill.
+"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db import transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate
+
+_retained = ContextVar("reports_retained", default=False)
+
+
+@contextmanager
+def retained():
+    """Keep the payments of paid bills deleted in the block in the rollups.
+
+    For archiving, which moves the orders rather than dropping their sales.
+    """
+    token = _retained.set(True)
+    try:
+        yield
+    finally:
+        _retained.reset(token)
+
+
+def is_retained():
+    return _retained.get()
+
+
+def _add(model, day, rows):
+    """Add ``deltas`` to the ``(day, key)`` row of ``model`` for each row."""
+    # Make sure every row exists, then increment in place; concurrent
+    # payments on the same day only ever add to the counters
+    model.objects.bulk_create(
+        [model(day=day, **key) for key, _ in rows], ignore_conflicts=True
+    )
+    for key, deltas in rows:
+        model.objects.filter(day=day, **key).update(
+            **{name: F(name) + value for name, value in deltas.items()}
+        )
+
+
+def record_payment(order_id, day, sign=1):
+    """Add (``sign=1``) or remove (``sign=-1``) an order from ``day``'s rollups."""
+    from .models import (
+        DailyCategorySales,
+        DailyTableSales,
+        DailyWaiterSales,
+        Order,
+        OrderLine,
+    )
+
+    order = Order.objects.values("table_id", "waiter_id", "total_amount").get(
+        pk=order_id
+    )
+    categories = (
+        OrderLine.objects.filter(order_id=order_id)
+        .values(category_id=F("menu_item__menu__category_id"))
+        .annotate(revenue=Sum("line_total"), items_sold=Sum("quantity"))
+        .order_by("category_id")
+    )
+    totals = {"revenue": sign * order["total_amount"], "orders": sign}
+    _add(DailyTableSales, day, [({"table_id": order["table_id"]}, totals)])
+    _add(DailyWaiterSales, day, [({"waiter_id": order["waiter_id"]}, totals)])
+    _add(
+        DailyCategorySales,
+        day,
+        [
+            (
+                {"category_id": row["category_id"]},
+                {
+                    "revenue": sign * row["revenue"],
+                    "items_sold": sign * row["items_sold"],
+                    "orders": sign,
+                },
+            )
+            for row in categories
+        ],
+    )
+
+
+@transaction.atomic
+def rebuild(start=None, end=None):
+    """Recompute the rollups for ``start``..``end`` (inclusive dates).
+
+    Returns the number of rows written per rollup model.
+    """
+    from .models import (
+        ArchivedOrder,
+        ArchivedOrderLine,
+        Bill,
+        Category,
+        DailyCategorySales,
+        DailyTableSales,
+        DailyWaiterSales,
+        OrderLine,
+        Table,
+        Waiter,
+    )
+
+    def in_range(queryset, field="day"):
+        if start is not None:
+            queryset = queryset.filter(**{f"{field}__gte": start})
+        if end is not None:
+            queryset = queryset.filter(**{f"{field}__lte": end})
+        return queryset
+
+    bills = in_range(
+        Bill.objects.filter(is_paid=True).annotate(day=TruncDate("paid_at"))
+    )
+    lines = in_range(
+        OrderLine.objects.filter(order__bill__is_paid=True).annotate(
+            day=TruncDate("order__bill__paid_at")
+        )
+    )
+    # Archived orders were paid too; they may live on another database, so
+    # their rows are added up here rather than in the query
+    archived = in_range(ArchivedOrder.objects.annotate(day=TruncDate("paid_at")))
+    archived_lines = in_range(
+        ArchivedOrderLine.objects.annotate(day=TruncDate("order__paid_at"))
+    )
+    sources = {
+        DailyTableSales: (
+            "table_id",
+            Table,
+            [
+                bills.values("day", table_id=F("order__table_id")).annotate(
+                    revenue=Sum("order__total_amount"), orders=Count("id")
+                ),
+                archived.values("day", "table_id").annotate(
+                    revenue=Sum("total_amount"), orders=Count("id")
+                ),
+            ],
+        ),
+        DailyWaiterSales: (
+            "waiter_id",
+            Waiter,
+            [
+                bills.values("day", waiter_id=F("order__waiter_id")).annotate(
+                    revenue=Sum("order__total_amount"), orders=Count("id")
+                ),
+                archived.values("day", "waiter_id").annotate(
+                    revenue=Sum("total_amount"), orders=Count("id")
+                ),
+            ],
+        ),
+        DailyCategorySales: (
+            "category_id",
+            Category,
+            [
+                lines.values(
+                    "day", category_id=F("menu_item__menu__category_id")
+                ).annotate(
+                    revenue=Sum("line_total"),
+                    items_sold=Sum("quantity"),
+                    orders=Count("order_id", distinct=True),
+                ),
+                archived_lines.values("day", "category_id").annotate(
+                    revenue=Sum("line_total"),
+                    items_sold=Sum("quantity"),
+                    orders=Count("order_id", distinct=True),
+                ),
+            ],
+        ),
+    }
+
+    written = {}
+    for model, (key, related, querysets) in sources.items():
+        # Archived rows outlive the tables, waiters and categories they name
+        existing = set(related.objects.values_list("pk", flat=True))
+        merged = {}
+        for rows in querysets:
+            for row in rows.order_by():
+                if row[key] not in existing:
+                    continue
+                total = merged.setdefault((row["day"], row[key]), dict.fromkeys(row, 0))
+                for name, value in row.items():
+                    total[name] = value if name in ("day", key) else total[name] + value
+        in_range(model.objects.all()).delete()
+        created = model.objects.bulk_create(
+            [model(**row) for row in merged.values()], batch_size=1000
+        )
+        written[model.__name__] = len(created)
+    return written
@@ -0,0 +1,107 @@
+"""Indexed word search over short text columns, for autocomplete.
+
+Every word of the query has to be a word of the column, except the last one,
+which only has to start a word: it is usually still being typed. On PostgreSQL
+the columns carry GIN trigram indexes that serve the ``icontains`` lookups used
+there. On SQLite each column gets an FTS5 table kept in sync by triggers and
+queried with prefix matches. Other backends, or SQLite builds without FTS5,
+fall back to unindexed ``icontains``.
+
+Migration 0011 creates the indexes. On SQLite a later migration that
+rebuilds one of the indexed tables drops its triggers, so such a migration
+has to recreate them.
+"""
+
+import re
+
+from django.db import connections
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+from rest_framework.filters import SearchFilter
+
+MAX_WORDS = 8
+
+_fts_tables = {}
+
+
+def fts_table(table, column):
+    return f"{table}_{column}_fts"
+
+
+def _has_fts(connection, table, column):
+    key = (connection.alias, connection.settings_dict["NAME"])
+    if key not in _fts_tables:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'table' "
+                "AND name LIKE '%\\_fts' ESCAPE '\\'"
+            )
+            _fts_tables[key] = {row[0] for row in cursor.fetchall()}
+    return fts_table(table, column) in _fts_tables[key]
+
+
+def words(query):
+    return re.findall(r"\w+", query.lower())[:MAX_WORDS]
+
+
+def search(queryset, field, query, candidates=None):
+    """Rows of ``queryset`` whose ``field`` matches ``query``.
+
+    A query without words matches nothing. ``candidates`` caps how many index
+    matches are considered, for callers that only want a few good rows of a
+    possibly huge result; it only applies to the FTS5 index.
+    """
+    terms = words(query)
+    if not terms:
+        return queryset.none()
+    connection = connections[queryset.db]
+    table = queryset.model._meta.db_table
+    column = queryset.model._meta.get_field(field).column
+    if connection.vendor == "sqlite" and _has_fts(connection, table, column):
+        fts = fts_table(table, column)
+        match = " ".join([f'"{term}"' for term in terms[:-1]] + [f'"{terms[-1]}"*'])
+        sql = f"SELECT rowid FROM {fts} WHERE {fts} MATCH %s"
+        params = [match]
+        if candidates is not None:
+            sql += " LIMIT %s"
+            params.append(candidates)
+        return queryset.filter(pk__in=RawSQL(sql, params))
+    condition = Q()
+    for term in terms:
+        condition &= Q(**{f"{field}__icontains": term})
+    return queryset.filter(condition)
+
+
+class IndexedSearchFilter(SearchFilter):
+    """``SearchFilter`` that answers ``?search=`` through the search indexes.
+
+    ``search_fields`` entries are ``"=field"`` for an exact match on a number,
+    or ``"name"`` / ``"relation__name"`` (one level deep) for an indexed text
+    column. A row matches when every search term matches one of the fields.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        search_fields = self.get_search_fields(view, request)
+        terms = self.get_search_terms(request)
+        if not search_fields or not terms:
+            return queryset
+
+        for term in terms:
+            condition = Q()
+            for search_field in search_fields:
+                if search_field.startswith("="):
+                    if term.isdigit():
+                        condition |= Q(**{search_field[1:]: int(term)})
+                    continue
+                relation, _, field = search_field.rpartition("__")
+                if relation:
+                    related = queryset.model._meta.get_field(relation).related_model
+                    matches = search(related._default_manager.all(), field, term)
+                    condition |= Q(**{f"{relation}__in": matches})
+                else:
+                    matches = search(queryset.model._default_manager.all(), field, term)
+                    condition |= Q(pk__in=matches.values("pk"))
+            if not condition:
+                return queryset.none()
+            queryset = queryset.filter(condition)
+        return queryset
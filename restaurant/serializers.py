@@ -1,5 +1,12 @@
+import time
+
+from django.db import IntegrityError, OperationalError, transaction
 from rest_framework import serializers
+from .fieldsets import SparseFieldsetMixin
 from .models import (
+    ArchivedOrder,
+    ArchivedOrderLine,
+    KitchenTicket,
     Table,
     Category,
     Menu,
@@ -7,12 +14,16 @@ from .models import (
     Waiter,
     Reception,
     Order,
+    OrderLine,
     Bill,
     Reservation,
+    DailyCategorySales,
+    DailyWaiterSales,
+    DailyTableSales,
 )
 
 
-class TableSerializer(serializers.ModelSerializer):
+class TableSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = Table
         fields = [
@@ -23,15 +34,17 @@ class TableSerializer(serializers.ModelSerializer):
             "created_at",
             "updated_at",
         ]
+        # The status moves by the table's transitions
+        read_only_fields = ["status"]
 
 
-class CategorySerializer(serializers.ModelSerializer):
+class CategorySerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = Category
         fields = ["id", "name", "created_at", "updated_at"]
 
 
-class MenuSerializer(serializers.ModelSerializer):
+class MenuSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     category = CategorySerializer()
 
     class Meta:
@@ -46,7 +59,7 @@ class MenuSerializer(serializers.ModelSerializer):
         ]
 
 
-class MenuItemSerializer(serializers.ModelSerializer):
+class MenuItemSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = MenuItem
         fields = [
@@ -58,7 +71,7 @@ class MenuItemSerializer(serializers.ModelSerializer):
         ]
 
 
-class WaiterSerializer(serializers.ModelSerializer):
+class WaiterSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = Waiter
         fields = [
@@ -70,7 +83,7 @@ class WaiterSerializer(serializers.ModelSerializer):
         ]
 
 
-class ReceptionSerializer(serializers.ModelSerializer):
+class ReceptionSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = Reception
         fields = [
@@ -82,8 +95,25 @@ class ReceptionSerializer(serializers.ModelSerializer):
         ]
 
 
+class OrderLineSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    class Meta:
+        model = OrderLine
+        fields = [
+            "id",
+            "menu_item",
+            "quantity",
+            "unit_price",
+            "line_total",
+        ]
+        read_only_fields = ["unit_price", "line_total"]
+
+
 # OrderSerializer with logic to create Bill after Order is created
-class OrderSerializer(serializers.ModelSerializer):
+class OrderSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    menu_items = serializers.PrimaryKeyRelatedField(
+        many=True, queryset=MenuItem.objects.all(), required=False
+    )  # Repeating a menu item orders it more than once
+    lines = OrderLineSerializer(many=True, required=False)
     total_price = (
         serializers.SerializerMethodField()
     )  # Add a method field for total price
@@ -94,41 +124,154 @@ class OrderSerializer(serializers.ModelSerializer):
             "id",
             "table",
             "menu_items",
+            "lines",
             "waiter",
             "total_price",
         ]  # Add total_price to fields
 
     def get_total_price(self, obj):
-        return obj.calculate_total()
+        return obj.total_amount
 
+    def get_quantities(self, validated_data):
+        """Merge ``menu_items`` and ``lines`` into ``{menu_item: quantity}``."""
+        menu_items_data = validated_data.pop("menu_items", None)
+        lines_data = validated_data.pop("lines", None)
+        if menu_items_data is None and lines_data is None:
+            return None
+
+        quantities = {}
+        for menu_item in menu_items_data or []:
+            quantities[menu_item] = quantities.get(menu_item, 0) + 1
+        for line in lines_data or []:
+            menu_item = line["menu_item"]
+            quantities[menu_item] = quantities.get(menu_item, 0) + line.get(
+                "quantity", 1
+            )
+        return quantities
+
+    @transaction.atomic
     def create(self, validated_data):
-        menu_items_data = validated_data.pop("menu_items", [])
+        quantities = self.get_quantities(validated_data)
         order = Order.objects.create(**validated_data)
 
         # Add menu items to the order
-        order.menu_items.set(menu_items_data)
+        order.set_lines(quantities or {})
 
         # Bill is auto-generated by the signal
         return order
 
+    @transaction.atomic
     def update(self, instance, validated_data):
-        menu_items_data = validated_data.pop("menu_items", None)
+        quantities = self.get_quantities(validated_data)
+        changed = (
+            quantities is not None
+            or validated_data.get("table", instance.table) != instance.table
+            or validated_data.get("waiter", instance.waiter) != instance.waiter
+        )
+        # The sales rollups hold what the order was when it was paid; the
+        # lock keeps a payment from slipping in before the change commits
+        if (
+            changed
+            and Bill.objects.select_for_update()
+            .filter(order=instance, is_paid=True)
+            .exists()
+        ):
+            raise serializers.ValidationError(
+                {"error": "Order has been paid and cannot be changed."}
+            )
 
         # Update the order fields
         instance.table = validated_data.get("table", instance.table)
         instance.waiter = validated_data.get("waiter", instance.waiter)
-        instance.save()
+        # Leave total_amount alone; it is only moved by line deltas
+        instance.save(update_fields=["table", "waiter", "updated_at"])
 
         # Update menu items if provided
-        if menu_items_data is not None:
-            instance.menu_items.set(menu_items_data)
+        if quantities is not None:
+            instance.set_lines(quantities)
 
         # The Bill will be auto-updated due to the signal
         return instance
 
 
+class BulkOrderLineSerializer(serializers.Serializer):
+    menu_item = serializers.IntegerField()
+    quantity = serializers.IntegerField(min_value=1, default=1)
+
+
+# Validates one order of a bulk submission against objects preloaded for the
+# whole batch, so validating hundreds of orders costs a fixed number of queries
+class BulkOrderSerializer(serializers.Serializer):
+    table = serializers.IntegerField()
+    waiter = serializers.IntegerField()
+    menu_items = serializers.ListField(child=serializers.IntegerField(), required=False)
+    lines = BulkOrderLineSerializer(many=True, required=False)
+
+    does_not_exist = 'Invalid pk "{pk_value}" - object does not exist.'
+
+    @staticmethod
+    def preload(items):
+        """Fetch every table, waiter and menu item referenced by ``items``."""
+
+        def as_list(value):
+            return value if isinstance(value, list) else []
+
+        ids = {Table: [], Waiter: [], MenuItem: []}
+        for item in items:
+            if not isinstance(item, dict):
+                continue
+            ids[Table].append(item.get("table"))
+            ids[Waiter].append(item.get("waiter"))
+            ids[MenuItem].extend(as_list(item.get("menu_items")))
+            ids[MenuItem].extend(
+                line.get("menu_item")
+                for line in as_list(item.get("lines"))
+                if isinstance(line, dict)
+            )
+
+        related = {}
+        for model, values in ids.items():
+            pks = set()
+            for value in values:
+                try:
+                    pks.add(int(value))
+                except (TypeError, ValueError):
+                    pass  # Reported by field validation
+            related[model] = model.objects.in_bulk(pks)
+        return related
+
+    def lookup(self, model, pk):
+        instance = self.context["related"][model].get(pk)
+        if instance is None:
+            raise serializers.ValidationError(self.does_not_exist.format(pk_value=pk))
+        return instance
+
+    def validate_table(self, value):
+        return self.lookup(Table, value)
+
+    def validate_waiter(self, value):
+        return self.lookup(Waiter, value)
+
+    def validate(self, data):
+        quantities = {}
+        try:
+            for pk in data.pop("menu_items", []):
+                menu_item = self.lookup(MenuItem, pk)
+                quantities[menu_item] = quantities.get(menu_item, 0) + 1
+        except serializers.ValidationError as exc:
+            raise serializers.ValidationError({"menu_items": exc.detail})
+        try:
+            for line in data.pop("lines", []):
+                menu_item = self.lookup(MenuItem, line["menu_item"])
+                quantities[menu_item] = quantities.get(menu_item, 0) + line["quantity"]
+        except serializers.ValidationError as exc:
+            raise serializers.ValidationError({"lines": exc.detail})
+        data["quantities"] = quantities
+        return data
+
+
 # BillSerializer to display Bill data
-class BillSerializer(serializers.ModelSerializer):
+class BillSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     order = OrderSerializer(read_only=True)
 
     class Meta:
@@ -138,21 +281,115 @@ class BillSerializer(serializers.ModelSerializer):
             "order",
             "total_amount",
             "is_paid",
+            "paid_at",
             "created_at",
             "updated_at",
         ]
 
     def update(self, instance, validated_data):
         # Update only the is_paid status; total_amount is handled automatically
-        instance.is_paid = validated_data.get("is_paid", instance.is_paid)
-        instance.save()
+        paid = validated_data.get("is_paid", instance.is_paid)
+        if paid != instance.is_paid:
+            # The transition also keeps the sales rollups up to date
+            if paid:
+                instance.mark_paid()
+            else:
+                instance.mark_unpaid()
         return instance
 
 
-class ReservationSerializer(serializers.ModelSerializer):
+class KitchenTicketLineSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    name = serializers.CharField(source="menu_item.name", read_only=True)
+
+    class Meta:
+        model = OrderLine
+        fields = ["menu_item", "name", "quantity"]
+
+
+class KitchenTicketSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    lines = KitchenTicketLineSerializer(source="order.lines", many=True, read_only=True)
+
+    class Meta:
+        model = KitchenTicket
+        fields = [
+            "id",
+            "order",
+            "table",
+            "status",
+            "priority",
+            "station",
+            "lines",
+            "claimed_at",
+            "created_at",
+            "updated_at",
+        ]
+        # Only the priority is edited directly; the rest moves by transitions
+        read_only_fields = ["order", "table", "status", "station"]
+
+
+class ArchivedOrderLineSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    class Meta:
+        model = ArchivedOrderLine
+        fields = [
+            "id",
+            "menu_item_id",
+            "menu_item_name",
+            "quantity",
+            "unit_price",
+            "line_total",
+        ]
+
+
+class ArchivedOrderSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    lines = ArchivedOrderLineSerializer(many=True, read_only=True)
+
+    class Meta:
+        model = ArchivedOrder
+        fields = [
+            "id",
+            "table_id",
+            "table_number",
+            "waiter_id",
+            "waiter_name",
+            "lines",
+            "total_amount",
+            "bill_id",
+            "paid_at",
+            "created_at",
+            "archived_at",
+        ]
+
+
+class DailyCategorySalesSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    category_name = serializers.CharField(source="category.name", read_only=True)
+
+    class Meta:
+        model = DailyCategorySales
+        fields = ["day", "category", "category_name", "revenue", "orders", "items_sold"]
+
+
+class DailyWaiterSalesSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    waiter_name = serializers.CharField(source="waiter.name", read_only=True)
+
+    class Meta:
+        model = DailyWaiterSales
+        fields = ["day", "waiter", "waiter_name", "revenue", "orders"]
+
+
+class DailyTableSalesSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    table_number = serializers.IntegerField(source="table.number", read_only=True)
+
+    class Meta:
+        model = DailyTableSales
+        fields = ["day", "table", "table_number", "revenue", "orders"]
+
+
+class ReservationSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     table = serializers.PrimaryKeyRelatedField(queryset=Table.objects.all())
     capacity = serializers.IntegerField(write_only=True, required=False)
 
+    booking_attempts = 5
+
     class Meta:
         model = Reservation
         fields = [
@@ -160,31 +397,83 @@ class ReservationSerializer(serializers.ModelSerializer):
             "table",
             "customer_name",
             "reservation_time",
+            "duration",
+            "end_time",
             "is_confirmed",
+            "is_cancelled",
             "capacity",
         ]
+        read_only_fields = ["end_time", "is_cancelled"]
 
     def validate(self, data):
-        table = data.get("table")
+        # A partial update keeps the table it does not send
+        table = data.get("table") or getattr(self.instance, "table", None)
         capacity = data.get("capacity")
 
         if table and capacity:
-            table_instance = Table.objects.get(id=table.id)
-            if table_instance.capacity < capacity:
+            if table.capacity < capacity:
                 raise serializers.ValidationError(
                     "Table does not have sufficient capacity."
                 )
-            if table_instance.status != "Available":
-                raise serializers.ValidationError("Table is not available.")
+        if table and self.clashes(data).exists():
+            raise serializers.ValidationError("Table is not available.")
 
         return data
 
+    def clashes(self, data):
+        """Active reservations of the table that overlap the requested slot."""
+        instance = self.instance
+        table = data.get("table") or instance.table
+        start = data.get("reservation_time") or instance.reservation_time
+        duration = data.get("duration") or (
+            instance.duration if instance else Reservation.DEFAULT_DURATION
+        )
+        clashes = Reservation.objects.active().overlapping(start, start + duration)
+        clashes = clashes.filter(table=table)
+        if instance is not None:
+            clashes = clashes.exclude(pk=instance.pk)
+        return clashes
+
+    def booked(self, validated_data, write):
+        """Run ``write`` under the table's row lock, checking for clashes first.
+
+        The UPDATE of ``lock_table`` holds the table's row lock, so bookings
+        of one table are checked and written one at a time.
+        """
+        table = validated_data.get("table") or self.instance.table
+        for attempt in range(self.booking_attempts):
+            try:
+                with transaction.atomic():
+                    Reservation.lock_table(table.id)
+                    # validate() checked without the lock; check again under it
+                    if self.clashes(validated_data).exists():
+                        raise serializers.ValidationError("Table is not available.")
+                    return write()
+            except IntegrityError:
+                raise serializers.ValidationError("Table is not available.")
+            except OperationalError:
+                # SQLite reports a busy database instead of waiting for locks
+                # inside an outer transaction; only retry when we own it
+                if transaction.get_connection().in_atomic_block or (
+                    attempt == self.booking_attempts - 1
+                ):
+                    raise
+                time.sleep(0.01 * (attempt + 1))
+
     def create(self, validated_data):
-        table = validated_data.get("table")
-        table_instance = Table.objects.get(id=table.id)
+        validated_data.pop("capacity", None)
 
-        # Reserve the table
-        table_instance.status = "Reserved"
-        table_instance.save()
+        def write():
+            reservation = super(ReservationSerializer, self).create(validated_data)
+            # A table already reserved or occupied stays so
+            Table.move(reservation.table_id, Table.RESERVED)
+            return reservation
 
-        return super().create(validated_data)
+        return self.booked(validated_data, write)
+
+    def update(self, instance, validated_data):
+        validated_data.pop("capacity", None)
+        return self.booked(
+            validated_data,
+            lambda: super(ReservationSerializer, self).update(instance, validated_data),
+        )
@@ -1,3 +1,2084 @@
-# from django.test import TestCase
+import asyncio
+import gzip
+import io
+import os
+import sqlite3
+import tempfile
+import json
+import threading
+import time
+import tracemalloc
+import unittest
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync, sync_to_async
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection, connections, transaction
+from django.test import AsyncClient, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+
+from . import (
+    archive,
+    benchmarks,
+    billing,
+    compression,
+    events,
+    idempotency,
+    kitchen,
+    perf,
+    renderers,
+    replicas,
+    reports,
+)
+from .models import (
+    ArchivedOrder,
+    ArchivedOrderLine,
+    Bill,
+    Category,
+    DailyCategorySales,
+    DailyTableSales,
+    DailyWaiterSales,
+    IdempotencyKey,
+    KitchenTicket,
+    Menu,
+    MenuItem,
+    Order,
+    OrderLine,
+    Reservation,
+    Table,
+    Waiter,
+)
+from .paginations import CreatedAtCursorPagination
+from .serializers import ReservationSerializer
+from .views import BillViewSet, MenuItemViewSet
+
+User = get_user_model()
+
+
+class RestaurantTestMixin:
+    """Shared fixtures for the API tests."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.category = Category.objects.create(name="Mains")
+        self.menu = Menu.objects.create(
+            name="Dinner", price=Decimal("10.00"), category=self.category
+        )
+        self.burger = MenuItem.objects.create(
+            menu=self.menu, name="Burger", price=Decimal("8.50")
+        )
+        self.fries = MenuItem.objects.create(
+            menu=self.menu, name="Fries", price=Decimal("3.25")
+        )
+        self.table = Table.objects.create(number=1, capacity=4)
+        self.waiter = Waiter.objects.create(name="Sam", age=30)
+
+    def create_order(self, *menu_items):
+        quantities = {}
+        for menu_item in menu_items:
+            quantities[menu_item] = quantities.get(menu_item, 0) + 1
+        # Run the commit hooks as if the order had been committed
+        with self.captureOnCommitCallbacks(execute=True):
+            order = Order.objects.create(table=self.table, waiter=self.waiter)
+            order.set_lines(quantities)
+        return order
+
+
+class OrderQueryCountTests(RestaurantTestMixin, TestCase):
+    def test_list_query_count_does_not_grow_with_orders(self):
+        for _ in range(3):
+            self.create_order(self.burger, self.fries)
+        with self.assertNumQueries(3):
+            response = self.client.get("/api/Orders/")
+        self.assertEqual(len(response.data["results"]), 3)
+
+        for _ in range(20):
+            self.create_order(self.burger)
+        with self.assertNumQueries(3):
+            response = self.client.get("/api/Orders/")
+        self.assertEqual(len(response.data["results"]), 23)
+
+    def test_total_price_is_read_from_the_order(self):
+        order = self.create_order(self.burger, self.fries)
+        empty = self.create_order()
+        with self.assertNumQueries(3):
+            response = self.client.get(f"/api/Orders/{order.id}/")
+        self.assertEqual(Decimal(str(response.data["total_price"])), Decimal("11.75"))
+
+        response = self.client.get(f"/api/Orders/{empty.id}/")
+        self.assertEqual(Decimal(str(response.data["total_price"])), Decimal("0.00"))
+
+
+class OrderLineTests(RestaurantTestMixin, TestCase):
+    def test_create_with_repeated_menu_items_and_lines(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                "/api/Orders/",
+                {
+                    "table": self.table.id,
+                    "waiter": self.waiter.id,
+                    "menu_items": [self.burger.id, self.burger.id],
+                    "lines": [{"menu_item": self.fries.id, "quantity": 3}],
+                },
+                format="json",
+            )
+        self.assertEqual(response.status_code, 201)
+        order = Order.objects.get(pk=response.data["id"])
+        self.assertEqual(order.lines.get(menu_item=self.burger).quantity, 2)
+        self.assertEqual(order.total_amount, Decimal("26.75"))
+        self.assertEqual(order.bill.total_amount, Decimal("26.75"))
+
+    def test_unit_price_is_captured_at_order_time(self):
+        order = self.create_order(self.burger)
+        self.burger.price = Decimal("20.00")
+        self.burger.save()
+
+        order.refresh_from_db()
+        self.assertEqual(order.total_amount, Decimal("8.50"))
+        self.assertEqual(order.calculate_total(), Decimal("8.50"))
+
+    def test_totals_follow_line_changes(self):
+        order = self.create_order(self.burger, self.fries)
+        with self.captureOnCommitCallbacks(execute=True):
+            order.set_lines({self.burger: 2})
+        order.refresh_from_db()
+        self.assertEqual(order.total_amount, Decimal("17.00"))
+        self.assertEqual(order.bill.total_amount, Decimal("17.00"))
+
+        line = order.lines.get()
+        with self.captureOnCommitCallbacks(execute=True):
+            line.quantity = 1
+            line.save()
+            OrderLine.objects.create(order=order, menu_item=self.fries, quantity=2)
+        order.refresh_from_db()
+        self.assertEqual(order.total_amount, Decimal("15.00"))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            line.delete()
+        order.refresh_from_db()
+        self.assertEqual(order.total_amount, Decimal("6.50"))
+        self.assertEqual(order.bill.total_amount, Decimal("6.50"))
+
+    def test_ordered_items_cannot_be_deleted(self):
+        order = self.create_order(self.burger)
+        for url, name in [
+            (f"/api/MenuItems/{self.burger.id}/", "Menu item"),
+            (f"/api/Menus/{self.menu.id}/", "Menu"),
+            (f"/api/Categories/{self.category.id}/", "Category"),
+        ]:
+            response = self.client.delete(url)
+            self.assertEqual(response.status_code, 409)
+            self.assertEqual(
+                response.data,
+                {"error": f"{name} has been ordered and cannot be deleted."},
+            )
+        self.assertEqual(order.lines.get().menu_item, self.burger)
+
+        # Items nobody ordered still go
+        response = self.client.delete(f"/api/MenuItems/{self.fries.id}/")
+        self.assertEqual(response.status_code, 204)
+
+
+class BillRecalculationTests(RestaurantTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        billing.stats.reset()
+
+    def test_order_update_recalculates_bill_once(self):
+        order = self.create_order(self.burger)
+        billing.stats.reset()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch(
+                f"/api/Orders/{order.id}/",
+                {"menu_items": [self.burger.id, self.fries.id, self.fries.id]},
+                format="json",
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(billing.stats.flushes, 1)
+        order.bill.refresh_from_db()
+        self.assertEqual(order.bill.total_amount, Decimal("15.00"))
+
+    def test_dirty_bills_are_flushed_in_one_update(self):
+        orders = [self.create_order(self.burger) for _ in range(5)]
+        billing.stats.reset()
+        with self.captureOnCommitCallbacks(execute=True):
+            for order in orders:
+                order.bill.calculate_total()
+        self.assertEqual(billing.stats.flushes, 1)
+        self.assertEqual(billing.stats.bills, 5)
+        for order in orders:
+            order.bill.refresh_from_db()
+            self.assertEqual(order.bill.total_amount, Decimal("8.50"))
+
+    def test_rolled_back_work_is_not_recalculated(self):
+        order = self.create_order(self.burger)
+        billing.stats.reset()
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    order.bill.calculate_total()
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+        self.assertEqual(billing.stats.flushes, 0)
+
+
+class BulkOrderTests(RestaurantTestMixin, TestCase):
+    def test_bulk_creates_orders_lines_and_bills(self):
+        payload = [
+            {
+                "table": self.table.id,
+                "waiter": self.waiter.id,
+                "lines": [{"menu_item": self.burger.id, "quantity": 2}],
+            },
+            {
+                "table": self.table.id,
+                "waiter": self.waiter.id,
+                "menu_items": [self.fries.id, self.fries.id],
+            },
+        ]
+        response = self.client.post("/api/Orders/bulk/", payload, format="json")
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual([item["status"] for item in response.data], [201, 201])
+
+        first = Order.objects.get(pk=response.data[0]["id"])
+        second = Order.objects.get(pk=response.data[1]["id"])
+        self.assertEqual(first.total_amount, Decimal("17.00"))
+        self.assertEqual(first.bill.total_amount, Decimal("17.00"))
+        self.assertEqual(second.lines.get().quantity, 2)
+        self.assertEqual(second.bill.total_amount, Decimal("6.50"))
+
+    def test_invalid_items_are_reported_per_item(self):
+        payload = [
+            {"table": self.table.id, "waiter": self.waiter.id, "menu_items": [999]},
+            {"table": self.table.id, "waiter": self.waiter.id},
+            "not an order",
+        ]
+        response = self.client.post("/api/Orders/bulk/", payload, format="json")
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual([item["status"] for item in response.data], [400, 201, 400])
+        self.assertIn("menu_items", response.data[0]["errors"])
+        self.assertEqual(Order.objects.count(), 1)
+
+    def test_query_count_does_not_grow_with_batch_size(self):
+        def payload(count):
+            return [
+                {
+                    "table": self.table.id,
+                    "waiter": self.waiter.id,
+                    "menu_items": [self.burger.id, self.fries.id],
+                }
+                for _ in range(count)
+            ]
+
+        with CaptureQueriesContext(connection) as small:
+            self.client.post("/api/Orders/bulk/", payload(2), format="json")
+        with CaptureQueriesContext(connection) as large:
+            self.client.post("/api/Orders/bulk/", payload(50), format="json")
+        self.assertEqual(len(small), len(large))
+
+
+class IdempotencyTests(RestaurantTestMixin, TestCase):
+    def post_order(self, key):
+        return self.client.post(
+            "/api/Orders/",
+            {
+                "table": self.table.id,
+                "waiter": self.waiter.id,
+                "menu_items": [self.burger.id],
+            },
+            format="json",
+            headers={"Idempotency-Key": key},
+        )
+
+    def test_retried_post_replays_stored_response(self):
+        first = self.post_order("pos-1-0001")
+        with self.assertNumQueries(1):
+            second = self.post_order("pos-1-0001")
+
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual(second.status_code, 201)
+        self.assertEqual(second.json(), first.json())
+        self.assertEqual(second["Idempotent-Replayed"], "true")
+        self.assertEqual(Order.objects.count(), 1)
+
+    def test_retried_bill_patch_is_not_applied_twice(self):
+        order = self.create_order(self.burger)
+        url = f"/api/Bills/{order.bill.id}/"
+        headers = {"Idempotency-Key": "bill-paid-1"}
+        self.client.patch(url, {"is_paid": True}, format="json", headers=headers)
+        Bill.objects.filter(pk=order.bill.id).update(is_paid=False)
+
+        response = self.client.patch(
+            url, {"is_paid": True}, format="json", headers=headers
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.data["is_paid"])
+        self.assertFalse(Bill.objects.get(pk=order.bill.id).is_paid)
+
+    def test_key_reused_for_another_request_is_rejected(self):
+        self.post_order("shared")
+        order = Order.objects.get()
+        response = self.client.patch(
+            f"/api/Bills/{order.bill.id}/",
+            {"is_paid": True},
+            format="json",
+            headers={"Idempotency-Key": "shared"},
+        )
+        self.assertEqual(response.status_code, 422)
+
+    def test_expired_keys_are_evicted(self):
+        self.post_order("old-key")
+        IdempotencyKey.objects.update(expires_at=timezone.now())
+        self.post_order("old-key")
+        self.assertEqual(Order.objects.count(), 2)
+
+        IdempotencyKey.objects.update(expires_at=timezone.now())
+        self.assertEqual(idempotency.purge_expired(), 1)
+
+
+class AvailabilityTests(RestaurantTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.big_table = Table.objects.create(number=2, capacity=8)
+        self.start = timezone.now().replace(microsecond=0) + timedelta(days=1)
+        Reservation.objects.create(
+            table=self.table, customer_name="Ada", reservation_time=self.start
+        )
+
+    def get_available(self, **params):
+        return self.client.get("/api/Reservations/available-tables/", params)
+
+    def test_overlapping_reservation_blocks_table(self):
+        with self.assertNumQueries(1):
+            response = self.get_available(
+                capacity=2, time=(self.start + timedelta(hours=1)).isoformat()
+            )
+        self.assertEqual([table["id"] for table in response.data], [self.big_table.id])
+
+    def test_adjacent_slot_is_free(self):
+        response = self.get_available(
+            capacity=2,
+            time=(self.start - timedelta(hours=1)).isoformat(),
+            duration=60,
+        )
+        self.assertEqual(
+            [table["id"] for table in response.data],
+            [self.table.id, self.big_table.id],
+        )
+
+    def test_impossible_time_is_rejected(self):
+        for value in ("2026-02-30T10:00", "tomorrow"):
+            response = self.get_available(capacity=2, time=value)
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(
+                response.data, {"error": "Time must be an ISO 8601 datetime."}
+            )
+
+    def test_capacity_and_status_filter_walk_ins(self):
+        self.big_table.status = "Occupied"
+        self.big_table.save()
+        response = self.get_available(capacity=6)
+        self.assertEqual(response.status_code, 404)
+
+    def test_end_time_follows_reservation_time(self):
+        reservation = Reservation.objects.get()
+        self.assertEqual(reservation.end_time, self.start + timedelta(hours=2))
+        reservation.duration = timedelta(minutes=30)
+        reservation.save(update_fields=["duration"])
+        reservation.refresh_from_db()
+        self.assertEqual(reservation.end_time, self.start + timedelta(minutes=30))
+
+
+class ReservationBookingTests(RestaurantTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.start = timezone.now().replace(microsecond=0) + timedelta(days=1)
+
+    def book(self, start, table=None):
+        return self.client.post(
+            "/api/Reservations/",
+            {
+                "table": (table or self.table).id,
+                "customer_name": "Ada",
+                "reservation_time": start.isoformat(),
+            },
+            format="json",
+        )
+
+    def test_overlapping_booking_is_rejected(self):
+        self.assertEqual(self.book(self.start).status_code, 201)
+        self.assertEqual(self.book(self.start).status_code, 400)
+        response = self.book(self.start + timedelta(minutes=90))
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.book(self.start + timedelta(hours=2)).status_code, 201)
+        self.table.refresh_from_db()
+        self.assertEqual(self.table.status, "Reserved")
+
+    def test_partial_update_cannot_move_onto_a_booked_slot(self):
+        self.assertEqual(self.book(self.start).status_code, 201)
+        later = self.book(self.start + timedelta(hours=3)).data["id"]
+        url = f"/api/Reservations/{later}/"
+
+        response = self.client.patch(
+            url,
+            {"reservation_time": (self.start + timedelta(hours=1)).isoformat()},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 400)
+        response = self.client.patch(
+            url,
+            {
+                "reservation_time": (self.start - timedelta(hours=1)).isoformat(),
+                "duration": "00:30:00",
+            },
+            format="json",
+        )
+        self.assertEqual(response.status_code, 200)
+        response = self.client.patch(url, {"duration": "03:00:00"}, format="json")
+        self.assertEqual(response.status_code, 400)
+        response = self.client.patch(url, {"capacity": 10}, format="json")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            Reservation.objects.get(pk=later).reservation_time,
+            self.start - timedelta(hours=1),
+        )
+
+    def test_cancelled_booking_frees_the_slot(self):
+        reservation = Reservation.objects.get(pk=self.book(self.start).data["id"])
+        reservation.confirm_reservation()
+        reservation.confirm_reservation()
+        reservation.cancel_reservation()
+        self.table.refresh_from_db()
+        self.assertEqual(self.table.status, "Available")
+        self.assertTrue(reservation.is_cancelled)
+        self.assertEqual(self.book(self.start).status_code, 201)
+
+
+class ConcurrentBookingTests(TransactionTestCase):
+    threads = 8
+    attempts_per_thread = 5
+
+    def setUp(self):
+        if connection.vendor == "sqlite" and connection.is_in_memory_db():
+            self.skipTest(
+                "Threads cannot share a locked in-memory SQLite database; "
+                "set DATABASE_TEST_NAME to a file to run this test."
+            )
+        self.tables = [
+            Table.objects.create(number=number, capacity=4) for number in (1, 2)
+        ]
+        self.start = timezone.now().replace(microsecond=0) + timedelta(days=1)
+
+    def test_concurrent_bookings_never_double_book(self):
+        statuses = []
+        # Hold every thread after validation until all of them got there, so
+        # the first bookings all race past the unlocked availability check
+        race = threading.Barrier(self.threads)
+        raced = threading.local()
+        validate = ReservationSerializer.validate
+
+        def racing_validate(serializer, data):
+            data = validate(serializer, data)
+            if not getattr(raced, "done", False):
+                raced.done = True
+                race.wait(timeout=10)
+            return data
+
+        def worker(index):
+            client = APIClient()
+            try:
+                for attempt in range(self.attempts_per_thread):
+                    # Every booking overlaps every other booking of its table
+                    start = self.start + timedelta(minutes=index + attempt)
+                    response = client.post(
+                        "/api/Reservations/",
+                        {
+                            "table": self.tables[index % 2].id,
+                            "customer_name": f"Guest {index}-{attempt}",
+                            "reservation_time": start.isoformat(),
+                        },
+                        format="json",
+                    )
+                    statuses.append(response.status_code)
+            finally:
+                connection.close()
+
+        workers = [
+            threading.Thread(target=worker, args=(index,))
+            for index in range(self.threads)
+        ]
+        began = time.perf_counter()
+        with mock.patch.object(ReservationSerializer, "validate", racing_validate):
+            for thread in workers:
+                thread.start()
+            for thread in workers:
+                thread.join()
+        elapsed = time.perf_counter() - began
+
+        self.assertEqual(len(statuses), self.threads * self.attempts_per_thread)
+        self.assertEqual(sorted(set(statuses)), [201, 400])
+        self.assertEqual(statuses.count(201), 2)
+        for table in self.tables:
+            self.assertEqual(table.reservation_set.count(), 1)
+        # Contention must not turn into lock timeouts
+        self.assertLess(elapsed, 10)
+
+
+class TableStatusTests(RestaurantTestMixin, TestCase):
+    def transition(self, name, table=None):
+        return self.client.post(f"/api/Tables/{(table or self.table).id}/{name}/")
+
+    def test_transitions_follow_the_floor(self):
+        response = self.transition("reserve")
+        self.assertEqual(response.data["status"], Table.RESERVED)
+        response = self.transition("reserve")
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.data, {"error": "Table is Reserved."})
+
+        self.assertEqual(self.transition("seat").data["status"], Table.OCCUPIED)
+        self.assertEqual(self.transition("reserve").status_code, 409)
+        self.assertEqual(self.transition("free").data["status"], Table.AVAILABLE)
+        self.assertEqual(self.transition("free").status_code, 409)
+        # Walk-ins are seated without a reservation
+        self.assertEqual(self.transition("seat").data["status"], Table.OCCUPIED)
+
+    def test_status_is_only_changed_by_transitions(self):
+        response = self.client.patch(
+            f"/api/Tables/{self.table.id}/", {"status": "Occupied"}, format="json"
+        )
+        self.assertEqual(response.data["status"], Table.AVAILABLE)
+        response = self.client.post(
+            "/api/Tables/", {"number": 2, "capacity": 2, "status": "Occupied"}
+        )
+        self.assertEqual(response.data["status"], Table.AVAILABLE)
+
+    def test_a_transition_is_one_conditional_update(self):
+        host = Table.objects.get()
+        waiter = Table.objects.get()
+        with CaptureQueriesContext(connection) as queries:
+            self.assertTrue(host.transition(Table.OCCUPIED))
+        self.assertEqual(len(queries), 1)
+        self.assertIn(f"\"status\" IN ('{Table.AVAILABLE}'", queries[0]["sql"])
+
+        # Read before the host seated the table: the stale status no longer
+        # matches, so the reservation is refused instead of overwriting it
+        self.assertEqual(waiter.status, Table.AVAILABLE)
+        self.assertFalse(waiter.transition(Table.RESERVED))
+        self.assertEqual(waiter.status, Table.OCCUPIED)
+
+    def test_bookings_do_not_unseat_a_table(self):
+        start = timezone.now().replace(microsecond=0) + timedelta(days=1)
+        response = self.client.post(
+            "/api/Reservations/",
+            {
+                "table": self.table.id,
+                "customer_name": "Ada",
+                "reservation_time": start.isoformat(),
+            },
+            format="json",
+        )
+        self.table.refresh_from_db()
+        self.assertEqual(self.table.status, Table.RESERVED)
+
+        self.table.transition(Table.OCCUPIED)
+        reservation = Reservation.objects.get(pk=response.data["id"])
+        reservation.confirm_reservation()
+        reservation.cancel_reservation()
+        self.assertTrue(reservation.is_cancelled)
+        self.table.refresh_from_db()
+        self.assertEqual(self.table.status, Table.OCCUPIED)
+
+    def test_reset_floor_in_one_update(self):
+        reserved = Table.objects.create(number=2, capacity=2, status=Table.RESERVED)
+        Table.objects.create(number=3, capacity=2)
+        self.table.transition(Table.OCCUPIED)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post("/api/Tables/reset-floor/")
+        self.assertEqual(response.data, {"reset": 2})
+        updates = [query for query in queries if query["sql"].startswith("UPDATE")]
+        self.assertEqual(len(updates), 1)
+        self.assertEqual(
+            set(Table.objects.values_list("status", flat=True)), {Table.AVAILABLE}
+        )
+        reserved.refresh_from_db()
+        self.assertEqual(reserved.status, Table.AVAILABLE)
+
+        out = io.StringIO()
+        call_command("reset_floor", stdout=out)
+        self.assertIn("Reset 0 table(s)", out.getvalue())
+
+    def test_status_filter_uses_its_index(self):
+        if connection.vendor != "sqlite":
+            self.skipTest("Checks the SQLite query plan")
+        plan = Table.objects.filter(status=Table.RESERVED).explain()
+        self.assertIn("USING INDEX", plan)
+
+
+class MenuSnapshotTests(RestaurantTestMixin, TestCase):
+    def setUp(self):
+        cache.clear()
+        super().setUp()
+
+    def test_snapshot_is_cached_and_revalidated_without_queries(self):
+        with self.assertNumQueries(3):
+            response = self.client.get("/api/menu-snapshot/")
+        categories = response.json()
+        self.assertEqual(categories[0]["name"], "Mains")
+        self.assertEqual(
+            [item["name"] for item in categories[0]["menus"][0]["items"]],
+            ["Burger", "Fries"],
+        )
+
+        etag = response["ETag"]
+        with self.assertNumQueries(0):
+            cached = self.client.get("/api/menu-snapshot/")
+            not_modified = self.client.get(
+                "/api/menu-snapshot/", headers={"If-None-Match": etag}
+            )
+        self.assertEqual(cached.content, response.content)
+        self.assertEqual(not_modified.status_code, 304)
+
+    def test_catalog_changes_bump_the_version(self):
+        etag = self.client.get("/api/menu-snapshot/")["ETag"]
+        with self.captureOnCommitCallbacks(execute=True):
+            self.fries.price = Decimal("4.00")
+            self.fries.save()
+
+        response = self.client.get(
+            "/api/menu-snapshot/", headers={"If-None-Match": etag}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+        items = response.json()[0]["menus"][0]["items"]
+        self.assertEqual(items[1]["price"], "4.00")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.category.delete()
+        self.assertEqual(self.client.get("/api/menu-snapshot/").json(), [])
+
+
+class CursorPaginationTests(RestaurantTestMixin, TestCase):
+    def test_orders_are_paged_newest_first_without_gaps(self):
+        orders = [self.create_order(self.burger) for _ in range(7)]
+        # Identical timestamps fall back to the id for a stable order
+        Order.objects.filter(pk__in=[o.pk for o in orders[2:5]]).update(
+            created_at=orders[2].created_at
+        )
+        expected = list(
+            Order.objects.order_by("-created_at", "-id").values_list("id", flat=True)
+        )
+
+        seen = []
+        url = "/api/Orders/?size=3"
+        while url:
+            with self.assertNumQueries(3):
+                response = self.client.get(url)
+            self.assertLessEqual(len(response.data["results"]), 3)
+            seen.extend(order["id"] for order in response.data["results"])
+            url = response.data["next"]
+        self.assertEqual(seen, expected)
+
+    def test_page_size_is_configurable_and_capped(self):
+        paginator = CreatedAtCursorPagination()
+        factory = APIRequestFactory()
+        for size, expected in (("", 50), ("20", 20), ("100000", 500)):
+            request = Request(factory.get("/api/Bills/", {"size": size}))
+            self.assertEqual(paginator.get_page_size(request), expected)
+
+
+class ExportTests(RestaurantTestMixin, TestCase):
+    def create_orders(self, count):
+        return Order.bulk_create_with_lines(
+            [
+                (Order(table=self.table, waiter=self.waiter), {self.burger: 1})
+                for _ in range(count)
+            ]
+        )
+
+    def consume(self, response):
+        return b"".join(response.streaming_content).decode()
+
+    def test_bills_stream_as_csv_within_the_date_range(self):
+        old, recent = self.create_orders(2)
+        Bill.objects.filter(order=old).update(
+            created_at=timezone.now() - timedelta(days=10)
+        )
+
+        response = self.client.get("/api/Bills/export/")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response["Content-Type"], "text/csv; charset=utf-8")
+        self.assertIn('filename="bills.csv"', response["Content-Disposition"])
+        lines = self.consume(response).splitlines()
+        self.assertEqual(
+            lines[0], "id,order,created_at,table,waiter,total_amount,is_paid"
+        )
+        self.assertEqual(len(lines), 3)
+
+        start = (timezone.now() - timedelta(days=1)).date().isoformat()
+        response = self.client.get("/api/Bills/export/", {"start": start})
+        lines = self.consume(response).splitlines()
+        self.assertEqual(len(lines), 2)
+        self.assertTrue(lines[1].startswith(f"{recent.bill.id},{recent.id},"))
+        self.assertTrue(lines[1].endswith(",1,Sam,8.50,False"))
+
+        response = self.client.get("/api/Bills/export/", {"end": start})
+        self.assertEqual(len(self.consume(response).splitlines()), 2)
+
+    def test_orders_stream_as_ndjson(self):
+        (order,) = self.create_orders(1)
+        response = self.client.get(
+            "/api/Orders/export/", headers={"Accept": "application/x-ndjson"}
+        )
+        self.assertEqual(
+            response["Content-Type"], "application/x-ndjson; charset=utf-8"
+        )
+        rows = [json.loads(line) for line in self.consume(response).splitlines()]
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]["id"], order.id)
+        self.assertEqual(rows[0]["table"], 1)
+        self.assertEqual(rows[0]["waiter"], "Sam")
+        self.assertEqual(rows[0]["total_amount"], "8.50")
+
+        response = self.client.get("/api/Orders/export/?format=ndjson")
+        self.assertEqual(len(self.consume(response).splitlines()), 1)
+
+    def test_invalid_range_is_rejected(self):
+        response = self.client.get("/api/Bills/export/", {"start": "yesterday"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_memory_does_not_grow_with_row_count(self):
+        def peak_memory():
+            tracemalloc.start()
+            try:
+                response = self.client.get("/api/Bills/export/")
+                self.assertFalse(response.is_async)
+                for _ in response.streaming_content:
+                    pass
+                return tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+
+        @async_to_sync
+        async def async_peak_memory():
+            tracemalloc.start()
+            try:
+                response = await self.async_client.get("/api/Bills/export/")
+                self.assertTrue(response.is_async)
+                async for _ in response.streaming_content:
+                    pass
+                return tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+
+        with mock.patch.object(BillViewSet, "export_chunk_size", 100):
+            self.create_orders(500)
+            small = peak_memory()
+            async_small = async_peak_memory()
+            self.create_orders(4500)
+            large = peak_memory()
+            async_large = async_peak_memory()
+        self.assertLess(large, 512 * 1024)
+        self.assertLess(large, small * 1.5)
+        self.assertLess(async_large, 512 * 1024)
+        self.assertLess(async_large, async_small * 1.5)
+
+
+class SalesRollupTests(RestaurantTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.drinks = Category.objects.create(name="Drinks")
+        drinks_menu = Menu.objects.create(
+            name="Bar", price=Decimal("5.00"), category=self.drinks
+        )
+        self.cola = MenuItem.objects.create(
+            menu=drinks_menu, name="Cola", price=Decimal("2.00")
+        )
+
+    def category_rows(self):
+        return {
+            row.category_id: (row.revenue, row.items_sold, row.orders)
+            for row in DailyCategorySales.objects.all()
+        }
+
+    def test_paying_a_bill_updates_the_rollups_once(self):
+        order = self.create_order(self.burger, self.burger, self.cola)
+        bill = order.bill
+
+        response = self.client.patch(
+            f"/api/Bills/{bill.id}/", {"is_paid": True}, format="json"
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNotNone(response.data["paid_at"])
+        self.client.patch(f"/api/Bills/{bill.id}/", {"is_paid": True}, format="json")
+        self.assertFalse(Bill.objects.get(pk=bill.pk).mark_paid())
+
+        self.assertEqual(
+            self.category_rows(),
+            {
+                self.category.id: (Decimal("17.00"), 2, 1),
+                self.drinks.id: (Decimal("2.00"), 1, 1),
+            },
+        )
+        waiter_row = DailyWaiterSales.objects.get()
+        self.assertEqual(
+            (waiter_row.waiter_id, waiter_row.revenue, waiter_row.orders),
+            (self.waiter.id, Decimal("19.00"), 1),
+        )
+        self.assertEqual(waiter_row.day, timezone.localdate())
+        self.assertEqual(DailyTableSales.objects.get().revenue, Decimal("19.00"))
+
+        self.client.patch(f"/api/Bills/{bill.id}/", {"is_paid": False}, format="json")
+        self.assertEqual(
+            self.category_rows(),
+            {
+                self.category.id: (Decimal("0.00"), 0, 0),
+                self.drinks.id: (Decimal("0.00"), 0, 0),
+            },
+        )
+        self.assertEqual(DailyWaiterSales.objects.get().orders, 0)
+
+    def test_saving_is_paid_goes_through_the_transition(self):
+        bill = self.create_order(self.fries).bill
+        stale = Bill.objects.get(pk=bill.pk)
+        bill.is_paid = True
+        bill.save()
+        self.assertEqual(DailyTableSales.objects.get().orders, 1)
+
+        # A stale full save does not overwrite the payment
+        stale.save()
+        stale.refresh_from_db()
+        self.assertTrue(stale.is_paid)
+        self.assertEqual(DailyTableSales.objects.get().orders, 1)
+
+    def test_paid_orders_cannot_be_changed(self):
+        order = self.create_order(self.burger)
+        order.bill.mark_paid()
+        other = Table.objects.create(number=2, capacity=4)
+        url = f"/api/Orders/{order.id}/"
+
+        for data in (
+            {"menu_items": [self.burger.id, self.cola.id]},
+            {"lines": [{"menu_item": self.burger.id, "quantity": 2}]},
+            {"table": other.id},
+        ):
+            response = self.client.patch(url, data, format="json")
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(
+                response.data, {"error": "Order has been paid and cannot be changed."}
+            )
+        response = self.client.patch(url, {"table": self.table.id}, format="json")
+        self.assertEqual(response.status_code, 200)
+
+        order.refresh_from_db()
+        self.assertEqual(order.total_amount, Decimal("8.50"))
+        self.assertEqual(order.table, self.table)
+        self.assertEqual(DailyTableSales.objects.get().revenue, Decimal("8.50"))
+
+        # Un-paying the bill takes out exactly what paying it added
+        order.bill.mark_unpaid()
+        response = self.client.patch(url, {"table": other.id}, format="json")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            set(DailyTableSales.objects.values_list("revenue", "orders")),
+            {(Decimal("0.00"), 0)},
+        )
+
+    def test_deleting_a_paid_bill_or_order_removes_its_payment(self):
+        kept = self.create_order(self.burger)
+        bill = self.create_order(self.burger, self.cola).bill
+        order = self.create_order(self.fries)
+        for paid in (kept.bill, bill, order.bill):
+            paid.mark_paid()
+        unpaid = self.create_order(self.cola)
+
+        response = self.client.delete(f"/api/Bills/{bill.id}/")
+        self.assertEqual(response.status_code, 204)
+        response = self.client.delete(f"/api/Orders/{order.id}/")
+        self.assertEqual(response.status_code, 204)
+        unpaid.delete()
+
+        self.assertEqual(
+            self.category_rows(),
+            {
+                self.category.id: (Decimal("8.50"), 1, 1),
+                self.drinks.id: (Decimal("0.00"), 0, 0),
+            },
+        )
+        waiter_row = DailyWaiterSales.objects.get()
+        self.assertEqual((waiter_row.revenue, waiter_row.orders), (Decimal("8.50"), 1))
+        self.assertEqual(reports.rebuild()["DailyWaiterSales"], 1)
+        self.assertEqual(DailyWaiterSales.objects.get().revenue, Decimal("8.50"))
+
+    def test_rebuild_matches_the_incremental_rollups(self):
+        for items in ((self.burger,), (self.fries, self.cola), (self.cola,)):
+            self.create_order(*items).bill.mark_paid()
+        self.create_order(self.burger)  # unpaid
+        incremental = self.category_rows()
+
+        written = reports.rebuild()
+        self.assertEqual(self.category_rows(), incremental)
+        self.assertEqual(
+            written,
+            {"DailyTableSales": 1, "DailyWaiterSales": 1, "DailyCategorySales": 2},
+        )
+        self.assertEqual(DailyWaiterSales.objects.get().revenue, Decimal("15.75"))
+
+    def test_reports_read_only_the_rollups(self):
+        for _ in range(3):
+            self.create_order(self.burger, self.cola).bill.mark_paid()
+        today = timezone.localdate()
+        DailyCategorySales.objects.create(
+            day=today - timedelta(days=3), category=self.category, revenue=5
+        )
+
+        with self.assertNumQueries(1):
+            response = self.client.get(
+                "/api/reports/categories/", {"start": today.isoformat()}
+            )
+        self.assertEqual(
+            [
+                (row["category_name"], row["revenue"], row["orders"])
+                for row in response.data
+            ],
+            [("Mains", "25.50", 3), ("Drinks", "6.00", 3)],
+        )
+        with self.assertNumQueries(1):
+            response = self.client.get("/api/reports/waiters/")
+        self.assertEqual(response.data[0]["waiter_name"], "Sam")
+        for params in (
+            {"end": "not-a-date"},
+            {"start": "2026-02-30"},
+            {"end": "2026-13-01"},
+        ):
+            response = self.client.get("/api/reports/tables/", params)
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(
+                response.data, {name: "Expected an ISO 8601 date." for name in params}
+            )
+
+
+class PerfMiddlewareTests(RestaurantTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        perf.stats.reset()
+        self.addCleanup(perf.stats.reset)
+
+    def test_requests_are_recorded_per_view_and_action(self):
+        self.create_order(self.burger)
+        response = self.client.get("/api/Orders/")
+        self.assertIn("db;dur=", response["Server-Timing"])
+        self.assertIn('desc="3 queries"', response["Server-Timing"])
+        self.assertIn("total;dur=", response["Server-Timing"])
+        self.client.get("/api/Orders/")
+        self.client.get(f"/api/Tables/{self.table.id}/")
+
+        snapshot = perf.stats.snapshot()
+        self.assertEqual(set(snapshot), {"OrderViewSet.list", "TableViewSet.retrieve"})
+        orders = snapshot["OrderViewSet.list"]
+        self.assertEqual(orders["requests"], 2)
+        self.assertEqual(orders["queries"], {"p50": 3, "p95": 3, "p99": 3, "max": 3})
+        self.assertGreaterEqual(orders["wall_ms"]["p99"], orders["db_ms"]["p99"])
+
+    def test_percentiles_cover_a_rolling_window(self):
+        with self.settings(PERF_WINDOW=10):
+            perf.stats.reset()
+            for queries in range(1, 21):
+                perf.stats.record("view.get", queries, 1.0, 2.0)
+        summary = perf.stats.snapshot()["view.get"]
+        self.assertEqual(summary["requests"], 20)
+        self.assertEqual(summary["window"], 10)
+        self.assertEqual(
+            summary["queries"], {"p50": 15, "p95": 20, "p99": 20, "max": 20}
+        )
+
+    def test_stats_endpoint_is_staff_only(self):
+        self.client.get("/api/Tables/")
+        self.assertEqual(self.client.get("/api/_perf/").status_code, 403)
+
+        staff = User.objects.create_user("admin", is_staff=True)
+        self.client.force_authenticate(staff)
+        response = self.client.get("/api/_perf/")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("TableViewSet.list", response.data)
+
+        self.assertEqual(self.client.delete("/api/_perf/").status_code, 204)
+        self.assertNotIn("TableViewSet.list", perf.stats.snapshot())
+
+    def test_exceeding_the_query_budget_logs_a_warning(self):
+        self.create_order(self.burger)
+        with self.settings(PERF_QUERY_BUDGET=2):
+            with self.assertLogs("restaurant.perf", "WARNING") as logs:
+                self.client.get("/api/Orders/")
+        self.assertIn("OrderViewSet.list ran 3 queries", logs.output[0])
+
+        with self.settings(PERF_QUERY_BUDGET=3), self.assertNoLogs("restaurant.perf"):
+            self.client.get("/api/Orders/")
+
+
+class BenchmarkComparisonTests(TestCase):
+    def test_latency_summary(self):
+        summary = benchmarks.latency_summary([float(ms) for ms in range(100, 0, -1)])
+        self.assertEqual(summary, {"p50_ms": 50.0, "p99_ms": 99.0, "max_ms": 100.0})
+
+    def test_changes_are_measured_in_the_worse_direction(self):
+        baseline = {
+            "api": {
+                "orders_list": {
+                    "requests": 200,
+                    "p99_ms": 10.0,
+                    "requests_per_second": 100.0,
+                    "queries_per_request": 3.0,
+                }
+            },
+            "removed": {"p50_ms": 1.0},
+        }
+        current = {
+            "api": {
+                "orders_list": {
+                    "requests": 400,
+                    "p99_ms": 15.0,
+                    "requests_per_second": 125.0,
+                    "queries_per_request": 3.0,
+                }
+            },
+            "added": {"p50_ms": 1.0},
+        }
+        self.assertEqual(
+            list(benchmarks.compare(baseline, current)),
+            [
+                ("api.orders_list.p99_ms", 10.0, 15.0, 0.5),
+                ("api.orders_list.requests_per_second", 100.0, 125.0, -0.25),
+                ("api.orders_list.queries_per_request", 3.0, 3.0, 0.0),
+            ],
+        )
+
+
+class GenerateRestaurantDataTests(TestCase):
+    def generate(self, **options):
+        counts = {
+            "categories": 2,
+            "menus": 3,
+            "menu_items": 10,
+            "waiters": 3,
+            "tables": 4,
+            "reservations": 20,
+            "orders": 25,
+            "batch_size": 10,
+            "seed": 7,
+        }
+        counts.update(options)
+        call_command("generate_restaurant_data", stdout=io.StringIO(), **counts)
+
+    def signature(self):
+        return [
+            (
+                order.table.number,
+                order.waiter.name,
+                order.total_amount,
+                order.bill.total_amount,
+                order.bill.is_paid,
+                [
+                    (line.menu_item.name, line.quantity, line.line_total)
+                    for line in order.lines.order_by("menu_item__name")
+                ],
+            )
+            for order in Order.objects.order_by("created_at", "id")
+        ]
+
+    def test_generates_consistent_data(self):
+        self.generate()
+        self.assertEqual(Order.objects.count(), 25)
+        self.assertEqual(Bill.objects.count(), 25)
+        self.assertEqual(Reservation.objects.count(), 20)
+        for order in Order.objects.all():
+            self.assertEqual(order.calculate_total(), order.total_amount)
+            self.assertEqual(order.bill.total_amount, order.total_amount)
+        self.assertEqual(
+            sum(row.revenue for row in DailyWaiterSales.objects.all()),
+            sum(bill.total_amount for bill in Bill.objects.filter(is_paid=True)),
+        )
+        # Orders are spread over the past days, oldest batch first
+        days = Order.objects.dates("created_at", "day")
+        self.assertEqual(len(days), 3)
+        # Like the orders the app creates, each one has a kitchen ticket
+        self.assertEqual(
+            sorted(
+                KitchenTicket.objects.values_list(
+                    "order_id", "table_id", "status", "created_at"
+                )
+            ),
+            sorted(
+                (
+                    order.id,
+                    order.table_id,
+                    (
+                        KitchenTicket.SERVED
+                        if order.bill.is_paid
+                        else KitchenTicket.QUEUED
+                    ),
+                    order.created_at,
+                )
+                for order in Order.objects.select_related("bill")
+            ),
+        )
+
+    def test_the_menu_snapshot_is_invalidated(self):
+        cache.clear()
+        self.assertEqual(self.client.get("/api/menu-snapshot/").json(), [])
+        self.generate()
+        self.assertEqual(len(self.client.get("/api/menu-snapshot/").json()), 2)
+
+    def test_backends_without_returned_keys(self):
+        self.generate()
+        expected = self.signature()
+        for model in (Reservation, Order, Table, Waiter, Category):
+            model.objects.all().delete()
+        with mock.patch.object(
+            type(connection.features), "can_return_rows_from_bulk_insert", False
+        ):
+            self.generate()
+        self.assertEqual(self.signature(), expected)
+        self.assertEqual(KitchenTicket.objects.count(), 25)
+
+    def test_same_seed_gives_same_data(self):
+        self.generate()
+        first = self.signature()
+        for model in (Reservation, Order, Table, Waiter, Category):
+            model.objects.all().delete()
+        self.generate()
+        self.assertEqual(self.signature(), first)
+        self.generate(seed=8)
+        self.assertNotEqual(self.signature()[25:], first)
+
+
+class AdminQueryCountTests(RestaurantTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        admin = User.objects.create_superuser("admin", password="admin")
+        self.client.force_login(admin)
+
+    def changelist_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def assert_constant_queries(self, url, add_rows):
+        add_rows(2)
+        few = self.changelist_queries(url)
+        add_rows(15)
+        self.assertEqual(self.changelist_queries(url), few)
+
+    def test_menu_item_changelist(self):
+        def add_rows(count):
+            for i in range(count):
+                category = Category.objects.create(name=f"Category {i}")
+                menu = Menu.objects.create(
+                    name=f"Menu {i}", price=Decimal("1.00"), category=category
+                )
+                MenuItem.objects.create(menu=menu, name=f"Dish {i}", price=1)
+
+        self.assert_constant_queries("/admin/restaurant/menuitem/", add_rows)
+        response = self.client.get("/admin/restaurant/menuitem/")
+        self.assertContains(response, "Category 14")
+
+    def test_menu_changelist(self):
+        def add_rows(count):
+            for i in range(count):
+                category = Category.objects.create(name=f"Category {i}")
+                Menu.objects.create(
+                    name=f"Menu {i}", price=Decimal("1.00"), category=category
+                )
+
+        self.assert_constant_queries("/admin/restaurant/menu/", add_rows)
+
+    def test_order_and_bill_changelists(self):
+        def add_rows(count):
+            for _ in range(count):
+                table = Table.objects.create(
+                    number=Table.objects.count() + 1, capacity=2
+                )
+                waiter = Waiter.objects.create(name="Alex", age=40)
+                with self.captureOnCommitCallbacks(execute=True):
+                    order = Order.objects.create(table=table, waiter=waiter)
+                    order.set_lines({self.burger: 2})
+
+        self.assert_constant_queries("/admin/restaurant/order/", add_rows)
+        self.assert_constant_queries("/admin/restaurant/bill/", add_rows)
+        response = self.client.get("/admin/restaurant/bill/")
+        self.assertContains(response, "17.00")
+
+    def test_reservation_changelist(self):
+        def add_rows(count):
+            for _ in range(count):
+                table = Table.objects.create(
+                    number=Table.objects.count() + 1, capacity=2
+                )
+                Reservation.objects.create(
+                    table=table,
+                    customer_name="Kim",
+                    reservation_time=timezone.now() + timedelta(days=1),
+                )
+
+        self.assert_constant_queries("/admin/restaurant/reservation/", add_rows)
+
+
+class SearchTests(RestaurantTestMixin, TestCase):
+    def names(self, response):
+        return [item["name"] for item in response.data]
+
+    def test_menu_item_autocomplete(self):
+        MenuItem.objects.create(menu=self.menu, name="Cheese Burger", price=9)
+        MenuItem.objects.create(menu=self.menu, name="Crème brûlée", price=6)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get("/api/MenuItems/", {"q": "bur"})
+        self.assertEqual(self.names(response), ["Burger", "Cheese Burger"])
+        self.assertIn("_fts MATCH", queries[-1]["sql"])
+
+        response = self.client.get("/api/MenuItems/", {"q": "burger che"})
+        self.assertEqual(self.names(response), ["Cheese Burger"])
+        # Only the last word may be incomplete
+        self.assertEqual(self.client.get("/api/MenuItems/", {"q": "bur che"}).data, [])
+        response = self.client.get("/api/MenuItems/", {"q": "creme BRU"})
+        self.assertEqual(self.names(response), ["Crème brûlée"])
+        self.assertEqual(self.client.get("/api/MenuItems/", {"q": "urger"}).data, [])
+        self.assertEqual(self.client.get("/api/MenuItems/", {"q": "  "}).data, [])
+
+    def test_index_follows_writes(self):
+        self.fries.name = "Curly fries"
+        self.fries.save()
+        MenuItem.objects.bulk_create(
+            [MenuItem(menu=self.menu, name=f"Curry {i}", price=5) for i in range(30)]
+        )
+        self.burger.delete()
+
+        response = self.client.get("/api/MenuItems/", {"q": "cur"})
+        self.assertEqual(len(response.data), MenuItemViewSet.autocomplete_limit)
+        self.assertEqual(response.data[0]["name"], "Curry 0")
+        response = self.client.get("/api/MenuItems/", {"q": "fri"})
+        self.assertEqual(self.names(response), ["Curly fries"])
+        self.assertEqual(self.client.get("/api/MenuItems/", {"q": "burger"}).data, [])
+
+    def test_order_search_by_table_number_and_waiter(self):
+        other_waiter = Waiter.objects.create(name="Robin Hart", age=25)
+        other_table = Table.objects.create(number=12, capacity=2)
+        first = self.create_order(self.burger)
+        second = Order.objects.create(table=other_table, waiter=other_waiter)
+
+        def found(term):
+            response = self.client.get("/api/Orders/", {"search": term})
+            return {order["id"] for order in response.data["results"]}
+
+        self.assertEqual(found("1"), {first.id})
+        self.assertEqual(found("12"), {second.id})
+        self.assertEqual(found("har"), {second.id})
+        self.assertEqual(found("sam 1"), {first.id})
+        self.assertEqual(found("sam 12"), set())
+        self.assertEqual(found("x"), set())
+
+    def test_admin_search_uses_the_index(self):
+        admin = User.objects.create_superuser("admin", password="admin")
+        self.client.force_login(admin)
+        response = self.client.get("/admin/restaurant/menuitem/", {"q": "fri"})
+        self.assertContains(response, "Fries")
+        self.assertNotContains(response, "Burger")
+        response = self.client.get("/admin/restaurant/menuitem/", {"q": "mains"})
+        self.assertContains(response, "Burger")
+
+
+class EventTests(RestaurantTestMixin, TestCase):
+    def setUp(self):
+        # Publish the fixtures, so that the tests start with nothing pending
+        with self.captureOnCommitCallbacks(execute=True):
+            super().setUp()
+        events.reset_broker()
+        self.addCleanup(events.reset_broker)
+
+    def test_broker_history_and_reset(self):
+        broker = events.LocalBroker(history=3)
+        for i in range(5):
+            broker.publish("table", events.UPDATED, {"id": i})
+        self.assertEqual([event["seq"] for event in broker.since(3)], [4, 5])
+        self.assertEqual(broker.since(5), [])
+        self.assertEqual(len(broker.since(2)), 3)
+        self.assertIsNone(broker.since(1))
+        self.assertIsNone(broker.since(6))
+
+    def test_broker_wait(self):
+        broker = events.LocalBroker()
+
+        async def wait_for_publish():
+            loop = asyncio.get_running_loop()
+            loop.call_later(0.01, broker.publish, "bill", events.UPDATED, {"id": 1})
+            return await broker.wait(0, timeout=5)
+
+        self.assertEqual(asyncio.run(wait_for_publish())[0]["type"], "bill")
+        self.assertEqual(asyncio.run(broker.wait(1, timeout=0.01)), [])
+        self.assertEqual(broker._waiters, set())
+
+    def test_one_event_per_row_on_commit(self):
+        broker = events.get_broker()
+        seq = broker.last_seq
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            order = Order.objects.create(table=self.table, waiter=self.waiter)
+            order.set_lines({self.burger: 2})
+            order.set_lines({self.burger: 1, self.fries: 1})
+            self.assertEqual(broker.last_seq, seq)
+        self.assertEqual(len(callbacks), 2)  # Events and the bill recalculation
+
+        published = broker.since(seq)
+        self.assertEqual(
+            [(event["type"], event["action"]) for event in published],
+            [("ticket", events.CREATED), ("order", events.CREATED)],
+        )
+        self.assertEqual(len(published[1]["data"]["lines"]), 2)
+        self.assertEqual(published[1]["data"]["total_amount"], Decimal("11.75"))
+
+    def test_rollback_publishes_nothing(self):
+        broker = events.get_broker()
+        seq = broker.last_seq
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    Order.objects.create(table=self.table, waiter=self.waiter)
+                    raise ValueError
+            except ValueError:
+                pass
+        self.assertEqual(broker.since(seq), [])
+
+    def test_deleted_rows(self):
+        broker = events.get_broker()
+        with self.captureOnCommitCallbacks(execute=True):
+            table = Table.objects.create(number=7, capacity=2)
+        seq = broker.last_seq
+        with self.captureOnCommitCallbacks(execute=True):
+            table_id = table.id
+            table.capacity = 4
+            table.save()
+            table.delete()
+        (event,) = broker.since(seq)
+        self.assertEqual(event["action"], events.DELETED)
+        self.assertEqual(event["data"], {"id": table_id})
+
+    def test_poll(self):
+        response = self.client.get("/api/events/poll/", {"since": 0})
+        self.assertEqual(response.data, {"last_seq": 0, "reset": False, "events": []})
+
+        order = self.create_order(self.burger)
+        response = self.client.get("/api/events/poll/", {"since": 0})
+        self.assertFalse(response.data["reset"])
+        self.assertEqual(response.data["last_seq"], len(response.data["events"]))
+        self.assertIn(
+            ("order", order.id),
+            [(e["type"], e["data"]["id"]) for e in response.data["events"]],
+        )
+
+        response = self.client.get("/api/events/poll/", {"since": 1000})
+        self.assertTrue(response.data["reset"])
+        response = self.client.get("/api/events/poll/", {"since": "x"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_stream_needs_asgi(self):
+        response = self.client.get("/api/events/")
+        self.assertEqual(response.status_code, 501)
+
+    @override_settings(EVENTS_KEEPALIVE=0.01)
+    def test_stream(self):
+        broker = events.get_broker()
+        broker.publish("table", events.UPDATED, {"id": self.table.id})
+
+        async def read(**headers):
+            response = await AsyncClient().get("/api/events/", **headers)
+            self.assertEqual(response["Content-Type"], "text/event-stream")
+            chunks = aiter(response.streaming_content)
+            return [(await anext(chunks)).decode() for _ in range(2)]
+
+        first, second = asyncio.run(read(headers={"Last-Event-ID": "0"}))
+        self.assertEqual(
+            first,
+            'id: 1\nevent: table\ndata: {"seq": 1, "type": "table", '
+            f'"action": "updated", "data": {{"id": {self.table.id}}}}}\n\n',
+        )
+        self.assertEqual(second, ": keepalive\n\n")
+
+        first, _ = asyncio.run(read(headers={"Last-Event-ID": "5"}))
+        self.assertEqual(first, 'id: 1\nevent: reset\ndata: {"last_seq": 1}\n\n')
+
+
+class AsgiTests(RestaurantTestMixin, TestCase):
+    """The viewsets served through ``project/asgi.py``."""
+
+    def setUp(self):
+        super().setUp()
+        self.order = self.create_order(self.burger, self.burger, self.fries)
+
+    async def get(self, path, data=None, **headers):
+        response = await self.async_client.get(path, data, headers=headers)
+        expected = await sync_to_async(self.client.get)(path, data)
+        self.assertEqual(response.status_code, expected.status_code)
+        self.assertEqual(json.loads(response.content), json.loads(expected.content))
+        return response
+
+    async def test_same_answers_as_under_wsgi(self):
+        await self.get("/api/Tables/")
+        await self.get("/api/Menus/")
+        await self.get("/api/MenuItems/", {"q": "fri"})
+        await self.get(f"/api/Orders/{self.order.id}/")
+        await self.get("/api/Orders/0/")
+        await self.get("/api/Reservations/available-tables/", {"capacity": 2})
+        await self.get(
+            "/api/Reservations/available-tables/",
+            {"capacity": 2, "time": "2026-02-30T10:00"},
+        )
+
+    async def test_queries_are_profiled(self):
+        perf.stats.reset()
+        self.addCleanup(perf.stats.reset)
+        response = await self.get(f"/api/Orders/{self.order.id}/")
+        self.assertIn('desc="3 queries"', response["Server-Timing"])
+        snapshot = perf.stats.snapshot()
+        self.assertEqual(snapshot["OrderViewSet.retrieve"]["queries"]["max"], 3)
+
+    async def test_writes(self):
+        response = await self.async_client.post(
+            "/api/Tables/",
+            {"number": 9, "capacity": 2},
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(await Table.objects.filter(number=9).aexists())
+
+
+@override_settings(REPLICA_DATABASES=["replica"])
+class ReplicaRoutingTests(TransactionTestCase):
+    """A primary and a replica, as two SQLite databases.
+
+    The replica is a copy of the primary taken by ``replicate``, so it lags
+    behind until the next copy, like a replica with replication lag.
+    """
+
+    # The replica alias only exists while the class runs
+    databases = "__all__"
+
+    @classmethod
+    def setUpClass(cls):
+        if connection.vendor != "sqlite":
+            raise unittest.SkipTest("The replica is an SQLite file.")
+        cls.directory = tempfile.TemporaryDirectory()
+        connections.settings["replica"] = dict(
+            connections["default"].settings_dict,
+            NAME=os.path.join(cls.directory.name, "replica.sqlite3"),
+            TEST={"MIRROR": None},
+        )
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        connections["replica"].close()
+        del connections.settings["replica"]
+        delattr(connections._connections, "replica")
+        cls.directory.cleanup()
+
+    def setUp(self):
+        replicas.reset_unavailable()
+        self.addCleanup(replicas.reset_unavailable)
+        self.client = APIClient()
+        self.table = Table.objects.create(number=1, capacity=4)
+        self.replicate()
+
+    def replicate(self):
+        connections["replica"].close()
+        target = sqlite3.connect(connections["replica"].settings_dict["NAME"])
+        try:
+            connection.ensure_connection()
+            connection.connection.backup(target)
+        finally:
+            target.close()
+
+    def numbers(self, response):
+        self.assertEqual(response.status_code, 200)
+        return [table["number"] for table in response.json()]
+
+    def test_safe_requests_read_from_the_replica(self):
+        Table.objects.create(number=2, capacity=2)
+        self.assertEqual(self.numbers(self.client.get("/api/Tables/")), [1])
+        self.replicate()
+        self.assertEqual(self.numbers(self.client.get("/api/Tables/")), [1, 2])
+        # Views without the mixin read from the primary
+        Table.objects.create(number=3, capacity=2)
+        response = self.client.get(
+            "/api/Reservations/available-tables/", {"capacity": 1}
+        )
+        self.assertEqual(self.numbers(response), [2, 3, 1])
+
+    def test_writers_read_their_writes(self):
+        response = self.client.post(
+            "/api/Tables/", {"number": 2, "capacity": 2}, format="json"
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertFalse(Table.objects.using("replica").filter(number=2).exists())
+        sticky = response.cookies[replicas.STICKY_COOKIE]
+        self.assertEqual(sticky["max-age"], 5)
+        self.assertEqual(self.numbers(self.client.get("/api/Tables/")), [1, 2])
+
+        # Once the cookie expires, reads go back to the replica
+        del self.client.cookies[replicas.STICKY_COOKIE]
+        self.assertEqual(self.numbers(self.client.get("/api/Tables/")), [1])
+
+    def test_failed_replica_falls_back_to_the_primary(self):
+        with sqlite3.connect(connections["replica"].settings_dict["NAME"]) as replica:
+            replica.execute("DROP TABLE restaurant_table")
+        with self.assertLogs("restaurant.replicas", "WARNING"):
+            self.assertEqual(self.numbers(self.client.get("/api/Tables/")), [1])
+        self.assertEqual(replicas.available_replicas(), [])
+        with self.assertNoLogs("restaurant.replicas"):
+            self.assertEqual(self.numbers(self.client.get("/api/Tables/")), [1])
+
+    async def test_asgi_reads_from_the_replica(self):
+        await Table.objects.acreate(number=2, capacity=2)
+        response = await self.async_client.get("/api/Tables/")
+        self.assertEqual(self.numbers(response), [1])
+        response = await self.async_client.get(
+            "/api/Tables/", headers={"Cookie": f"{replicas.STICKY_COOKIE}=1"}
+        )
+        self.assertEqual(self.numbers(response), [1, 2])
+
+
+class SparseFieldsetTests(RestaurantTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.order = self.create_order(self.burger, self.fries)
+
+    def test_fields_picks_the_fields_rendered(self):
+        response = self.client.get("/api/Tables/", {"fields": "id,number"})
+        self.assertEqual(response.data, [{"id": self.table.id, "number": 1}])
+
+        response = self.client.get(
+            f"/api/Orders/{self.order.id}/", {"fields": "id,total_price"}
+        )
+        self.assertEqual(
+            response.data, {"id": self.order.id, "total_price": Decimal("11.75")}
+        )
+
+    def test_nested_serializers_render_as_keys_unless_expanded(self):
+        bill = self.order.bill
+        response = self.client.get(f"/api/Bills/{bill.id}/", {"fields": "id,order"})
+        self.assertEqual(response.data, {"id": bill.id, "order": self.order.id})
+
+        response = self.client.get(
+            f"/api/Bills/{bill.id}/", {"fields": "id,order", "expand": "order"}
+        )
+        self.assertEqual(response.data["order"]["table"], self.table.id)
+        self.assertEqual(len(response.data["order"]["lines"]), 2)
+
+        response = self.client.get(
+            f"/api/Bills/{bill.id}/", {"fields": "order.id,order.lines"}
+        )
+        self.assertEqual(set(response.data), {"order"})
+        self.assertEqual(set(response.data["order"]), {"id", "lines"})
+        self.assertEqual(
+            sorted(response.data["order"]["lines"]),
+            sorted(self.order.lines.values_list("id", flat=True)),
+        )
+
+        response = self.client.get("/api/Menus/", {"expand": ""})
+        self.assertEqual(response.data[0]["category"], self.category.id)
+
+    def test_unrequested_relations_are_not_queried(self):
+        with self.assertNumQueries(3):
+            self.client.get(f"/api/Orders/{self.order.id}/")
+        with self.assertNumQueries(1):
+            self.client.get(f"/api/Orders/{self.order.id}/", {"fields": "id,table"})
+
+    def test_bills_list_query_count_does_not_grow_with_bills(self):
+        with self.assertNumQueries(3):
+            response = self.client.get("/api/Bills/")
+        self.assertEqual(len(response.data["results"]), 1)
+
+        for _ in range(5):
+            self.create_order(self.burger)
+        with self.assertNumQueries(3):
+            response = self.client.get("/api/Bills/")
+        self.assertEqual(len(response.data["results"]), 6)
+        with self.assertNumQueries(1):
+            self.client.get("/api/Bills/", {"fields": "id,total_amount,is_paid"})
+
+    def test_unknown_fields_are_rejected(self):
+        response = self.client.get("/api/Tables/", {"fields": "id,colour"})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data, {"fields": ["Unknown field: colour."]})
+
+        response = self.client.get("/api/Orders/", {"expand": "table"})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            response.data, {"expand": ["Field cannot be expanded: table."]}
+        )
+
+        response = self.client.get("/api/Tables/", {"fields": "number.id"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_writes_ignore_fields(self):
+        response = self.client.post(
+            "/api/Tables/?fields=id", {"number": 2, "capacity": 2}, format="json"
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data["number"], 2)
+
+
+class WireFormatTests(RestaurantTestMixin, TestCase):
+    def setUp(self):
+        cache.clear()
+        super().setUp()
+        for number in range(2, 40):
+            Table.objects.create(number=number, capacity=2)
+
+    @unittest.skipIf(renderers.msgpack is None, "msgpack is not installed")
+    def test_messagepack_is_negotiated_through_accept(self):
+        json_response = self.client.get("/api/Tables/")
+        response = self.client.get("/api/Tables/", HTTP_ACCEPT="application/msgpack")
+        self.assertEqual(response["Content-Type"], "application/msgpack")
+        self.assertEqual(
+            renderers.msgpack.unpackb(response.content),
+            json.loads(json_response.content),
+        )
+        self.assertLess(len(response.content), len(json_response.content))
+
+    @unittest.skipIf(renderers.msgpack is None, "msgpack is not installed")
+    def test_messagepack_request_bodies_are_parsed(self):
+        body = renderers.msgpack.packb({"number": 99, "capacity": 6})
+        response = self.client.post(
+            "/api/Tables/", body, content_type="application/msgpack"
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(Table.objects.filter(number=99, capacity=6).exists())
+
+        response = self.client.post(
+            "/api/Tables/", b"\xc1", content_type="application/msgpack"
+        )
+        self.assertEqual(response.status_code, 400)
+
+    @override_settings(COMPRESSION_MIN_SIZE=1024)
+    def test_large_responses_are_compressed(self):
+        response = self.client.get("/api/Tables/", HTTP_ACCEPT_ENCODING="gzip")
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertIn("Accept-Encoding", response["Vary"])
+        self.assertEqual(
+            json.loads(gzip.decompress(response.content)),
+            json.loads(self.client.get("/api/Tables/").content),
+        )
+
+        response = self.client.get(
+            f"/api/Tables/{self.table.id}/",
+            HTTP_ACCEPT_ENCODING="gzip",
+        )
+        self.assertFalse(response.has_header("Content-Encoding"))
+        self.assertIn("Accept-Encoding", response["Vary"])
+
+    @unittest.skipIf(compression.brotli is None, "brotli is not installed")
+    def test_brotli_is_preferred(self):
+        response = self.client.get("/api/Tables/", HTTP_ACCEPT_ENCODING="gzip, br")
+        self.assertEqual(response["Content-Encoding"], "br")
+        self.assertEqual(
+            json.loads(compression.brotli.decompress(response.content)),
+            json.loads(self.client.get("/api/Tables/").content),
+        )
+
+    def test_encodings_refused_with_q_zero_are_not_used(self):
+        with mock.patch.object(compression, "brotli", mock.Mock()):
+            for header, expected in [
+                ("br;q=0, gzip", "gzip"),
+                ("gzip;q=0.5, br;q=0.8", "br"),
+                ("gzip;q=1, br;q=0.5", "gzip"),
+                ("BR;Q=0.000, GZIP;Q=0.001", "gzip"),
+                ("br;q=0, gzip;q=0", None),
+                ("*;q=0, gzip", "gzip"),
+                ("*", "br"),
+                ("br;q=2, gzip", "gzip"),
+                ("identity", None),
+            ]:
+                with self.subTest(header=header):
+                    self.assertEqual(compression.choose_encoding(header), expected)
+        response = self.client.get("/api/Tables/", HTTP_ACCEPT_ENCODING="br;q=0, gzip")
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        response = self.client.get("/api/Tables/", HTTP_ACCEPT_ENCODING="gzip;q=0")
+        self.assertFalse(response.has_header("Content-Encoding"))
+
+    def test_compressed_etags_are_weak(self):
+        for number in range(40):
+            MenuItem.objects.create(menu=self.menu, name=f"Dish {number}", price=1)
+        response = self.client.get("/api/menu-snapshot/", HTTP_ACCEPT_ENCODING="gzip")
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertTrue(response["ETag"].startswith('W/"'))
+
+        response = self.client.get(
+            "/api/menu-snapshot/",
+            HTTP_ACCEPT_ENCODING="gzip",
+            HTTP_IF_NONE_MATCH=response["ETag"],
+        )
+        self.assertEqual(response.status_code, 304)
+
+
+class ArchiveTests(RestaurantTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.old = [self.create_order(self.burger, self.fries) for _ in range(3)]
+        self.recent = self.create_order(self.burger)
+        self.unpaid = self.create_order(self.fries)
+        for order in (*self.old, self.recent):
+            order.bill.mark_paid()
+        Bill.objects.filter(order__in=self.old).update(
+            paid_at=timezone.now() - timedelta(days=100)
+        )
+
+    def test_old_paid_orders_move_to_the_archive(self):
+        moved = archive.archive_orders(batch_size=2)
+        self.assertEqual(moved, 3)
+        self.assertEqual(
+            set(Order.objects.values_list("id", flat=True)),
+            {self.recent.id, self.unpaid.id},
+        )
+        self.assertEqual(Bill.objects.count(), 2)
+        self.assertFalse(OrderLine.objects.filter(order__in=self.old).exists())
+        # The archived orders still count in the sales rollups
+        self.assertEqual(DailyWaiterSales.objects.get().orders, 4)
+
+        archived = ArchivedOrder.objects.get(pk=self.old[0].id)
+        self.assertEqual(archived.bill_id, self.old[0].bill.id)
+        self.assertEqual(
+            (archived.table_number, archived.waiter_name, archived.total_amount),
+            (1, "Sam", Decimal("11.75")),
+        )
+        self.assertEqual(
+            sorted(archived.lines.values_list("menu_item_name", "line_total")),
+            [("Burger", Decimal("8.50")), ("Fries", Decimal("3.25"))],
+        )
+        self.assertEqual(archive.archive_orders(), 0)
+
+    def test_the_live_api_serves_the_hot_set_and_the_archive_the_rest(self):
+        archive.archive_orders()
+        response = self.client.get(f"/api/Orders/{self.old[0].id}/")
+        self.assertEqual(response.status_code, 404)
+        response = self.client.get("/api/Orders/")
+        self.assertEqual(len(response.data["results"]), 2)
+
+        with self.assertNumQueries(2):
+            response = self.client.get("/api/ArchivedOrders/")
+        self.assertEqual(len(response.data["results"]), 3)
+        self.assertEqual(len(response.data["results"][0]["lines"]), 2)
+        response = self.client.get(f"/api/ArchivedOrders/{self.old[0].id}/")
+        self.assertEqual(response.data["waiter_name"], "Sam")
+
+        response = self.client.delete(f"/api/ArchivedOrders/{self.old[0].id}/")
+        self.assertEqual(response.status_code, 405)
+
+    def test_archiving_publishes_no_order_events(self):
+        events.reset_broker()
+        self.addCleanup(events.reset_broker)
+        with self.captureOnCommitCallbacks(execute=True):
+            archive.archive_orders()
+        self.assertEqual(events.get_broker().last_seq, 0)
+
+    def test_an_interrupted_run_resumes(self):
+        archive.archive_orders(batch_size=1, max_batches=1)
+        self.assertEqual(ArchivedOrder.objects.count(), 1)
+
+        # A copy left behind by a run stopped before its deletes committed
+        stale = ArchivedOrder.objects.get()
+        stale.pk = self.old[2].id
+        stale.bill_id = self.old[2].bill.id
+        stale.save()
+
+        self.assertEqual(archive.archive_orders(), 2)
+        self.assertEqual(ArchivedOrder.objects.count(), 3)
+        self.assertEqual(ArchivedOrder.objects.get(pk=self.old[2].id).lines.count(), 2)
+
+    def test_rebuilt_rollups_keep_the_archived_sales(self):
+        reports.rebuild()
+        before = sorted(
+            DailyWaiterSales.objects.values_list("day", "revenue", "orders")
+        )
+        archive.archive_orders()
+        reports.rebuild()
+        after = sorted(DailyWaiterSales.objects.values_list("day", "revenue", "orders"))
+        self.assertEqual(after, before)
+        self.assertEqual(sum(row[2] for row in after), 4)
+
+    def test_command(self):
+        out = io.StringIO()
+        call_command("archive_orders", "--dry-run", stdout=out)
+        self.assertIn("3 order(s)", out.getvalue())
+        self.assertEqual(ArchivedOrder.objects.count(), 0)
+
+        out = io.StringIO()
+        call_command("archive_orders", "--days", "200", stdout=out)
+        self.assertIn("Archived 0 order(s)", out.getvalue())
+
+        out = io.StringIO()
+        call_command("archive_orders", "--batch-size", "2", stdout=out)
+        self.assertIn("Archived 2 order(s)...", out.getvalue())
+        self.assertIn("Archived 3 order(s) paid before", out.getvalue())
+
+    @override_settings(ARCHIVE_DATABASE="archive")
+    def test_router_keeps_the_archive_on_its_database(self):
+        router = archive.ArchiveRouter()
+        self.assertEqual(router.db_for_read(ArchivedOrder), "archive")
+        self.assertEqual(router.db_for_write(ArchivedOrderLine), "archive")
+        self.assertIsNone(router.db_for_read(Order))
+        self.assertTrue(router.allow_migrate("archive", "restaurant", "archivedorder"))
+        self.assertFalse(router.allow_migrate("archive", "restaurant", "order"))
+        self.assertFalse(router.allow_migrate("archive", "restaurant"))
+        self.assertFalse(router.allow_migrate("default", "restaurant", "archivedorder"))
+        self.assertIsNone(router.allow_migrate("default", "restaurant", "order"))
+
+
+class KitchenQueueTests(RestaurantTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.patio = Table.objects.create(number=2, capacity=2)
+        self.first = self.create_order(self.burger, self.fries)
+        self.second = self.create_order(self.burger)
+        self.third = Order.objects.create(table=self.patio, waiter=self.waiter)
+        self.third.set_lines({self.fries: 2})
+
+    def ticket_orders(self, response):
+        return [ticket["order"] for ticket in response.data]
+
+    def test_every_order_gets_a_queued_ticket(self):
+        ticket = self.first.ticket
+        self.assertEqual(ticket.status, KitchenTicket.QUEUED)
+        self.assertEqual(ticket.table_id, self.table.id)
+
+        self.client.patch(
+            f"/api/Orders/{self.first.id}/", {"table": self.patio.id}, format="json"
+        )
+        ticket.refresh_from_db()
+        self.assertEqual(ticket.table_id, self.patio.id)
+
+        [order] = Order.bulk_create_with_lines(
+            [(Order(table=self.table, waiter=self.waiter), {self.burger: 1})]
+        )
+        self.assertEqual(order.ticket.status, KitchenTicket.QUEUED)
+
+    def test_next_tickets_come_by_priority_then_age(self):
+        # One queue for every station: no station is needed to read it
+        response = self.client.get("/api/KitchenTickets/next/", {"limit": 2})
+        self.assertEqual(self.ticket_orders(response), [self.first.id, self.second.id])
+        self.assertEqual(
+            response.data[0]["lines"],
+            [
+                {"menu_item": self.burger.id, "name": "Burger", "quantity": 1},
+                {"menu_item": self.fries.id, "name": "Fries", "quantity": 1},
+            ],
+        )
+
+        response = self.client.patch(
+            f"/api/KitchenTickets/{self.third.ticket.id}/",
+            {"priority": 5, "status": "Served"},
+            format="json",
+        )
+        self.assertEqual(response.data["status"], KitchenTicket.QUEUED)
+        with self.assertNumQueries(3):
+            response = self.client.get("/api/KitchenTickets/next/")
+        self.assertEqual(
+            self.ticket_orders(response),
+            [self.third.id, self.first.id, self.second.id],
+        )
+
+        for limit in (0, 101, "x"):
+            response = self.client.get("/api/KitchenTickets/next/", {"limit": limit})
+            self.assertEqual(response.status_code, 400)
+
+    def test_the_queue_is_read_from_its_index(self):
+        if connection.vendor != "sqlite":
+            self.skipTest("Checks the SQLite query plan")
+        plan = kitchen.queue()[:10].explain()
+        self.assertIn("ticket_queue_idx", plan)
+        self.assertNotIn("TEMP B-TREE", plan)
+
+    def test_long_station_names_are_rejected(self):
+        # Truncated names could make two stations one
+        long_name = "grill " + "x" * 45
+        for url in (
+            "/api/KitchenTickets/claim/",
+            f"/api/KitchenTickets/{self.first.ticket.id}/release/",
+        ):
+            response = self.client.post(url, {"station": long_name}, format="json")
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(
+                response.data, {"error": "Station must be at most 50 characters."}
+            )
+        self.assertFalse(KitchenTicket.objects.exclude(station="").exists())
+
+        response = self.client.post(
+            "/api/KitchenTickets/claim/", {"station": long_name[:50]}, format="json"
+        )
+        self.assertEqual(response.data[0]["station"], long_name[:50])
+
+    def test_stations_claim_different_tickets(self):
+        response = self.client.post(
+            "/api/KitchenTickets/claim/",
+            {"station": "grill", "limit": 2},
+            format="json",
+        )
+        self.assertEqual(self.ticket_orders(response), [self.first.id, self.second.id])
+        self.assertEqual(
+            {ticket["status"] for ticket in response.data}, {KitchenTicket.PREPARING}
+        )
+        response = self.client.post(
+            "/api/KitchenTickets/claim/",
+            {"station": "fryer", "limit": 2},
+            format="json",
+        )
+        self.assertEqual(self.ticket_orders(response), [self.third.id])
+        self.assertEqual(response.data[0]["station"], "fryer")
+        response = self.client.post(
+            "/api/KitchenTickets/claim/", {"station": "fryer"}, format="json"
+        )
+        self.assertEqual(response.data, [])
+
+        response = self.client.post("/api/KitchenTickets/claim/", {}, format="json")
+        self.assertEqual(response.status_code, 400)
+
+    def test_a_ticket_lost_to_another_station_is_replaced(self):
+        stale_head = [self.first.ticket.id, self.second.ticket.id]
+        self.assertEqual(kitchen.claim("grill"), [self.first.ticket.id])
+
+        candidates = kitchen._candidates
+        reads = iter([stale_head])
+        with mock.patch.object(
+            kitchen,
+            "_candidates",
+            lambda limit: next(reads, None) or candidates(limit),
+        ):
+            claimed = kitchen.claim("fryer", limit=2)
+        self.assertEqual(claimed, [self.second.ticket.id, self.third.ticket.id])
+        self.first.ticket.refresh_from_db()
+        self.assertEqual(self.first.ticket.station, "grill")
+
+    def test_transitions(self):
+        ticket = self.first.ticket
+        url = f"/api/KitchenTickets/{ticket.id}"
+        response = self.client.post(f"{url}/ready/", {"station": "grill"})
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.data, {"error": "Ticket is Queued."})
+
+        kitchen.claim("grill")
+        # Only the station holding the ticket moves it, and it has to say so
+        for name in ("ready", "release"):
+            response = self.client.post(f"{url}/{name}/")
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(response.data, {"error": "Station is required."})
+            response = self.client.post(f"{url}/{name}/", {"station": "fryer"})
+            self.assertEqual(response.status_code, 409)
+            self.assertEqual(response.data, {"error": "Ticket is Preparing."})
+        response = self.client.post(f"{url}/release/", {"station": " grill "})
+        self.assertEqual(
+            (response.data["status"], response.data["station"]),
+            (KitchenTicket.QUEUED, ""),
+        )
+
+        kitchen.claim("fryer")
+        response = self.client.post(f"{url}/ready/", {"station": "fryer"})
+        self.assertEqual(response.status_code, 200)
+        # Serving is not a station's job: any client marks a ready ticket
+        response = self.client.post(f"{url}/served/")
+        self.assertEqual(response.data["status"], KitchenTicket.SERVED)
+        self.assertEqual(self.client.post(f"{url}/served/").status_code, 409)
+
+        response = self.client.get("/api/KitchenTickets/")
+        self.assertEqual(self.ticket_orders(response), [self.second.id, self.third.id])
+        response = self.client.get("/api/KitchenTickets/", {"status": "Served"})
+        self.assertEqual(self.ticket_orders(response), [self.first.id])
+
+    def test_identical_dishes_are_batched(self):
+        kitchen.claim("grill")
+        self.assertEqual(
+            self.client.get("/api/KitchenTickets/batches/").data,
+            [
+                {
+                    "menu_item": self.burger.id,
+                    "name": "Burger",
+                    "quantity": 1,
+                    "tickets": [self.second.ticket.id],
+                },
+                {
+                    "menu_item": self.fries.id,
+                    "name": "Fries",
+                    "quantity": 2,
+                    "tickets": [self.third.ticket.id],
+                },
+            ],
+        )
+        self.client.post(
+            f"/api/KitchenTickets/{self.first.ticket.id}/release/",
+            {"station": "grill"},
+        )
+        batches = kitchen.batches()
+        self.assertEqual(
+            [(batch["name"], batch["quantity"]) for batch in batches],
+            [("Burger", 2), ("Fries", 3)],
+        )
+        self.assertEqual(
+            batches[0]["tickets"], [self.first.ticket.id, self.second.ticket.id]
+        )
+
+
+class ConcurrentClaimTests(TransactionTestCase):
+    stations = 8
+
+    def setUp(self):
+        if connection.vendor == "sqlite" and connection.is_in_memory_db():
+            self.skipTest(
+                "Threads cannot share a locked in-memory SQLite database; "
+                "set DATABASE_TEST_NAME to a file to run this test."
+            )
+        table = Table.objects.create(number=1, capacity=4)
+        waiter = Waiter.objects.create(name="Sam", age=30)
+        for _ in range(20):
+            Order.objects.create(table=table, waiter=waiter)
+
+    def test_concurrent_claims_never_share_a_ticket(self):
+        claims = {}
+        race = threading.Barrier(self.stations)
+
+        def station(index):
+            try:
+                race.wait(timeout=10)
+                claims[index] = kitchen.claim(f"station {index}", limit=3)
+            finally:
+                connection.close()
+
+        workers = [
+            threading.Thread(target=station, args=(index,))
+            for index in range(self.stations)
+        ]
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+
+        claimed = [pk for ids in claims.values() for pk in ids]
+        self.assertEqual(len(claimed), len(set(claimed)))
+        self.assertEqual(len(claimed), 20)
+        for index, ids in claims.items():
+            self.assertEqual(
+                set(
+                    KitchenTicket.objects.filter(
+                        station=f"station {index}"
+                    ).values_list("id", flat=True)
+                ),
+                set(ids),
+            )
@@ -0,0 +1,40 @@
+"""Work collected per database connection and run when its transaction commits.
+
+Bill recalculations and change events are both collected this way: every
+call in a transaction adds to one collector stored on the connection, and the
+collector's ``flush`` runs once, from ``on_commit``.
+"""
+
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+
+def _is_registered(connection, pending):
+    # A rollback discards the callbacks registered inside it, and with them
+    # the work that belonged to the rolled back part
+    return any(entry[1] == pending.flush for entry in connection.run_on_commit)
+
+
+def collect_on_commit(attr, factory, add, using=None):
+    """Pass ``add`` the collector of the current transaction on ``using``.
+
+    The collector is kept as ``attr`` on the connection. It needs a ``flush``
+    method, run once the transaction commits, that sets a ``flushed`` flag.
+    ``factory(using)`` makes a new one when there is none waiting for this
+    transaction. Outside of a transaction the new collector is flushed right
+    after ``add``.
+    """
+    using = using or DEFAULT_DB_ALIAS
+    connection = transaction.get_connection(using)
+    pending = getattr(connection, attr, None)
+    if (
+        pending is not None
+        and not pending.flushed
+        and _is_registered(connection, pending)
+    ):
+        add(pending)
+        return
+
+    pending = factory(using)
+    add(pending)
+    setattr(connection, attr, pending)
+    transaction.on_commit(pending.flush, using=using)
@@ -15,18 +15,27 @@ Including another URLconf
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
 
-# from django.urls import path, include
+from django.urls import path
 from rest_framework.routers import DefaultRouter
 from .views import (
+    ArchivedOrderViewSet,
     BillViewSet,
+    EventPollView,
+    KitchenTicketViewSet,
+    CategorySalesReportView,
     CategoryViewSet,
     MenuItemViewSet,
+    MenuSnapshotView,
     MenuViewSet,
     OrderViewSet,
+    PerfStatsView,
     ReceptionViewSet,
     ReservationViewSet,
+    TableSalesReportView,
     TableViewSet,
+    WaiterSalesReportView,
     WaiterViewSet,
+    event_stream,
 )
 
 router = DefaultRouter()
@@ -38,9 +47,23 @@ router.register(r"Waiters", WaiterViewSet)
 router.register(r"Receptions", ReceptionViewSet)
 router.register(r"Orders", OrderViewSet)
 router.register(r"Bills", BillViewSet)
+router.register(r"ArchivedOrders", ArchivedOrderViewSet)
+router.register(r"KitchenTickets", KitchenTicketViewSet)
 router.register(r"Reservations", ReservationViewSet)
 
 # urlpatterns = [
 #     path("", include(router.urls)),
 # ]
-urlpatterns = [] + router.urls
+urlpatterns = [
+    path("menu-snapshot/", MenuSnapshotView.as_view(), name="menu-snapshot"),
+    path("_perf/", PerfStatsView.as_view(), name="perf-stats"),
+    path("events/", event_stream, name="events"),
+    path("events/poll/", EventPollView.as_view(), name="events-poll"),
+    path(
+        "reports/categories/",
+        CategorySalesReportView.as_view(),
+        name="report-categories",
+    ),
+    path("reports/waiters/", WaiterSalesReportView.as_view(), name="report-waiters"),
+    path("reports/tables/", TableSalesReportView.as_view(), name="report-tables"),
+] + router.urls
@@ -1,11 +1,36 @@
-from rest_framework import viewsets, status
+import json
+from datetime import timedelta
+
+from django.db.models import ProtectedError
+from django.db.models.functions import Length
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from rest_framework import generics, mixins, viewsets, status
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import IsAdminUser
 from rest_framework.response import Response
+from rest_framework.views import APIView
 from django_filters import rest_framework as filters
-from rest_framework.filters import SearchFilter
+from .availability import available_tables
+from .events import get_broker, notify
+from .exports import ExportMixin
+from .fieldsets import SparseQuerysetMixin
+from .idempotency import IdempotencyMixin
+from . import kitchen
+from .menu_snapshot import etag_for, get_menu_version, get_snapshot
 from .models import (
+    ArchivedOrder,
+    KitchenTicket,
     Bill,
     Category,
+    DailyCategorySales,
+    DailyTableSales,
+    DailyWaiterSales,
     Menu,
     MenuItem,
     Order,
@@ -14,9 +39,19 @@ from .models import (
     Table,
     Waiter,
 )
+from .paginations import CreatedAtCursorPagination
+from .perf import stats as perf_stats
+from .replicas import ReplicaReadMixin
+from .search import IndexedSearchFilter, search
 from .serializers import (
+    ArchivedOrderSerializer,
+    KitchenTicketSerializer,
     BillSerializer,
+    BulkOrderSerializer,
     CategorySerializer,
+    DailyCategorySalesSerializer,
+    DailyTableSalesSerializer,
+    DailyWaiterSalesSerializer,
     MenuItemSerializer,
     MenuSerializer,
     OrderSerializer,
@@ -27,94 +62,569 @@ from .serializers import (
 )
 
 
-class TableViewSet(viewsets.ModelViewSet):
+class OrderedItemsDestroyMixin:
+    """Refuse with 409 to delete catalog rows that past orders refer to.
+
+    Order lines keep their menu item (``on_delete=PROTECT``), so an item that
+    has been ordered, and the menu and category holding it, stay.
+    """
+
+    def destroy(self, request, *args, **kwargs):
+        try:
+            return super().destroy(request, *args, **kwargs)
+        except ProtectedError:
+            name = self.queryset.model._meta.verbose_name.capitalize()
+            return Response(
+                {"error": f"{name} has been ordered and cannot be deleted."},
+                status=status.HTTP_409_CONFLICT,
+            )
+
+
+class TableViewSet(ReplicaReadMixin, SparseQuerysetMixin, viewsets.ModelViewSet):
     queryset = Table.objects.all()
     serializer_class = TableSerializer
 
+    def transition(self, request, status_to):
+        table = self.get_object()
+        if not table.transition(status_to):
+            return Response(
+                {"error": f"Table is {table.status}."},
+                status=status.HTTP_409_CONFLICT,
+            )
+        return Response(self.get_serializer(table).data)
+
+    @action(detail=True, methods=["post"])
+    def reserve(self, request, pk=None):
+        return self.transition(request, Table.RESERVED)
+
+    @action(detail=True, methods=["post"])
+    def seat(self, request, pk=None):
+        return self.transition(request, Table.OCCUPIED)
+
+    @action(detail=True, methods=["post"])
+    def free(self, request, pk=None):
+        return self.transition(request, Table.AVAILABLE)
+
+    @action(detail=False, methods=["post"], url_path="reset-floor")
+    def reset_floor(self, request):
+        """Make every table available at closing, in one UPDATE."""
+        return Response({"reset": Table.reset_floor()})
+
 
-class CategoryViewSet(viewsets.ModelViewSet):
+class CategoryViewSet(
+    OrderedItemsDestroyMixin, SparseQuerysetMixin, viewsets.ModelViewSet
+):
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
 
 
-class MenuViewSet(viewsets.ModelViewSet):
-    queryset = Menu.objects.select_related("category").all()
+class MenuViewSet(
+    OrderedItemsDestroyMixin,
+    ReplicaReadMixin,
+    SparseQuerysetMixin,
+    viewsets.ModelViewSet,
+):
+    queryset = Menu.objects.all()
     serializer_class = MenuSerializer
 
 
-class MenuItemViewSet(viewsets.ModelViewSet):
+class MenuSnapshotView(APIView):
+    """The whole categorized menu as one cached JSON document.
+
+    Clients send back the ETag in If-None-Match and get a 304 while the menu
+    is unchanged; neither response touches the database.
+    """
+
+    authentication_classes = []
+    permission_classes = []
+
+    def get(self, request):
+        version = get_menu_version()
+        etag = etag_for(version)
+        headers = {"ETag": etag, "Cache-Control": "no-cache"}
+        if_none_match = request.headers.get("If-None-Match", "")
+        # If-None-Match compares weakly: compression makes the ETag weak
+        tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+        if etag in tags:
+            return HttpResponse(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        return HttpResponse(
+            get_snapshot(version), content_type="application/json", headers=headers
+        )
+
+
+class PerfStatsView(APIView):
+    """Query count and latency percentiles per endpoint, for staff.
+
+    DELETE clears the samples collected so far.
+    """
+
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(perf_stats.snapshot())
+
+    def delete(self, request):
+        perf_stats.reset()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+def _since(request):
+    """The sequence number a client resumes from, or None if it is invalid."""
+    value = request.GET.get("since", request.headers.get("Last-Event-ID"))
+    if value is None:
+        return get_broker().last_seq
+    try:
+        return int(value)
+    except ValueError:
+        return None
+
+
+class EventPollView(APIView):
+    """Events after ``since`` for clients that poll instead of streaming.
+
+    ``reset`` means some events after ``since`` are no longer kept: the client
+    reloads the full state and continues from ``last_seq``.
+    """
+
+    def get(self, request):
+        since = _since(request)
+        if since is None:
+            raise ValidationError({"since": "Expected an integer."})
+        broker = get_broker()
+        last_seq = broker.last_seq
+        events = broker.since(since)
+        if events is not None:
+            last_seq = events[-1]["seq"] if events else since
+        return Response(
+            {
+                "last_seq": last_seq,
+                "reset": events is None,
+                "events": events or [],
+            }
+        )
+
+
+def _sse(event_type, data, event_id=None):
+    lines = [] if event_id is None else [f"id: {event_id}"]
+    lines.append(f"event: {event_type}")
+    lines.append(f"data: {json.dumps(data, cls=DjangoJSONEncoder)}")
+    return "\n".join(lines) + "\n\n"
+
+
+async def event_stream(request):
+    """Server-Sent Events stream of table, order and bill changes.
+
+    Served only under ASGI: a waiting client holds no thread, just a future.
+    Reconnecting clients resume through the Last-Event-ID header or ``since``.
+    """
+    if not isinstance(request, ASGIRequest):
+        return JsonResponse(
+            {"error": "Streaming needs the ASGI server; poll /api/events/poll/."},
+            status=status.HTTP_501_NOT_IMPLEMENTED,
+        )
+    since = _since(request)
+    if since is None:
+        return JsonResponse(
+            {"since": "Expected an integer."}, status=status.HTTP_400_BAD_REQUEST
+        )
+    broker = get_broker()
+    keepalive = getattr(settings, "EVENTS_KEEPALIVE", 15)
+
+    async def stream():
+        seq = since
+        while True:
+            events = await broker.wait(seq, keepalive)
+            if events is None:
+                seq = broker.last_seq
+                yield _sse("reset", {"last_seq": seq}, event_id=seq)
+            elif not events:
+                yield ": keepalive\n\n"
+            for event in events or []:
+                seq = event["seq"]
+                yield _sse(event["type"], event, event_id=seq)
+
+    return StreamingHttpResponse(
+        stream(),
+        content_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+class MenuItemViewSet(
+    OrderedItemsDestroyMixin,
+    ReplicaReadMixin,
+    SparseQuerysetMixin,
+    viewsets.ModelViewSet,
+):
     queryset = MenuItem.objects.all()
     serializer_class = MenuItemSerializer
+    autocomplete_limit = 20
+    autocomplete_candidates = 1000
 
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        query = self.request.query_params.get("q")
+        if query is None or self.action != "list":
+            return queryset
+        return self.autocomplete(queryset, query)
 
-class WaiterViewSet(viewsets.ModelViewSet):
+    @classmethod
+    def autocomplete(cls, queryset, query):
+        # A few matches, shortest names first, picked from a bounded number
+        # of candidates so short prefixes stay fast
+        matches = search(
+            queryset, "name", query, candidates=cls.autocomplete_candidates
+        )
+        return matches.order_by(Length("name"), "name")[: cls.autocomplete_limit]
+
+
+class WaiterViewSet(SparseQuerysetMixin, viewsets.ModelViewSet):
     queryset = Waiter.objects.all()
     serializer_class = WaiterSerializer
 
 
-class ReceptionViewSet(viewsets.ModelViewSet):
+class ReceptionViewSet(SparseQuerysetMixin, viewsets.ModelViewSet):
     queryset = Reception.objects.all()
     serializer_class = ReceptionSerializer
 
 
-class OrderViewSet(viewsets.ModelViewSet):
+class OrderViewSet(
+    IdempotencyMixin, ExportMixin, SparseQuerysetMixin, viewsets.ModelViewSet
+):
     queryset = Order.objects.all()
     serializer_class = OrderSerializer
-    filter_backends = (filters.DjangoFilterBackend, SearchFilter)
+    pagination_class = CreatedAtCursorPagination
+    filter_backends = (filters.DjangoFilterBackend, IndexedSearchFilter)
     search_fields = [
-        "table__number",
+        "=table__number",
         "waiter__name",
     ]
+    bulk_max_orders = 1000
+    export_filename = "orders"
+    export_columns = {
+        "id": "id",
+        "created_at": "created_at",
+        "table": "table__number",
+        "waiter": "waiter__name",
+        "total_amount": "total_amount",
+    }
+
+    @action(detail=False, methods=["post"])
+    def bulk(self, request):
+        """Create many orders in one transaction and report a result per order."""
+        return self.idempotent(request, self.bulk_create)
+
+    def bulk_create(self, request):
+        items = request.data
+        if not isinstance(items, list) or not items:
+            return Response(
+                {"error": "Expected a non-empty list of orders."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if len(items) > self.bulk_max_orders:
+            return Response(
+                {"error": f"At most {self.bulk_max_orders} orders per request."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        # One serializer validates every item, like the child of a ListSerializer
+        serializer = BulkOrderSerializer(
+            context={"related": BulkOrderSerializer.preload(items)}
+        )
+        results = [None] * len(items)
+        valid = []
+        for index, item in enumerate(items):
+            try:
+                valid.append((index, serializer.run_validation(item)))
+            except ValidationError as exc:
+                results[index] = {
+                    "index": index,
+                    "status": status.HTTP_400_BAD_REQUEST,
+                    "errors": exc.detail,
+                }
+
+        orders = Order.bulk_create_with_lines(
+            [
+                (Order(table=data["table"], waiter=data["waiter"]), data["quantities"])
+                for _, data in valid
+            ]
+        )
+        for (index, _), order in zip(valid, orders):
+            results[index] = {
+                "index": index,
+                "status": status.HTTP_201_CREATED,
+                "id": order.id,
+                "total_price": order.total_amount,
+            }
+
+        if len(valid) == len(items):
+            response_status = status.HTTP_201_CREATED
+        elif valid:
+            response_status = status.HTTP_207_MULTI_STATUS
+        else:
+            response_status = status.HTTP_400_BAD_REQUEST
+        return Response(results, status=response_status)
 
 
-class BillViewSet(viewsets.ModelViewSet):
+class BillViewSet(
+    ReplicaReadMixin,
+    IdempotencyMixin,
+    ExportMixin,
+    SparseQuerysetMixin,
+    viewsets.ModelViewSet,
+):
     queryset = Bill.objects.all()
     serializer_class = BillSerializer
+    pagination_class = CreatedAtCursorPagination
+    export_filename = "bills"
+    export_columns = {
+        "id": "id",
+        "order": "order_id",
+        "created_at": "created_at",
+        "table": "order__table__number",
+        "waiter": "order__waiter__name",
+        "total_amount": "total_amount",
+        "is_paid": "is_paid",
+    }
 
     def perform_create(self, serializer):
         # Automatically create a bill when an order is created
         bill = serializer.save()
         bill.calculate_total()  # Ensure the total is calculated
 
+
+class KitchenTicketViewSet(
+    SparseQuerysetMixin,
+    mixins.ListModelMixin,
+    mixins.RetrieveModelMixin,
+    mixins.UpdateModelMixin,
+    viewsets.GenericViewSet,
+):
+    """The kitchen queue; see kitchen.py.
+
+    The list shows the open tickets in queue order (``?status=`` picks one
+    status). The queue is shared: ``next/`` shows its head to every station,
+    and a ticket only belongs to a station once claimed with ``claim/``.
+    The station that holds a ticket moves it on with ``ready/`` or gives it
+    back with ``release/``, naming itself in ``station`` for each; whoever
+    takes a ready ticket to the table marks it ``served/``, without a
+    station. Only the priority is edited directly.
+    """
+
+    queryset = KitchenTicket.objects.all()
+    serializer_class = KitchenTicketSerializer
+    max_limit = 100
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action != "list":
+            return queryset
+        status_param = self.request.query_params.get("status")
+        if status_param is None:
+            return queryset.filter(status__in=kitchen.OPEN_STATUSES).order_by(
+                *kitchen.QUEUE_ORDER
+            )
+        if status_param not in dict(KitchenTicket.STATUS_CHOICES):
+            raise ValidationError({"error": "Unknown ticket status."})
+        return kitchen.queue(queryset, status_param)
+
     def perform_update(self, serializer):
-        # Automatically update the bill when an order is updated
-        bill = serializer.save()
-        bill.calculate_total()  # Ensure the total is recalculated
+        notify("ticket", serializer.save().pk)
+
+    def get_limit(self, value):
+        try:
+            limit = int(value)
+        except (TypeError, ValueError):
+            limit = 0
+        if not 1 <= limit <= self.max_limit:
+            raise ValidationError(
+                {"error": f"Limit must be an integer from 1 to {self.max_limit}."}
+            )
+        return limit
+
+    def get_station(self, data):
+        station = data.get("station")
+        if not isinstance(station, str) or not station.strip():
+            raise ValidationError({"error": "Station is required."})
+        station = station.strip()
+        max_length = KitchenTicket._meta.get_field("station").max_length
+        if len(station) > max_length:
+            raise ValidationError(
+                {"error": f"Station must be at most {max_length} characters."}
+            )
+        return station
+
+    def tickets(self, queryset):
+        return Response(self.get_serializer(queryset, many=True).data)
+
+    @action(detail=False, methods=["get"], url_path="next")
+    def next_tickets(self, request):
+        """The next ``limit`` queued tickets of the shared queue, unclaimed."""
+        limit = self.get_limit(request.query_params.get("limit", 10))
+        return self.tickets(kitchen.queue(self.get_queryset())[:limit])
+
+    @action(detail=False, methods=["post"])
+    def claim(self, request):
+        """Claim up to ``limit`` tickets from the head of the queue for ``station``."""
+        claimed = kitchen.claim(
+            self.get_station(request.data),
+            self.get_limit(request.data.get("limit", 1)),
+        )
+        return self.tickets(
+            self.get_queryset().filter(pk__in=claimed).order_by(*kitchen.QUEUE_ORDER)
+        )
+
+    @action(detail=False, methods=["get"])
+    def batches(self, request):
+        """Dishes of the queued tickets grouped by menu item, to cook together."""
+        return Response(kitchen.batches())
+
+    def transition(self, request, status_to, station=None):
+        ticket = self.get_object()
+        if not ticket.transition(status_to, station=station):
+            return Response(
+                {"error": f"Ticket is {ticket.status}."},
+                status=status.HTTP_409_CONFLICT,
+            )
+        return Response(self.get_serializer(ticket).data)
+
+    @action(detail=True, methods=["post"])
+    def ready(self, request, pk=None):
+        station = self.get_station(request.data)
+        return self.transition(request, KitchenTicket.READY, station)
+
+    @action(detail=True, methods=["post"])
+    def served(self, request, pk=None):
+        return self.transition(request, KitchenTicket.SERVED)
+
+    @action(detail=True, methods=["post"])
+    def release(self, request, pk=None):
+        station = self.get_station(request.data)
+        return self.transition(request, KitchenTicket.QUEUED, station)
+
+
+class ArchivedOrderViewSet(
+    ReplicaReadMixin, ExportMixin, SparseQuerysetMixin, viewsets.ReadOnlyModelViewSet
+):
+    """Orders moved out of the live tables by ``archive_orders``; read-only."""
+
+    queryset = ArchivedOrder.objects.all()
+    serializer_class = ArchivedOrderSerializer
+    pagination_class = CreatedAtCursorPagination
+    export_filename = "archived-orders"
+    export_columns = {
+        "id": "id",
+        "created_at": "created_at",
+        "paid_at": "paid_at",
+        "table": "table_number",
+        "waiter": "waiter_name",
+        "total_amount": "total_amount",
+    }
 
 
-class ReservationViewSet(viewsets.ModelViewSet):
+NO_TABLES_AVAILABLE = {
+    "message": "No open tables available for the specified capacity.",
+}
+
+
+class ReservationViewSet(SparseQuerysetMixin, viewsets.ModelViewSet):
     queryset = Reservation.objects.all()
     serializer_class = ReservationSerializer
+    pagination_class = CreatedAtCursorPagination
 
-    @action(detail=False, methods=["get"], url_path="available-tables")
-    def get_available_tables(self, request):
-        capacity = request.query_params.get("capacity", None)
+    @staticmethod
+    def availability_query(params):
+        """``available_tables`` arguments from query parameters.
+
+        Raises ``ValidationError`` for a missing or malformed parameter.
+        """
+        capacity = params.get("capacity", None)
 
         if not capacity:
-            return Response(
-                {"error": "Capacity parameter is required."},
-                status=status.HTTP_400_BAD_REQUEST,
-            )
+            raise ValidationError({"error": "Capacity parameter is required."})
 
         try:
             capacity = int(capacity)
         except ValueError:
-            return Response(
-                {"error": "Capacity must be an integer."},
-                status=status.HTTP_400_BAD_REQUEST,
-            )
+            raise ValidationError({"error": "Capacity must be an integer."})
 
-        available_tables = Table.objects.filter(
-            status="Available", capacity__gte=capacity
-        )
+        start = params.get("time", None)
+        if start:
+            try:
+                # None when malformed, ValueError for an impossible date
+                start = parse_datetime(start)
+            except ValueError:
+                start = None
+            if start is None:
+                raise ValidationError({"error": "Time must be an ISO 8601 datetime."})
+            if timezone.is_naive(start):
+                start = timezone.make_aware(start)
 
-        if available_tables.exists():
-            serializer = TableSerializer(available_tables, many=True)
+        duration = params.get("duration", None)
+        if duration:
+            try:
+                duration = timedelta(minutes=int(duration))
+            except ValueError:
+                raise ValidationError(
+                    {"error": "Duration must be an integer number of minutes."}
+                )
+            if not timedelta(0) < duration <= Reservation.MAX_DURATION:
+                raise ValidationError({"error": "Duration is out of range."})
+
+        return {"party_size": capacity, "start": start, "duration": duration}
+
+    @action(detail=False, methods=["get"], url_path="available-tables")
+    def get_available_tables(self, request):
+        query = self.availability_query(request.query_params)
+
+        # Evaluated once: the availability check is a single query
+        tables = list(available_tables(**query))
+
+        if tables:
+            serializer = TableSerializer(tables, many=True)
             return Response(serializer.data)
         else:
             return Response(
-                {
-                    "message": "No open tables available for the specified capacity.",
-                },
+                NO_TABLES_AVAILABLE,
                 status=status.HTTP_404_NOT_FOUND,
             )
+
+
+class SalesReportView(ReplicaReadMixin, SparseQuerysetMixin, generics.ListAPIView):
+    """Daily sales rows read from one rollup table.
+
+    ``start`` and ``end`` are inclusive ISO dates; both are optional.
+    """
+
+    pagination_class = None
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        for name, lookup in (("start", "day__gte"), ("end", "day__lte")):
+            value = self.request.query_params.get(name)
+            if not value:
+                continue
+            try:
+                day = parse_date(value)
+            except ValueError:
+                # Well formed but impossible, such as 2026-02-30
+                day = None
+            if day is None:
+                raise ValidationError({name: "Expected an ISO 8601 date."})
+            queryset = queryset.filter(**{lookup: day})
+        return queryset
+
+
+class CategorySalesReportView(SalesReportView):
+    queryset = DailyCategorySales.objects.order_by("day", "category_id")
+    serializer_class = DailyCategorySalesSerializer
+
+
+class WaiterSalesReportView(SalesReportView):
+    queryset = DailyWaiterSales.objects.order_by("day", "waiter_id")
+    serializer_class = DailyWaiterSalesSerializer
+
+
+class TableSalesReportView(SalesReportView):
+    queryset = DailyTableSales.objects.order_by("day", "table_id")
+    serializer_class = DailyTableSalesSerializer